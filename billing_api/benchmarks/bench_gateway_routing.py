@@ -0,0 +1,133 @@
+"""
+Failover check of latency-aware gateway routing
+
+Starts two Stripe stand-ins in process, routes checkout payments between them
+with `GatewayRouter` and degrades the latency of the first one halfway through.
+Prints the share of payments made with every gateway and checkout latency
+before and after the degradation.
+
+Usage (from `billing_api` directory):
+    python -m benchmarks.bench_gateway_routing [--payments 400] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+from contextlib import AsyncExitStack
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from aiohttp import web
+from src.clients.registry import GatewayRegistry
+from src.clients.router import GatewayRouter
+from src.clients.stripe_adapter import get_stripe_adapter
+from src.core.settings import GatewaySettings
+from src.models.common import PaymentSystem
+from stripe_stub.app import STATE_KEY, create_app
+from stripe_stub.profiles import Latency, Profile
+
+USER_ID = str(uuid.uuid4())
+
+
+def _percentile(durations: List[float], q: float) -> float:
+    durations = sorted(durations)
+    return durations[min(len(durations) - 1, int(q / 100 * len(durations)))]
+
+
+async def _start_stub(profile: Profile, port: int) -> web.AppRunner:
+    app = create_app(profile)
+    app[STATE_KEY].create_customer({"id": USER_ID})
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def _new_order() -> SimpleNamespace:
+    order_id = uuid.uuid4()
+    return SimpleNamespace(
+        id=order_id,
+        user_id=USER_ID,
+        user_email="user@example.com",
+        payment_system=PaymentSystem.STRIPE.value,
+        payment_amount=Decimal("9.99"),
+        payment_currency_code="usd",
+        is_refund=False,
+        is_automatic=False,
+        idempotency_key=f"payment-{order_id}",
+    )
+
+
+async def _checkout(
+    router: GatewayRouter,
+    semaphore: asyncio.Semaphore,
+    used: Counter,
+    durations: List[float],
+) -> None:
+    async with semaphore:
+        started = time.monotonic()
+        gateway, _ = await router.create_payment(_new_order())
+        durations.append(time.monotonic() - started)
+        used[gateway] += 1
+
+
+async def _run_phase(
+    name: str,
+    router: GatewayRouter,
+    payments: int,
+    concurrency: int,
+) -> None:
+    used: Counter = Counter()
+    durations: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.gather(
+        *(_checkout(router, semaphore, used, durations) for _ in range(payments)),
+    )
+    shares = ", ".join(
+        f"{gateway} {count / payments:5.1%}" for gateway, count in sorted(used.items())
+    )
+    print(
+        f"{name:<10} p50 {_percentile(durations, 50) * 1000:7.1f} ms  "
+        f"p99 {_percentile(durations, 99) * 1000:7.1f} ms  {shares}",
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payments", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-p99", type=float, default=0.25)
+    args = parser.parse_args()
+
+    profile_a = Profile(latency=Latency("lognormal", 0.03, 0.3))
+    profile_b = Profile(latency=Latency("lognormal", 0.05, 0.3))
+    gateways = [
+        GatewaySettings(
+            name="stripe_a", url="http://127.0.0.1:12121/v1", api_key="sk_a"
+        ),
+        GatewaySettings(
+            name="stripe_b", url="http://127.0.0.1:12122/v1", api_key="sk_b"
+        ),
+    ]
+    registry = GatewayRegistry({PaymentSystem.STRIPE: get_stripe_adapter}, gateways)
+    router = GatewayRouter(registry, min_samples=20, max_p99=args.max_p99)
+
+    async with AsyncExitStack() as stack:
+        for profile, port in ((profile_a, 12121), (profile_b, 12122)):
+            stack.push_async_callback((await _start_stub(profile, port)).cleanup)
+        await registry.start()
+        stack.push_async_callback(registry.close)
+        for name in registry.gateways:
+            registry.get(name).adapter.customers.known.set(USER_ID, USER_ID)
+
+        await _run_phase("healthy", router, args.payments, args.concurrency)
+        # The first gateway p99 grows over the routing threshold
+        profile_a.latency = Latency("lognormal", 0.2, 0.6)
+        await _run_phase("degraded", router, args.payments, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
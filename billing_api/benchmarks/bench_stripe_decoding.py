@@ -0,0 +1,167 @@
+"""
+Micro-benchmark of Stripe response decoding
+
+Compares the default decoding (`json` + `parse_obj`) with the fast one
+(`orjson` + `construct`) on a payment intent and a refund response.
+
+Usage (from `billing_api` directory):
+    python -m benchmarks.bench_stripe_decoding [--number 20000]
+"""
+
+import argparse
+import json
+import timeit
+
+import orjson
+from src.clients.stripe.models import StripePaymentIntent, StripeRefund
+from src.clients.stripe.utils.decoders import construct_payment_intent, construct_refund
+
+CARD_DETAILS = {
+    "brand": "visa",
+    "checks": {
+        "address_line1_check": None,
+        "address_postal_code_check": None,
+        "cvc_check": "pass",
+    },
+    "country": "US",
+    "exp_month": 5,
+    "exp_year": 2022,
+    "fingerprint": "Xt5EWLLDS7FJjR1c",
+    "funding": "credit",
+    "installments": None,
+    "last4": "4242",
+    "network": "visa",
+    "three_d_secure": None,
+    "wallet": None,
+}
+
+CHARGE = {
+    "id": "ch_1Iw9XxIopSoE9boMQk3cKzRj",
+    "object": "charge",
+    "amount": 1000,
+    "amount_captured": 1000,
+    "amount_refunded": 0,
+    "balance_transaction": "txn_1Iw9XyIopSoE9boMDm6hJ2xP",
+    "billing_details": {
+        "address": {
+            "city": None,
+            "country": None,
+            "line1": None,
+            "line2": None,
+            "postal_code": "42424",
+            "state": None,
+        },
+        "email": None,
+        "name": None,
+        "phone": None,
+    },
+    "captured": True,
+    "created": 1622110000,
+    "currency": "usd",
+    "customer": "d306f620-2083-4c55-b66f-7171fffecc2b",
+    "livemode": False,
+    "metadata": {"is_automatic": "0"},
+    "outcome": {
+        "network_status": "approved_by_network",
+        "reason": None,
+        "risk_level": "normal",
+        "risk_score": 32,
+        "seller_message": "Payment complete.",
+        "type": "authorized",
+    },
+    "paid": True,
+    "payment_intent": "pi_1Iw9WpIopSoE9boMp5RsvMgA",
+    "payment_method": "pm_1Iw9XwIopSoE9boMfK2ugNsX",
+    "payment_method_details": {"card": CARD_DETAILS, "type": "card"},
+    "receipt_email": "user@example.com",
+    "receipt_url": "https://pay.stripe.com/receipts/acct_1InhtFIopSoE9boM/ch_1Iw9Xx",
+    "refunded": False,
+    "refunds": {"object": "list", "data": [], "has_more": False, "total_count": 0},
+    "status": "succeeded",
+}
+
+PAYMENT_INTENT = {
+    "id": "pi_1Iw9WpIopSoE9boMp5RsvMgA",
+    "object": "payment_intent",
+    "amount": 1000,
+    "amount_capturable": 0,
+    "amount_received": 1000,
+    "capture_method": "automatic",
+    "charges": {
+        "object": "list",
+        "data": [CHARGE],
+        "has_more": False,
+        "total_count": 1,
+        "url": "/v1/charges?payment_intent=pi_1Iw9WpIopSoE9boMp5RsvMgA",
+    },
+    "client_secret": "pi_1Iw9WpIopSoE9boMp5RsvMgA_secret_3Ff0c6NhKj0gNQ1iWbJpBHNeT",
+    "confirmation_method": "automatic",
+    "created": 1622109999,
+    "currency": "usd",
+    "customer": "d306f620-2083-4c55-b66f-7171fffecc2b",
+    "livemode": False,
+    "metadata": {"is_automatic": "0"},
+    "payment_method": "pm_1Iw9XwIopSoE9boMfK2ugNsX",
+    "payment_method_options": {
+        "card": {
+            "installments": None,
+            "network": None,
+            "request_three_d_secure": "automatic",
+        }
+    },
+    "payment_method_types": ["card"],
+    "receipt_email": "user@example.com",
+    "setup_future_usage": "off_session",
+    "status": "succeeded",
+}
+
+REFUND = {
+    "id": "re_1Iw9bEIopSoE9boMz2lmwUcS",
+    "object": "refund",
+    "amount": 500,
+    "balance_transaction": "txn_1Iw9bEIopSoE9boMkrT8LTKU",
+    "charge": "ch_1Iw9XxIopSoE9boMQk3cKzRj",
+    "created": 1622110200,
+    "currency": "usd",
+    "metadata": {},
+    "payment_intent": "pi_1Iw9WpIopSoE9boMp5RsvMgA",
+    "reason": None,
+    "status": "succeeded",
+}
+
+
+def _bench(name: str, raw: bytes, slow, fast, number: int) -> None:
+    slow_time = timeit.timeit(lambda: slow(json.loads(raw)), number=number)
+    fast_time = timeit.timeit(lambda: fast(orjson.loads(raw)), number=number)
+    slow_us = slow_time / number * 1e6
+    fast_us = fast_time / number * 1e6
+    print(
+        f"{name:<15} {len(raw):>7} B  default {slow_us:8.1f} us/call  "
+        f"fast {fast_us:8.1f} us/call  saved {slow_us - fast_us:8.1f} us/call "
+        f"(x{slow_us / fast_us:.1f})",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    _bench(
+        "payment_intent",
+        json.dumps(PAYMENT_INTENT).encode(),
+        StripePaymentIntent.parse_obj,
+        construct_payment_intent,
+        args.number,
+    )
+    _bench(
+        "refund",
+        json.dumps(REFUND).encode(),
+        StripeRefund.parse_obj,
+        construct_refund,
+        args.number,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-request cost of token signature verification
+
+Signs tokens shaped like the auth service ones (user identifier, roles with
+permissions, expiration) and verifies them with `_validate_token`, passing the
+public key either as a PEM string, parsed on every call, or as a key object
+parsed once, as `PublicKeyStore` keeps it.
+
+Usage (from `billing_api` directory):
+    python -m benchmarks.bench_token_verification [--tokens 2000] [--roles 1 10 50]
+"""
+
+import argparse
+import time
+import uuid
+from functools import partial
+from typing import Any, Callable, List
+
+from authlib.jose import JsonWebKey, jwt
+from src.services import auth
+
+ALGORITHMS = {
+    "RS256": ("RSA", 2048),
+    "ES256": ("EC", "P-256"),
+}
+
+
+def _make_token(private_key: Any, alg: str, roles: int) -> str:
+    claims = {
+        "sub": str(uuid.uuid4()),
+        "exp": int(time.time()) + 3600,
+        "rls": {
+            f"role_{i}": [f"permission_{i}_{j}" for j in range(5)] for i in range(roles)
+        },
+    }
+    return jwt.encode({"alg": alg, "typ": "JWT"}, claims, private_key).decode()
+
+
+def _measure(tokens: List[str], verify: Callable[[str], Any]) -> float:
+    started = time.perf_counter()
+    for token in tokens:
+        assert verify(token) is not None
+    return (time.perf_counter() - started) / len(tokens)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--roles", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    for alg, (kty, crv_or_size) in ALGORITHMS.items():
+        private_key = JsonWebKey.generate_key(kty, crv_or_size, is_private=True)
+        pem = private_key.as_pem(is_private=False).decode()
+        public_key = JsonWebKey.import_key(pem)
+
+        for roles in args.roles:
+            tokens = [_make_token(private_key, alg, roles) for _ in range(args.tokens)]
+            per_pem = _measure(tokens, partial(auth._validate_token, public_key=pem))
+            per_key = _measure(
+                tokens,
+                partial(auth._validate_token, public_key=public_key),
+            )
+            print(
+                f"{alg} {roles:>3} roles {len(tokens[0]):>6} B  "
+                f"PEM {per_pem * 1e6:8.1f} us  "
+                f"parsed key {per_key * 1e6:8.1f} us  "
+                f"x{per_pem / per_key:.2f}",
+            )
+
+
+if __name__ == "__main__":
+    main()
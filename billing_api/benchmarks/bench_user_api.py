@@ -0,0 +1,129 @@
+"""
+Requests per second of one worker serving user API reads
+
+Calls the app in process, without a server and network, with `AUTH_DEBUG` user
+and an SQLite database filled with products and payment methods, so the numbers
+show the per-request cost of the app itself: routing, database access,
+validation and serialization. Every endpoint is measured with the default
+responses and with `USER_API_FAST_RESPONSES`.
+
+Usage (from `billing_api` directory):
+    python -m benchmarks.bench_user_api [--requests 2000] [--products 20] [--payment-methods 5]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack
+from decimal import Decimal
+
+from src.api.v1 import user
+from src.db.models import Products
+from src.db.repositories.payment_method import PaymentMethodRepository
+from src.main import app
+from src.services import auth
+from src.services.catalog import product_catalog
+from tortoise import Tortoise, timezone
+
+ENDPOINTS = ("/api/user/products", "/api/user/payment_methods")
+
+
+async def _fill(products: int, payment_methods: int) -> None:
+    await Tortoise.init(
+        db_url="sqlite://:memory:", modules={"billing": ["src.db.models"]}
+    )
+    await Tortoise.generate_schemas()
+    now = timezone.now()
+    await Products.bulk_create(
+        Products(
+            id=uuid.uuid4(),
+            name=f"Product {i}",
+            description="Subscription to all movies",
+            role_id=uuid.uuid4(),
+            price=Decimal("9.99"),
+            currency_code="usd",
+            period=30,
+            active=True,
+            created=now,
+            modified=now,
+        )
+        for i in range(products)
+    )
+    for i in range(payment_methods):
+        await PaymentMethodRepository.create(
+            auth.DEBUG_USER_ID, f"pm_{i}", "stripe", "card", '"visa **** 4242"'
+        )
+    await product_catalog.load()
+
+
+class _Exchange:
+    """ASGI channels of one request without a body, keeping the response status"""
+
+    def __init__(self):
+        self.status = 0
+
+    async def receive(self) -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+
+
+async def _request(path: str) -> int:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    exchange = _Exchange()
+    await app(scope, exchange.receive, exchange.send)
+    return exchange.status
+
+
+async def _measure(path: str, requests: int) -> float:
+    assert await _request(path) == 200
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _request(path)
+    return requests / (time.perf_counter() - started)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with AsyncExitStack() as stack:
+        stack.push_async_callback(Tortoise.close_connections)
+        await _fill(args.products, args.payment_methods)
+        for path in ENDPOINTS:
+            user.FAST_RESPONSES = False
+            default_rps = await _measure(path, args.requests)
+            user.FAST_RESPONSES = True
+            fast_rps = await _measure(path, args.requests)
+            print(
+                f"{path:<28} default {default_rps:8.0f} rps  "
+                f"fast {fast_rps:8.0f} rps  x{fast_rps / default_rps:.2f}",
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--payment-methods", type=int, default=5)
+    args = parser.parse_args()
+
+    auth.DEBUG = 1
+    auth.DEBUG_USER_ID = str(uuid.uuid4())
+    asyncio.get_event_loop().run_until_complete(_run(args))
+
+
+if __name__ == "__main__":
+    main()
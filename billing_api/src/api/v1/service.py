@@ -1,28 +1,42 @@
 """Module with service API paths definition"""
 
 import logging
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.clients import get_payment_gateway
+from fastapi import APIRouter, HTTPException, status
+from src.clients import gateway_registry, get_order_gateway
 from src.db.models import Orders
 from src.db.repositories.order import OrderRepository
+from src.db.repositories.recurring_order import RecurringOrderRepository
 from src.db.repositories.payment_method import PaymentMethodRepository
+from src.db.repositories.role_outbox import RoleOutboxRepository
 from src.db.repositories.subscription import SubscriptionRepository
-from src.models.common import OrderState, SubscriptionState
+from src.models.api import (
+    OrderIdsIn,
+    OrderUpdateOut,
+    SubscriptionIdsIn,
+    SubscriptionUpdateOut,
+)
+from src.models.common import OrderState, RoleAction, SubscriptionState
 from src.resources.error_messages import (
     INACTIVE_PRODUCT,
     ORDER_IS_PAID,
     ORDER_NOT_FOUND,
     PAYMENT_METHOD_NOT_FOUND,
+    RECURRING_PAYMENT_IN_PROCESS,
     SUBSCRIPTION_NOT_FOUND,
-    USER_HAS_ROLE,
-    USER_OR_ROLE_NOT_FOUND,
 )
-from src.services.roles import (
-    RoleServiceConflictError,
-    RoleServiceNotFoundError,
-    RolesService,
-    get_roles_service,
+from src.services.orders import (
+    apply_order_state,
+    finalize_payment,
+    recover_unsent_orders,
+    update_orders_info,
+)
+from src.services.role_outbox import role_outbox_dispatcher
+from src.services.subscriptions import (
+    activate_subscriptions,
+    deactivate_subscriptions,
+    withdraw_subscriptions_price,
 )
 from tortoise.transactions import in_transaction
 
@@ -41,57 +55,27 @@ async def update_order_info(order_id: str):
     if order.state == OrderState.PAID:
         raise HTTPException(status.HTTP_409_CONFLICT, detail=ORDER_IS_PAID)
 
-    payment_gateway = get_payment_gateway(order.payment_system)
+    payment_gateway = get_order_gateway(order)
 
     logger.info(f"Updating order {order.id} through {order.payment_system}.")
 
+    user_payment_method = None
     if order.is_refund:
         order_status = await payment_gateway.get_refund_status(order)
     else:
-        order_status = await payment_gateway.get_payment_status(order)
+        payment_details = await payment_gateway.get_payment_details(order)
+        order_status = payment_details.state
+        user_payment_method = payment_details.payment_method
 
-    async with in_transaction():
-        payment_method = order.payment_method
-        if (
-            order_status == OrderState.PAID
-            and not order.is_automatic
-            and not order.is_refund
-        ):
-            user_payment_method = await payment_gateway.get_payment_method(order)
-
-            payment_method = await PaymentMethodRepository.create(
-                user_id=order.user_id,
-                external_id=user_payment_method.id,
-                payment_type=user_payment_method.type,
-                payment_system=order.payment_system,
-                data=user_payment_method.data,
-            )
-            logger.info(
-                f"Payment method {payment_method.id} for order {order.id} / user {order.user_id} created successfully."
-            )
-
-            await SubscriptionRepository.pre_activate(order.subscription.id)
+    await apply_order_state(order, order_status, payment_gateway, user_payment_method)
 
-        logger.info(f"VALUES: {order}, {order_status}, {payment_method}")
-        if payment_method:
-            await OrderRepository.update(
-                order.id,
-                state=order_status,
-                payment_method=payment_method,
-            )
-            logger.info(
-                f"Order {order.id} updated successfully with state {order_status.value} "
-                f"and payment method {payment_method.id}."
-            )
 
-        else:
-            await OrderRepository.update(
-                order.id,
-                state=order_status,
-            )
-            logger.info(
-                f"Order {order.id} updated successfully with state {order_status.value}."
-            )
+@service_router.post(
+    "/orders/update_info", response_model=List[OrderUpdateOut], status_code=200
+)
+async def update_orders_info_batch(orders: OrderIdsIn):
+    """Information of many orders updating by service applications."""
+    return await update_orders_info([str(order_id) for order_id in orders.order_ids])
 
 
 @service_router.post("/order/{order_id}/cancel", status_code=200)
@@ -111,11 +95,19 @@ async def cancel_order(order_id: str):
     logger.info(f"Order {order.id} has been marked with state Error.")
 
 
+@service_router.post("/orders/recover", status_code=200)
+async def recover_orders():
+    """Orders not sent to payment systems recovering by service applications."""
+    result = await recover_unsent_orders()
+    if result["recovered"] or result["failed"]:
+        logger.info(
+            f"Unsent orders recovered: {result['recovered']}, failed: {result['failed']}."
+        )
+    return result
+
+
 @service_router.post("/subscription/{subscription_id}/activate", status_code=200)
-async def activate_subscription(
-    subscription_id: str,
-    roles_service: RolesService = Depends(get_roles_service),
-):
+async def activate_subscription(subscription_id: str):
     """Change subscription state to `active`."""
     subscription = await SubscriptionRepository.get(subscription_id)
     if not subscription:
@@ -131,26 +123,13 @@ async def activate_subscription(
             SubscriptionState.PRE_ACTIVE,
         ]:
             logger.info(f"Granting role for user with subscription {subscription.id}.")
-            try:
-                await roles_service.grant_role(
-                    subscription.user_id, subscription.product.role_id
-                )
-            except RoleServiceConflictError as e:
-                logger.info(
-                    f"User {subscription.user_id} already has the role {subscription.product.role_id}."
-                    f"Auth service response: {e.msg}"
-                )
-                raise HTTPException(status.HTTP_409_CONFLICT, detail=USER_HAS_ROLE)
-            except RoleServiceNotFoundError as e:
-                logger.error(
-                    f"User {subscription.user_id} or role {subscription.product.role_id} not found"
-                    f"Auth service response: {e.msg}"
-                )
-                raise HTTPException(
-                    status.HTTP_404_NOT_FOUND, detail=USER_OR_ROLE_NOT_FOUND
-                )
-
-        logger.info(f"Subscription {subscription_id} was activated successfully")
+            # The role is granted by the outbox dispatcher after the commit
+            await RoleOutboxRepository.enqueue(
+                subscription.user_id, subscription.product.role_id, RoleAction.GRANT
+            )
+
+    role_outbox_dispatcher.wake()
+    logger.info(f"Subscription {subscription_id} was activated successfully")
 
 
 @service_router.post(
@@ -169,34 +148,37 @@ async def withdraw_subscription_price(subscription_id: str):
     if not payment_method:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail=PAYMENT_METHOD_NOT_FOUND)
 
-    previous_order: Orders = await OrderRepository.get_subscription_order(
-        subscription.user_id, subscription_id
-    )
-    logger.info(
-        f"Making a recurring payment for subscription {subscription.id} with payment method {payment_method.id}"
-    )
-    async with in_transaction():
-        order = await OrderRepository.create_recurring_order(
-            previous_order, payment_method
+    order = await RecurringOrderRepository.get_pending_recurring_order(subscription_id)
+    if order and order.external_id:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT, detail=RECURRING_PAYMENT_IN_PROCESS
         )
 
-        payment_gateway = get_payment_gateway(order.payment_system)
-        payment = await payment_gateway.create_recurring_payment(order)
-
-        await OrderRepository.update(
-            order.id, external_id=payment.id, state=payment.state
+    if not order:
+        previous_order: Orders = await OrderRepository.get_subscription_order(
+            subscription.user_id, subscription_id
         )
-        logger.info(
-            f"Recurring payment for subscription {subscription.id} created successfully: "
-            f"Payment {payment.id} / Order {order.id}"
+        # The order is committed before the payment gateway call, so a repeated
+        # attempt reuses it together with its idempotency key
+        order = await RecurringOrderRepository.create_recurring_order(
+            previous_order, payment_method
         )
 
+    logger.info(
+        f"Making a recurring payment for subscription {subscription.id} with payment method {payment_method.id}"
+    )
+    payment_gateway = get_order_gateway(order)
+    payment = await payment_gateway.create_recurring_payment(order)
+
+    await finalize_payment(order, payment)
+    logger.info(
+        f"Recurring payment for subscription {subscription.id} created successfully: "
+        f"Payment {payment.id} / Order {order.id}"
+    )
+
 
 @service_router.post("/subscription/{subscription_id}/deactivate", status_code=200)
-async def deactivate_subscription(
-    subscription_id: str,
-    roles_service: RolesService = Depends(get_roles_service),
-):
+async def deactivate_subscription(subscription_id: str):
     """Subscription deactivating by service applications"""
     subscription = await SubscriptionRepository.get(subscription_id)
     if not subscription:
@@ -205,18 +187,52 @@ async def deactivate_subscription(
     logger.info(f"Deactivating subscription {subscription.id}.")
     async with in_transaction():
         await SubscriptionRepository.deactivate(subscription_id)
+        # The role is revoked by the outbox dispatcher after the commit
+        await RoleOutboxRepository.enqueue(
+            subscription.user_id, subscription.product.role_id, RoleAction.REVOKE
+        )
+
+    role_outbox_dispatcher.wake()
+    logger.info(f"Subscription {subscription_id} was deactivated successfully")
+
+
+@service_router.post(
+    "/subscriptions/activate",
+    response_model=List[SubscriptionUpdateOut],
+    status_code=200,
+)
+async def activate_subscriptions_batch(subscriptions: SubscriptionIdsIn):
+    """Change state of many subscriptions to `active`."""
+    return await activate_subscriptions(
+        [str(subscription_id) for subscription_id in subscriptions.subscription_ids]
+    )
+
+
+@service_router.post(
+    "/subscriptions/recurring_payment",
+    response_model=List[SubscriptionUpdateOut],
+    status_code=200,
+)
+async def withdraw_subscriptions_price_batch(subscriptions: SubscriptionIdsIn):
+    """Recurring payments for many subscriptions created by service applications"""
+    return await withdraw_subscriptions_price(
+        [str(subscription_id) for subscription_id in subscriptions.subscription_ids]
+    )
+
+
+@service_router.post(
+    "/subscriptions/deactivate",
+    response_model=List[SubscriptionUpdateOut],
+    status_code=200,
+)
+async def deactivate_subscriptions_batch(subscriptions: SubscriptionIdsIn):
+    """Many subscriptions deactivating by service applications"""
+    return await deactivate_subscriptions(
+        [str(subscription_id) for subscription_id in subscriptions.subscription_ids]
+    )
 
-        try:
-            await roles_service.revoke_role(
-                subscription.user_id, subscription.product.role_id
-            )
-        except RoleServiceNotFoundError as e:
-            logger.error(
-                f"User {subscription.user_id} or role {subscription.product.role_id} not found"
-                f"Auth service response: {e.msg}"
-            )
-            raise HTTPException(
-                status.HTTP_404_NOT_FOUND, detail=USER_OR_ROLE_NOT_FOUND
-            )
 
-        logger.info(f"Subscription {subscription_id} was deactivated successfully")
+@service_router.get("/gateways/health", status_code=200)
+async def get_gateways_health():
+    """Payment gateways state getting by service applications."""
+    return gateway_registry.health()
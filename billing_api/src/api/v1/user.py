@@ -2,14 +2,14 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import parse_obj_as
-from src.clients import get_payment_gateway
-from src.core.settings import logger
+from src.clients import gateway_router, get_order_gateway
+from src.core.settings import logger, settings
 from src.db.models import PaymentMethods, Products
+from src.db.repositories.billing import BillingRepository
 from src.db.repositories.order import OrderRepository
 from src.db.repositories.payment_method import PaymentMethodRepository
-from src.db.repositories.product import ProductRepository
 from src.db.repositories.subscription import SubscriptionRepository
 from src.models.api import (
     PaymentInfoIn,
@@ -31,11 +31,31 @@ from src.resources.error_messages import (
     USER_HAS_SUBSCRIPTION,
 )
 from src.services.auth import AuthorizedUser, get_user
+from src.services.catalog import product_catalog
+from src.services.orders import finalize_payment, finalize_refund
+from src.utils.etag import check_etag, make_etag
 from src.utils.refund import calculate_refund_amount
+from src.utils.responses import fast_response
 from tortoise.transactions import in_transaction
 
 user_router = APIRouter(prefix="/user", tags=["user"])
 
+# Products change rarely and are the same for all users
+PRODUCTS_CACHE_CONTROL = "private, max-age=60"
+# Account data is revalidated on every request, unchanged data is answered with 304
+ACCOUNT_CACHE_CONTROL = "private, no-cache"
+
+FAST_RESPONSES = settings.user_api.fast_responses
+
+# Fields of output models read from rows by the fast responses
+PRODUCT_FIELDS = tuple(ProductOut.schema()["properties"])
+PAYMENT_METHOD_FIELDS = tuple(PaymentMethodOut.schema()["properties"])
+SUBSCRIPTION_FIELDS = tuple(SubscriptionOut.schema()["properties"])
+
+
+def _get_product_row(product: Products) -> dict:
+    return {field: getattr(product, field) for field in PRODUCT_FIELDS}
+
 
 @user_router.post("/payment", response_model=PaymentInfoOut)
 async def create_payment(
@@ -49,14 +69,14 @@ async def create_payment(
         )
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=UNAUTHORIZED_USER)
 
-    subscription = await SubscriptionRepository.get_user_subscription(user.id)
-    if subscription:
+    snapshot = await BillingRepository.get_snapshot(user.id)
+    if snapshot.subscription:
         logger.debug(
             f"Error while making a payment. User {user.id} already has an active subscription"
         )
         raise HTTPException(status.HTTP_409_CONFLICT, detail=USER_HAS_SUBSCRIPTION)
 
-    unpaid_order = await OrderRepository.get_unpaid_order(user.id)
+    unpaid_order = snapshot.unpaid_order
     if unpaid_order:
         if unpaid_order.state == OrderState.PROCESSING:
             logger.debug(
@@ -72,7 +92,7 @@ async def create_payment(
             )
             raise HTTPException(status.HTTP_409_CONFLICT, detail=USER_HAS_DRAFT_ORDER)
 
-    product = await ProductRepository.get_by_id(payment_info_in.product_id)
+    product = await product_catalog.get(payment_info_in.product_id)
     if not product:
         logger.debug(
             f"Error while making a payment for user {user.id}. Product not found"
@@ -97,18 +117,19 @@ async def create_payment(
         )
         logger.debug(f"Order {order.id} created successfully for user {user.id}")
 
-        payment_gateway = get_payment_gateway(payment_info_in.payment_system)
-        payment = await payment_gateway.create_payment(order)
-
-        logger.debug(
-            f"Payment {payment.id} created successfully for user {user.id} using {payment_info_in.payment_system}"
-        )
-        await OrderRepository.update(
-            order.id, external_id=payment.id, state=payment.state
-        )
-        logger.debug(
-            f"Order {order.id} updated state to {payment.state} and now has external id {payment.id}"
-        )
+    # The order is committed before the payment gateway call, so no database
+    # connection is held while waiting for the gateway
+    try:
+        gateway, payment = await gateway_router.create_payment(order)
+    except Exception:
+        await BillingRepository.discard_unsent_order(order)
+        logger.info(f"Order {order.id} and subscription {subscription.id} are deleted.")
+        raise
+
+    logger.debug(
+        f"Payment {payment.id} created successfully for user {user.id} using {gateway}"
+    )
+    await finalize_payment(order, payment, gateway)
 
     return PaymentInfoOut(
         client_secret=payment.client_secret,
@@ -132,7 +153,7 @@ async def get_draft_order(
         )
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail=USER_HAS_NO_UNPAID_ORDERS)
 
-    payment_gateway = get_payment_gateway(unpaid_order.payment_system)
+    payment_gateway = get_order_gateway(unpaid_order)
     payment = await payment_gateway.get_payment(unpaid_order)
 
     logger.debug(f"Draft order returned successfully for user {user.id}.")
@@ -144,6 +165,8 @@ async def get_draft_order(
 
 @user_router.get("/payment_methods", response_model=List[PaymentMethodOut])
 async def get_payment_methods(
+    request: Request,
+    response: Response,
     user: AuthorizedUser = Depends(get_user),
 ):
     """ Payment methods getting by user """
@@ -151,6 +174,20 @@ async def get_payment_methods(
         logger.debug("Error while trying to access payment methods. Unauthorized user.")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=UNAUTHORIZED_USER)
 
+    version = await PaymentMethodRepository.get_user_payment_methods_version(user.id)
+    not_modified = check_etag(
+        request, response, make_etag(*version), ACCOUNT_CACHE_CONTROL
+    )
+    if not_modified:
+        return not_modified
+
+    if FAST_RESPONSES:
+        rows = await PaymentMethodRepository.get_user_payment_methods_rows(
+            user.id,
+            *PAYMENT_METHOD_FIELDS,
+        )
+        return fast_response(PaymentMethodOut, rows, response, many=True)
+
     payment_methods: List[
         PaymentMethods
     ] = await PaymentMethodRepository.get_user_payment_methods(user.id)
@@ -160,6 +197,8 @@ async def get_payment_methods(
 
 @user_router.get("/products", response_model=List[ProductOut], status_code=200)
 async def get_products(
+    request: Request,
+    response: Response,
     user: AuthorizedUser = Depends(get_user),
 ):
     """ Products list getting by user """
@@ -167,12 +206,22 @@ async def get_products(
         logger.debug("Error while trying to access products. Unauthorized user.")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=UNAUTHORIZED_USER)
 
-    products: List[Products] = await ProductRepository.get_active_products()
+    products: List[Products] = await product_catalog.get_active()
+    etag = make_etag(*((product.id, product.modified) for product in products))
+    not_modified = check_etag(request, response, etag, PRODUCTS_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    if FAST_RESPONSES:
+        rows = [_get_product_row(product) for product in products]
+        return fast_response(ProductOut, rows, response, many=True)
     return parse_obj_as(List[ProductOut], products)
 
 
 @user_router.get("/subscription", response_model=SubscriptionOut, status_code=200)
 async def get_subscription(
+    request: Request,
+    response: Response,
     user: AuthorizedUser = Depends(get_user),
 ):
     """ Subscription info getting by user """
@@ -180,7 +229,8 @@ async def get_subscription(
         logger.debug("Error while trying to access subscription. Unauthorized user.")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=UNAUTHORIZED_USER)
 
-    subscription = await SubscriptionRepository.get_user_subscription(user.id)
+    snapshot = await BillingRepository.get_snapshot(user.id)
+    subscription = snapshot.subscription
     if not subscription:
         logger.debug(
             f"Error while trying to access subscription. User {user.id} has no active subscriptions."
@@ -189,6 +239,17 @@ async def get_subscription(
             status.HTTP_404_NOT_FOUND, detail=ACTIVE_SUBSCRIPTION_NOT_FOUND
         )
 
+    etag = make_etag(
+        subscription.id, subscription.modified, subscription.product.modified
+    )
+    not_modified = check_etag(request, response, etag, ACCOUNT_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    if FAST_RESPONSES:
+        row = {field: getattr(subscription, field) for field in SUBSCRIPTION_FIELDS}
+        row["product"] = _get_product_row(subscription.product)
+        return fast_response(SubscriptionOut, row, response)
     return parse_obj_as(SubscriptionOut, subscription)
 
 
@@ -253,17 +314,13 @@ async def refund_subscription(
     logger.info(
         f"Making a refund for user {user.id} / subscription {subscription.id} / {order.id}"
     )
-    async with in_transaction():
+    # A refund order left by a failed attempt is sent again with its idempotency key
+    refund_order = await OrderRepository.get_pending_refund_order(subscription.id)
+    if not refund_order:
         refund_order = await OrderRepository.create_refund_order(order, refund_amount)
-
-        payment_gateway = get_payment_gateway(refund_order.payment_system)
-        refund = await payment_gateway.create_refund(refund_order)
-
-        await OrderRepository.update(
-            refund_order.id, external_id=refund.id, state=refund.state
-        )
         logger.info(f"Successfully created a refund order {refund_order.id}")
 
-        await SubscriptionRepository.to_deactivate(refund_order.subscription.id)
+    payment_gateway = get_order_gateway(refund_order)
+    refund = await payment_gateway.create_refund(refund_order)
 
-        logger.info(f"Subscription {subscription.id} is going to be deactivated soon")
+    await finalize_refund(refund_order, refund)
@@ -0,0 +1,50 @@
+"""Module with payment systems webhook API paths definition"""
+
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, status
+from src.clients import gateway_registry
+from src.clients.exceptions import InvalidEventError
+from src.db.repositories.order import OrderRepository
+from src.models.common import OrderState
+from src.resources.error_messages import GATEWAY_NOT_FOUND, INVALID_PAYMENT_EVENT
+from src.services.orders import apply_order_state
+
+webhook_router = APIRouter(prefix="/webhook", tags=["webhook"])
+
+logger = logging.getLogger(__name__)
+
+
+@webhook_router.post("/{gateway}", status_code=200)
+async def receive_payment_event(gateway: str, request: Request):
+    """Order state updating by payment gateway events."""
+    try:
+        gateway_settings = gateway_registry.get_settings(gateway)
+    except ValueError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail=GATEWAY_NOT_FOUND)
+
+    payment_gateway = gateway_registry.get(gateway_settings.name)
+    payload = await request.body()
+    try:
+        event = await payment_gateway.parse_event(payload, request.headers)
+    except InvalidEventError as e:
+        logger.warning(f"Rejected {gateway} event: {e}")
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=INVALID_PAYMENT_EVENT)
+
+    if not event:
+        return
+
+    order = await OrderRepository.get_by_external_id(
+        gateway_settings.payment_system, event.external_id, event.is_refund
+    )
+    if not order:
+        logger.info(
+            f"Order for {gateway} event {event.id} / {event.external_id} not found."
+        )
+        return
+
+    if order.state in (OrderState.PAID, event.state):
+        return
+
+    logger.info(f"Updating order {order.id} by {gateway} event {event.id}.")
+    await apply_order_state(order, event.state, payment_gateway, event.payment_method)
@@ -1,16 +1,23 @@
 from src.clients.abstract import AbstractClientAdapter
+from src.clients.registry import GatewayRegistry
+from src.clients.router import GatewayRouter
 from src.clients.stripe_adapter import get_stripe_adapter
+from src.core.settings import settings
+from src.db.models import Orders
 from src.models.common import PaymentSystem
 
-_MAPPING = {
-    PaymentSystem.STRIPE: get_stripe_adapter,
-}
+gateway_registry = GatewayRegistry(
+    {
+        PaymentSystem.STRIPE: get_stripe_adapter,
+    },
+    settings.routing.gateways,
+)
+gateway_router = GatewayRouter(gateway_registry)
 
 
 def get_payment_gateway(payment_system: PaymentSystem) -> AbstractClientAdapter:
-    client = _MAPPING.get(payment_system, None)
-    if not client:
-        raise ValueError(
-            f"Could not find a client for the payment system '{payment_system}'"
-        )
-    return client()
+    return gateway_registry.get(payment_system)
+
+
+def get_order_gateway(order: Orders) -> AbstractClientAdapter:
+    return gateway_registry.get_for_order(order)
@@ -1,12 +1,65 @@
 """Module with abstract client adapter definition"""
 
 import abc
+import asyncio
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
 
+from src.core.settings import settings
 from src.db.models import Orders
-from src.models.common import OrderState, Payment, PaymentMethod, Refund
+from src.models.common import (
+    OrderState,
+    Payment,
+    PaymentDetails,
+    PaymentEvent,
+    PaymentMethod,
+    Refund,
+)
+
+logger = logging.getLogger(__name__)
+
+StatusGetter = Callable[[Orders], Awaitable[OrderState]]
+
+STATUS_CONCURRENCY = settings.orders.status_concurrency
+
+
+async def _get_status(
+    semaphore: asyncio.Semaphore, get_status: StatusGetter, order: Orders
+) -> OrderState:
+    async with semaphore:
+        return await get_status(order)
 
 
 class AbstractClientAdapter:
+    # Exceptions meaning that the payment gateway is unavailable
+    failure_exceptions: Tuple[Type[BaseException], ...] = ()
+
+    async def start(self) -> None:
+        """Prepare adapter resources, e.g. open connection pools"""
+        pass
+
+    async def close(self) -> None:
+        """Release adapter resources"""
+        pass
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Get adapter state to be displayed in health reports
+
+        @return: `dict` with adapter specific state
+        """
+        return {}
+
     @abc.abstractmethod
     async def get_payment_status(self, order: Orders, **kwargs) -> OrderState:
         pass
@@ -23,6 +76,79 @@ class AbstractClientAdapter:
     async def get_refund_status(self, order: Orders, **kwargs) -> OrderState:
         pass
 
+    async def get_payment_details(self, order: Orders, **kwargs) -> PaymentDetails:
+        """
+        Get payment state with the payment method of paid order made by user
+
+        @note: the default realization requests the payment method separately
+        @param order: class `Orders` instance with payment data
+        @return: class `PaymentDetails` instance
+        """
+        state = await self.get_payment_status(order, **kwargs)
+        payment_method = None
+        if state == OrderState.PAID and not order.is_automatic:
+            payment_method = await self.get_payment_method(order, **kwargs)
+        return PaymentDetails(state=state, payment_method=payment_method)
+
+    async def get_payment_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        """
+        Get payment statuses of many orders
+
+        @note: the default realization requests every order separately
+        @param orders: list of class `Orders` instances with payment data
+        @return: order identifier to order state mapping, failed orders are skipped
+        """
+        return await self.gather_statuses(orders, self.get_payment_status)
+
+    async def get_refund_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        """
+        Get refund statuses of many orders
+
+        @note: the default realization requests every order separately
+        @param orders: list of class `Orders` instances with refund data
+        @return: order identifier to order state mapping, failed orders are skipped
+        """
+        return await self.gather_statuses(orders, self.get_refund_status)
+
+    @staticmethod
+    async def gather_statuses(
+        orders: List[Orders],
+        get_status: StatusGetter,
+        reraise: Tuple[Type[BaseException], ...] = (),
+        concurrency: int = STATUS_CONCURRENCY,
+    ) -> Dict[str, OrderState]:
+        """
+        Get statuses of orders one by one concurrently
+
+        @param orders: list of class `Orders` instances
+        @param get_status: coroutine function getting status of an order
+        @param reraise: exceptions to be raised instead of skipping the failed order
+        @param concurrency: maximum number of concurrent requests
+        @return: order identifier to order state mapping, failed and unknown orders are skipped
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(
+            *(_get_status(semaphore, get_status, order) for order in orders),
+            return_exceptions=True,
+        )
+        statuses = {}
+        for order, result in zip(orders, results):
+            if isinstance(result, reraise):
+                raise result
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to get status of order {order.id}: {result!r}")
+            elif result:
+                statuses[str(order.id)] = result
+        return statuses
+
     @abc.abstractmethod
     async def create_refund(self, order: Orders, **kwargs) -> Refund:
         pass
@@ -34,3 +160,12 @@ class AbstractClientAdapter:
     @abc.abstractmethod
     async def get_payment(self, order: Orders, **kwargs) -> Payment:
         pass
+
+    @abc.abstractmethod
+    async def parse_event(
+        self,
+        payload: bytes,
+        headers: Mapping[str, str],
+        **kwargs,
+    ) -> Optional[PaymentEvent]:
+        pass
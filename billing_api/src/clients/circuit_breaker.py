@@ -0,0 +1,156 @@
+"""Module with circuit breaker definition for payment gateway calls"""
+
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD = settings.circuit_breaker.failure_threshold
+RECOVERY_TIMEOUT = settings.circuit_breaker.recovery_timeout
+HALF_OPEN_MAX_CALLS = settings.circuit_breaker.half_open_max_calls
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states enum"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreakerOpenError(Exception):
+    """Exception for the case where calls are rejected by an open circuit breaker"""
+
+    def __init__(self, name: str, retry_after: float, *args):
+        super().__init__(*args)
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Class to stop calling a degraded gateway and probe it before recovering"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (),
+        failure_threshold: int = FAILURE_THRESHOLD,
+        recovery_timeout: float = RECOVERY_TIMEOUT,
+        half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+    ):
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at: float = 0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """Property to get breaker state, an expired `open` state turns into `half_open`"""
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit breaker '{self.name}' is half-open.")
+        return self._state
+
+    def _before_call(self) -> None:
+        state = self.state
+        if state == CircuitState.OPEN:
+            retry_after = self.recovery_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitBreakerOpenError(self.name, retry_after)
+        if state == CircuitState.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitBreakerOpenError(self.name, self.recovery_timeout)
+            self._half_open_calls += 1
+
+    def _on_success(self) -> None:
+        if self._state == CircuitState.HALF_OPEN:
+            logger.info(f"Circuit breaker '{self.name}' is closed.")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+
+    def _on_failure(self) -> None:
+        self._failures += 1
+        if (
+            self._state == CircuitState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            logger.warning(
+                f"Circuit breaker '{self.name}' is open after {self._failures} failures."
+            )
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Call `func` through the breaker
+
+        @note: only `failure_exceptions` are counted as failures, any other exception
+        means the gateway has responded and is considered as a success
+        @param func: coroutine function to call
+        @return: `func` result
+        @raise:
+            - `CircuitBreakerOpenError`: if the breaker rejects the call
+        """
+        self._before_call()
+        recorded = False
+        try:
+            result = await func(*args, **kwargs)
+        except self.failure_exceptions:
+            recorded = True
+            self._on_failure()
+            raise
+        except Exception:
+            recorded = True
+            self._on_success()
+            raise
+        else:
+            recorded = True
+            self._on_success()
+        finally:
+            if not recorded and self._state == CircuitState.HALF_OPEN:
+                # The probe has been cancelled, release its slot
+                self._half_open_calls -= 1
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get breaker state to be displayed in health reports
+
+        @return: `dict` with breaker state and consecutive failures number
+        """
+        return {
+            "state": self.state.value,
+            "failures": self._failures,
+        }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(
+    name: str, failure_exceptions: Tuple[Type[BaseException], ...] = ()
+) -> CircuitBreaker:
+    """
+    Get process-wide circuit breaker by name, it is created on the first call
+
+    @param name: breaker name, e.g. `stripe:read`
+    @param failure_exceptions: exceptions to be counted as gateway failures
+    @return: class `CircuitBreaker` instance
+    """
+    breaker = _BREAKERS.get(name)
+    if not breaker:
+        breaker = CircuitBreaker(name, failure_exceptions=failure_exceptions)
+        _BREAKERS[name] = breaker
+    return breaker
@@ -0,0 +1,5 @@
+"""Module with common client exceptions definitions"""
+
+
+class InvalidEventError(Exception):
+    """Exception for the case where a payment system event can not be trusted"""
@@ -0,0 +1,215 @@
+"""Module with client adapter proxy guarding payment gateway calls"""
+
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from src.core.metrics import GATEWAY_CALL_DURATION, GATEWAY_CALLS_IN_FLIGHT
+from src.db.models import Orders
+from src.models.common import (
+    OrderState,
+    Payment,
+    PaymentDetails,
+    PaymentEvent,
+    PaymentMethod,
+    Refund,
+)
+
+from .abstract import AbstractClientAdapter
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    get_circuit_breaker,
+)
+from .stats import LatencyWindow
+
+READ = "read"
+WRITE = "write"
+# Call outcomes
+SUCCESS = "success"
+FAILURE = "failure"
+ERROR = "error"
+REJECTED = "rejected"
+CANCELLED = "cancelled"
+# Bulk calls durations depend on the batch size, so they do not describe gateway latency
+UNTIMED_METHODS = frozenset(("get_payment_statuses", "get_refund_statuses"))
+
+
+class GatewayCallGuard:
+    """Class to call gateway methods through per endpoint class circuit breakers and to measure the calls"""
+
+    def __init__(self, name: str, failure_exceptions: Tuple[Type[BaseException], ...]):
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.stats = LatencyWindow()
+        self.breakers: Dict[str, CircuitBreaker] = {
+            endpoint: get_circuit_breaker(
+                f"{name}:{endpoint}", failure_exceptions=failure_exceptions
+            )
+            for endpoint in (READ, WRITE)
+        }
+
+    async def call(
+        self,
+        endpoint: str,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Call adapter method through the breaker of its endpoint class
+
+        @param endpoint: endpoint class, `read` or `write`
+        @param func: adapter method
+        @return: adapter method result
+        @raise:
+            - `CircuitBreakerOpenError`: if the gateway endpoint class is unavailable
+        """
+        method = func.__name__
+        started = time.monotonic()
+        # Only the call cancellation is not caught by the handlers below
+        outcome = CANCELLED
+        try:
+            with GATEWAY_CALLS_IN_FLIGHT.labels(self.name, method).track_inprogress():
+                result = await self.breakers[endpoint].call(func, *args, **kwargs)
+        except CircuitBreakerOpenError:
+            outcome = REJECTED
+            raise
+        except self.failure_exceptions:
+            outcome = FAILURE
+            raise
+        except Exception:
+            outcome = ERROR
+            raise
+        else:
+            outcome = SUCCESS
+        finally:
+            duration = time.monotonic() - started
+            GATEWAY_CALL_DURATION.labels(self.name, method, outcome).observe(duration)
+            if outcome in (SUCCESS, FAILURE, ERROR) and method not in UNTIMED_METHODS:
+                self.stats.record(duration, failed=outcome == FAILURE)
+        return result
+
+
+class ClientAdapterProxy(AbstractClientAdapter):
+    """Class to call an adapter through a `GatewayCallGuard`"""
+
+    def __init__(self, name: str, adapter: AbstractClientAdapter):
+        self.name = name
+        self.adapter = adapter
+        self.failure_exceptions = adapter.failure_exceptions
+        self.guard = GatewayCallGuard(name, adapter.failure_exceptions)
+        self.stats = self.guard.stats
+        self.breakers = self.guard.breakers
+
+    async def start(self) -> None:
+        await self.adapter.start()
+
+    async def close(self) -> None:
+        await self.adapter.close()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "breakers": {
+                endpoint: breaker.snapshot()
+                for endpoint, breaker in self.breakers.items()
+            },
+            "stats": self.stats.snapshot(),
+            **self.adapter.health(),
+        }
+
+    async def get_payment_status(self, order: Orders, **kwargs) -> OrderState:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_payment_status,
+            order,
+            **kwargs,
+        )
+
+    async def create_payment(self, order: Orders, **kwargs) -> Payment:
+        return await self.guard.call(
+            WRITE,
+            self.adapter.create_payment,
+            order,
+            **kwargs,
+        )
+
+    async def create_recurring_payment(self, order: Orders, **kwargs) -> Payment:
+        return await self.guard.call(
+            WRITE,
+            self.adapter.create_recurring_payment,
+            order,
+            **kwargs,
+        )
+
+    async def get_refund_status(self, order: Orders, **kwargs) -> OrderState:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_refund_status,
+            order,
+            **kwargs,
+        )
+
+    async def get_payment_details(self, order: Orders, **kwargs) -> PaymentDetails:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_payment_details,
+            order,
+            **kwargs,
+        )
+
+    async def get_payment_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_payment_statuses,
+            orders,
+            **kwargs,
+        )
+
+    async def get_refund_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_refund_statuses,
+            orders,
+            **kwargs,
+        )
+
+    async def create_refund(self, order: Orders, **kwargs) -> Refund:
+        return await self.guard.call(WRITE, self.adapter.create_refund, order, **kwargs)
+
+    async def get_payment_method(self, order: Orders, **kwargs) -> PaymentMethod:
+        return await self.guard.call(
+            READ,
+            self.adapter.get_payment_method,
+            order,
+            **kwargs,
+        )
+
+    async def get_payment(self, order: Orders, **kwargs) -> Payment:
+        return await self.guard.call(READ, self.adapter.get_payment, order, **kwargs)
+
+    async def parse_event(
+        self,
+        payload: bytes,
+        headers: Mapping[str, str],
+        **kwargs,
+    ) -> Optional[PaymentEvent]:
+        # Events are pushed by the gateway, so there is no call to guard
+        return await self.adapter.parse_event(payload, headers, **kwargs)
@@ -0,0 +1,173 @@
+"""Module with client-side rate limiters for outbound payment gateway calls"""
+
+import abc
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from src.core.settings import settings
+from tortoise import Tortoise
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITER_BACKEND = settings.stripe.rate_limiter_backend
+RATE_LIMIT_LEASE = settings.stripe.rate_limit_lease
+
+_LEASE_QUERY = """
+    UPDATE rate_limits SET
+        tokens = LEAST(
+            $2::float8,
+            tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated)::float8 * $3::float8
+        ) - $4::float8,
+        updated = clock_timestamp()
+    WHERE name = $1 AND LEAST(
+        $2::float8,
+        tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated)::float8 * $3::float8
+    ) >= $4::float8
+    RETURNING tokens
+"""
+
+_INIT_QUERY = """
+    INSERT INTO rate_limits (name, tokens, updated) VALUES ($1, $2::float8, clock_timestamp())
+    ON CONFLICT (name) DO NOTHING
+"""
+
+
+class AbstractRateLimiter(abc.ABC):
+    """Abstract class for outbound requests rate limiter"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Property to get the lock lazily bound to the running event loop"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @abc.abstractmethod
+    async def acquire(self) -> None:
+        """Wait until the limiter allows one more request"""
+        pass
+
+    async def start(self) -> None:
+        """Prepare limiter resources"""
+        pass
+
+    async def close(self) -> None:
+        """Release limiter resources"""
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get limiter state to be displayed in health reports
+
+        @return: `dict` with limiter backend and its budget
+        """
+        return {
+            "backend": type(self).__name__,
+            "rate": self.rate,
+            "capacity": self.capacity,
+        }
+
+
+class TokenBucket(AbstractRateLimiter):
+    """In-process token bucket, its budget is not shared between workers"""
+
+    def __init__(self, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        refilled = self._tokens + (now - self._updated) * self.rate
+        self._tokens = min(self.capacity, refilled)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Take one token from the bucket
+
+        @note: waits for the bucket to be refilled if there are no tokens left
+        """
+        async with self.lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refill()
+        return {**super().snapshot(), "tokens": round(self._tokens, 2)}
+
+
+class PostgresTokenBucket(AbstractRateLimiter):
+    """Token bucket stored in Postgres to share one budget between all workers"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: float,
+        lease: int = 1,
+        connection_name: str = "default",
+    ):
+        super().__init__(rate, capacity)
+        self.name = name
+        self.lease = max(1, min(lease, int(capacity)))
+        self.connection_name = connection_name
+        self._leased = 0
+
+    async def start(self) -> None:
+        """Create the bucket row if it does not exist yet"""
+        connection = Tortoise.get_connection(self.connection_name)
+        await connection.execute_query(_INIT_QUERY, [self.name, self.capacity])
+
+    async def _lease(self) -> bool:
+        connection = Tortoise.get_connection(self.connection_name)
+        # Rows of `UPDATE ... RETURNING` are returned only by `execute_query_dict`
+        rows = await connection.execute_query_dict(
+            _LEASE_QUERY, [self.name, self.capacity, self.rate, self.lease]
+        )
+        if not rows:
+            return False
+        self._leased = self.lease
+        return True
+
+    async def acquire(self) -> None:
+        """
+        Take one token from the shared bucket
+
+        @note: tokens are leased from the database in batches of `lease` tokens
+        to avoid a database round trip for every outbound request
+        """
+        async with self.lock:
+            while not self._leased:
+                if not await self._lease():
+                    await asyncio.sleep(self.lease / self.rate)
+            self._leased -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**super().snapshot(), "name": self.name, "leased": self._leased}
+
+
+def create_rate_limiter(name: str, rate: float, capacity: float) -> AbstractRateLimiter:
+    """
+    Get rate limiter configured by the `STRIPE_RATE_LIMITER_BACKEND` setting
+
+    @param name: budget name, workers with the same name share one budget
+    @param rate: tokens added to the bucket per second
+    @param capacity: maximum number of tokens in the bucket
+    @return: class instance with `AbstractRateLimiter` interface
+    """
+    if RATE_LIMITER_BACKEND == "postgres":
+        return PostgresTokenBucket(name, rate, capacity, lease=RATE_LIMIT_LEASE)
+    if RATE_LIMITER_BACKEND == "local":
+        return TokenBucket(rate, capacity)
+    raise ValueError(f"Unknown rate limiter backend '{RATE_LIMITER_BACKEND}'")
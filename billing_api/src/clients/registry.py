@@ -0,0 +1,110 @@
+"""Module with payment gateway registry definition"""
+
+import logging
+from typing import Any, Callable, Dict, List, Union
+
+from src.core.settings import GatewaySettings
+from src.db.models import Orders
+from src.models.common import PaymentSystem
+
+from .abstract import AbstractClientAdapter
+from .proxy import ClientAdapterProxy
+
+logger = logging.getLogger(__name__)
+
+AdapterFactory = Callable[[GatewaySettings], AbstractClientAdapter]
+
+
+class GatewayRegistry:
+    """Class to own one adapter per payment gateway instance for the process lifetime"""
+
+    def __init__(
+        self,
+        factories: Dict[PaymentSystem, AdapterFactory],
+        gateways: List[GatewaySettings] = None,
+    ):
+        self.factories = factories
+        if not gateways:
+            # One gateway per payment system named after it
+            gateways = [
+                GatewaySettings(
+                    name=payment_system.value, payment_system=payment_system.value
+                )
+                for payment_system in factories
+            ]
+        self.gateways: Dict[str, GatewaySettings] = {
+            gateway.name: gateway for gateway in gateways
+        }
+        self._adapters: Dict[str, ClientAdapterProxy] = {}
+
+    def get_settings(self, name: str) -> GatewaySettings:
+        """
+        Get gateway instance settings
+
+        @param name: gateway name or payment system to get its first gateway
+        @return: class `GatewaySettings` instance
+        @raise:
+            - `ValueError`: if there is no gateway with the name
+        """
+        gateway = self.gateways.get(name)
+        if gateway:
+            return gateway
+        # Orders made before gateway instances are configured store the payment system only
+        for gateway in self.gateways.values():
+            if gateway.payment_system == name:
+                return gateway
+        raise ValueError(f"Could not find a client for the payment system '{name}'")
+
+    def get(self, name: Union[PaymentSystem, str]) -> ClientAdapterProxy:
+        """
+        Get payment gateway adapter, it is created on the first call
+
+        @param name: gateway name or payment system to get its first gateway
+        @return: adapter guarded by circuit breakers
+        @raise:
+            - `ValueError`: if there is no gateway with the name
+        """
+        if isinstance(name, PaymentSystem):
+            name = name.value
+        gateway = self.get_settings(name)
+
+        adapter = self._adapters.get(gateway.name)
+        if not adapter:
+            factory = self.factories.get(PaymentSystem(gateway.payment_system))
+            if not factory:
+                raise ValueError(
+                    f"Could not find a client for the payment system '{gateway.payment_system}'"
+                )
+            adapter = ClientAdapterProxy(gateway.name, factory(gateway))
+            self._adapters[gateway.name] = adapter
+        return adapter
+
+    def get_for_order(self, order: Orders) -> ClientAdapterProxy:
+        """
+        Get adapter of the gateway the order is made with
+
+        @param order: class `Orders` instance
+        @return: adapter guarded by circuit breakers
+        """
+        return self.get(order.gateway or order.payment_system)
+
+    async def start(self) -> None:
+        """Create adapters of all gateways and open their resources"""
+        for name in self.gateways:
+            await self.get(name).start()
+            logger.info(f"Payment gateway '{name}' started.")
+
+    async def close(self) -> None:
+        """Release resources of all created adapters"""
+        for name, adapter in self._adapters.items():
+            await adapter.close()
+            logger.info(f"Payment gateway '{name}' closed.")
+        self._adapters.clear()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Get state of created adapters
+
+        @return: gateway name to adapter state mapping
+        """
+        return {name: adapter.health() for name, adapter in self._adapters.items()}
@@ -0,0 +1,126 @@
+"""Module with payment gateway router definition"""
+
+import logging
+import random
+from typing import List, Tuple
+
+from src.core.settings import GatewaySettings, settings
+from src.db.models import Orders
+from src.models.common import Payment
+
+from .circuit_breaker import CircuitBreakerOpenError, CircuitState
+from .proxy import WRITE, ClientAdapterProxy
+from .registry import GatewayRegistry
+
+logger = logging.getLogger(__name__)
+
+MIN_SAMPLES = settings.routing.min_samples
+MAX_P99 = settings.routing.max_p99
+MAX_ERROR_RATE = settings.routing.max_error_rate
+
+
+class GatewayRouter:
+    """Class to choose payment gateway for new payments by live gateway measurements"""
+
+    def __init__(
+        self,
+        registry: GatewayRegistry,
+        min_samples: int = MIN_SAMPLES,
+        max_p99: float = MAX_P99,
+        max_error_rate: float = MAX_ERROR_RATE,
+    ):
+        self.registry = registry
+        self.min_samples = min_samples
+        self.max_p99 = max_p99
+        self.max_error_rate = max_error_rate
+
+    def is_healthy(self, adapter: ClientAdapterProxy) -> bool:
+        """
+        Check whether the gateway is fit for new payments
+
+        @note: gateways with too few calls in the window are considered healthy
+        @param adapter: gateway adapter
+        @return: `False` if the gateway rejects writes, its p99 or error rate is too high
+        """
+        if adapter.breakers[WRITE].state == CircuitState.OPEN:
+            return False
+        if adapter.stats.count < self.min_samples:
+            return True
+        p99 = adapter.stats.percentile(99) or 0
+        return p99 <= self.max_p99 and adapter.stats.error_rate <= self.max_error_rate
+
+    @staticmethod
+    def _shuffle_by_weight(gateways: List[GatewaySettings]) -> List[GatewaySettings]:
+        gateways = [gateway for gateway in gateways if gateway.weight > 0]
+        ordered = []
+        while gateways:
+            # Routing is not a security measure, pseudo-random choice is enough
+            gateway = random.choices(  # noqa: S311
+                gateways, weights=[gateway.weight for gateway in gateways]
+            )[0]
+            gateways.remove(gateway)
+            ordered.append(gateway)
+        return ordered
+
+    def candidates(self, payment_system: str, currency: str) -> List[str]:
+        """
+        Get gateways to try for a new payment in the order they are tried
+
+        @note: healthy gateways go first in weighted random order, degraded ones follow from
+        the fastest to the slowest
+        @param payment_system: payment system chosen by user
+        @param currency: payment currency code
+        @return: list of gateway names
+        """
+        currency = currency.lower()
+        eligible = [
+            gateway
+            for gateway in self.registry.gateways.values()
+            if gateway.payment_system == payment_system
+            and (not gateway.currencies or currency in gateway.currencies)
+        ]
+        healthy, degraded = [], []
+        for gateway in eligible:
+            adapter = self.registry.get(gateway.name)
+            if self.is_healthy(adapter):
+                healthy.append(gateway)
+            else:
+                degraded.append((adapter.stats.percentile(99) or 0, gateway))
+
+        degraded.sort(key=lambda item: item[0])
+        ordered = self._shuffle_by_weight(healthy) + [item[1] for item in degraded]
+        return [candidate.name for candidate in ordered]
+
+    async def create_payment(self, order: Orders, **kwargs) -> Tuple[str, Payment]:
+        """
+        Create payment with the best gateway, failing over to the next one if it is unavailable
+
+        @note: only payments confirmed by user are failed over, a payment left in a failed gateway
+        is not charged without the user
+        @param order: class `Orders` instance with payment data
+        @return: name of the gateway used and created payment data
+        @raise:
+            - `ValueError`: if there is no gateway for the payment system and currency
+            - `CircuitBreakerOpenError` or adapter failure exception: if all gateways failed
+        """
+        names = self.candidates(order.payment_system, order.payment_currency_code)
+        if not names:
+            raise ValueError(
+                f"Could not find a gateway for the payment system '{order.payment_system}' "
+                f"and currency '{order.payment_currency_code}'"
+            )
+
+        for name, next_name in zip(names, names[1:]):
+            adapter = self.registry.get(name)
+            retryable = (CircuitBreakerOpenError,) + tuple(adapter.failure_exceptions)
+            try:
+                return name, await adapter.create_payment(order, **kwargs)
+            except retryable as e:
+                logger.warning(
+                    f"Payment for order {order.id} failed with gateway '{name}': {e!r}, "
+                    f"failing over to '{next_name}'.",
+                )
+        # Failures of the last gateway are raised
+        last_name = names[-1]
+        last_adapter = self.registry.get(last_name)
+        return last_name, await last_adapter.create_payment(order, **kwargs)
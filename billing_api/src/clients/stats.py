@@ -0,0 +1,74 @@
+"""Module with live statistics of payment gateway calls"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from src.core.settings import settings
+
+WINDOW = settings.routing.window
+MAX_SAMPLES = 1000
+
+
+class LatencyWindow:
+    """Class to keep durations and outcomes of the calls made during the last `window` seconds"""
+
+    def __init__(self, window: float = WINDOW, max_samples: int = MAX_SAMPLES):
+        self.window = window
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=max_samples)
+
+    def record(self, duration: float, failed: bool = False) -> None:
+        """
+        Add call outcome
+
+        @param duration: call duration in seconds
+        @param failed: set to `True` if the gateway failed to handle the call
+        """
+        self._samples.append((time.monotonic(), duration, failed))
+
+    def _prune(self) -> None:
+        expired_before = time.monotonic() - self.window
+        while self._samples and self._samples[0][0] < expired_before:
+            self._samples.popleft()
+
+    @property
+    def count(self) -> int:
+        """Property to get the number of calls in the window"""
+        self._prune()
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Get call duration percentile
+
+        @param q: percentile from 0 to 100
+        @return: duration in seconds or `None` if there are no calls in the window
+        """
+        self._prune()
+        if not self._samples:
+            return None
+        durations = sorted(duration for _, duration, _ in self._samples)
+        index = max(0, math.ceil(q / 100 * len(durations)) - 1)
+        return durations[index]
+
+    @property
+    def error_rate(self) -> float:
+        """Property to get the share of failed calls in the window"""
+        self._prune()
+        if not self._samples:
+            return 0
+        return sum(failed for _, _, failed in self._samples) / len(self._samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get window statistics to be displayed in health reports
+
+        @return: `dict` with calls number, p50, p99 and error rate
+        """
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "error_rate": round(self.error_rate, 4),
+        }
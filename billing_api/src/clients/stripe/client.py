@@ -1,9 +1,22 @@
 """Module with Stripe client definition"""
 
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List
 from uuid import uuid4
 
 import backoff
+import orjson
 from aiohttp import ClientConnectorError, ClientSession, ServerConnectionError
+from src.clients.rate_limiter import AbstractRateLimiter, create_rate_limiter
+from src.core.http import SessionHolder
+from src.core.metrics import (
+    GATEWAY_REQUEST_DURATION,
+    GATEWAY_REQUESTS_IN_FLIGHT,
+    GATEWAY_RESPONSES,
+    GATEWAY_RETRIES,
+)
 from src.core.settings import settings
 
 from .exceptions import BadRequest, RequestFailed, TooManyRequests
@@ -16,19 +29,97 @@ from .models import (
     StripeRefund,
     StripeRefundInner,
 )
+from .utils.decoders import FAST_DECODE, decode_payment_intent, decode_refund
 from .utils.exception_handlers import handle_response
 
 BACKOFF_FACTOR = settings.backoff.factor
 BACKOFF_BASE = settings.backoff.base
 BACKOFF_MAX_VALUE = settings.backoff.max_value
+MAX_RETRY_TIME = settings.stripe.max_retry_time
+LIST_PAGE_SIZE = settings.stripe.list_page_size
+LIST_MAX_PAGES = settings.stripe.list_max_pages
+
+
+def create_session_holder(name: str) -> SessionHolder:
+    """
+    Get pooled session holder configured by the `STRIPE_*` pool settings
+
+    @param name: session name displayed in health reports
+    @return: class `SessionHolder` instance, its session is opened by the client start
+    """
+    return SessionHolder(
+        name,
+        limit=settings.stripe.pool_limit,
+        limit_per_host=settings.stripe.pool_limit_per_host,
+        keepalive_timeout=settings.stripe.keepalive_timeout,
+        dns_cache_ttl=settings.stripe.dns_cache_ttl,
+        timeout=settings.stripe.request_timeout,
+    )
+
+
+stripe_session = create_session_holder("stripe")
+stripe_read_limiter = create_rate_limiter(
+    "stripe_read", settings.stripe.read_rate, settings.stripe.read_burst
+)
+stripe_write_limiter = create_rate_limiter(
+    "stripe_write", settings.stripe.write_rate, settings.stripe.write_burst
+)
+
+
+def _on_backoff(details: dict) -> None:
+    """Count a retried request, called by `backoff` inside the exception handler"""
+    client, method, *_ = details["args"]
+    exception = sys.exc_info()[1]
+    GATEWAY_RETRIES.labels(
+        client.name,
+        method,
+        details["kwargs"].get("resource"),
+        type(exception).__name__,
+    ).inc()
 
 
 class StripeClient:
     """Class to interact with Stripe API"""
 
-    def __init__(self, url: str, api_key: str):
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        session_holder: SessionHolder = None,
+        read_limiter: AbstractRateLimiter = None,
+        write_limiter: AbstractRateLimiter = None,
+        name: str = "stripe",
+    ):
+        self.name = name
         self.url = url
         self.api_key = api_key
+        self.session_holder = session_holder or stripe_session
+        self.read_limiter = read_limiter or stripe_read_limiter
+        self.write_limiter = write_limiter or stripe_write_limiter
+
+    async def start(self) -> None:
+        """Open the pooled session and prepare rate limiters"""
+        await self.session_holder.start()
+        await self.read_limiter.start()
+        await self.write_limiter.start()
+
+    async def close(self) -> None:
+        """Release rate limiters and close the pooled session"""
+        await self.write_limiter.close()
+        await self.read_limiter.close()
+        await self.session_holder.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get client state to be displayed in health reports
+
+        @return: `dict` with session pool and rate limiters state
+        """
+        return {
+            "session": self.session_holder.snapshot(),
+            "read_limiter": self.read_limiter.snapshot(),
+            "write_limiter": self.write_limiter.snapshot(),
+        }
 
     @backoff.on_exception(
         backoff.expo,
@@ -36,6 +127,8 @@ class StripeClient:
         base=BACKOFF_BASE,
         factor=BACKOFF_FACTOR,
         max_value=BACKOFF_MAX_VALUE,
+        max_time=MAX_RETRY_TIME,
+        on_backoff=_on_backoff,
     )
     async def _request(
         self,
@@ -44,42 +137,100 @@ class StripeClient:
         params: dict = None,
         data: dict = None,
         headers: dict = None,
+        resource: str = None,
     ) -> HTTPResponse:
-        auth_header = {
+        headers = {
+            **(headers or {}),
             "Authorization": "Bearer %s" % self.api_key,
         }
-        async with ClientSession(headers=auth_header) as session:
-            async with session.request(
-                method, url, params=params, data=data, headers=headers
-            ) as resp:
-                http_response = HTTPResponse(
-                    status=resp.status,
-                    body=await resp.json(),
+        # Every attempt, retries included, is a request counted by Stripe,
+        # so every attempt takes a token from the budget
+        if method.upper() == "GET":
+            await self.read_limiter.acquire()
+        else:
+            await self.write_limiter.acquire()
+
+        started = time.monotonic()
+        try:
+            async with AsyncExitStack() as stack:
+                session = self.session_holder.session
+                if session is None:
+                    # Session is not started by the app lifecycle, e.g. in scripts
+                    session = await stack.enter_async_context(ClientSession())
+                stack.enter_context(
+                    GATEWAY_REQUESTS_IN_FLIGHT.labels(self.name).track_inprogress(),
+                )
+                resp = await stack.enter_async_context(
+                    session.request(
+                        method,
+                        url,
+                        params=params,
+                        data=data,
+                        headers=headers,
+                    ),
                 )
-                return handle_response(http_response)
+                GATEWAY_RESPONSES.labels(self.name, method, resource, resp.status).inc()
+                if FAST_DECODE:
+                    body = orjson.loads(await resp.read())
+                else:
+                    body = await resp.json()
+        finally:
+            GATEWAY_REQUEST_DURATION.labels(self.name, method, resource).observe(
+                time.monotonic() - started,
+            )
+        return handle_response(HTTPResponse(status=resp.status, body=body))
 
-    async def _get(self, entity: str, entity_id: str) -> HTTPResponse:
+    async def _list(
+        self, entity: str, params: dict, max_pages: int = LIST_MAX_PAGES
+    ) -> List[dict]:
+        """
+        Get objects from paginated list endpoint
+
+        @param entity: Stripe object name
+        @param params: list filters
+        @param max_pages: maximum number of requested pages
+        @return: objects from newest to oldest, the oldest ones may be cut by the pages limit
+        """
         method = "GET"
-        url = f"{self.url}/{entity}s/{entity_id}"
-        return await self._request(method, url)
+        url = f"{self.url}/{entity}s"
+        params = {**params, "limit": LIST_PAGE_SIZE}
+        objects = []
+        for _ in range(max_pages):
+            resp = await self._request(
+                method, url, params=params, resource=f"{entity}s"
+            )
+            page = resp.body["data"]
+            objects.extend(page)
+            if not resp.body.get("has_more") or not page:
+                break
+            params["starting_after"] = page[-1]["id"]
+        return objects
 
-    async def _create(self, entity: str, **kwargs) -> HTTPResponse:
+    async def _create(
+        self,
+        entity: str,
+        idempotency_key: str = None,
+        **kwargs,
+    ) -> HTTPResponse:
         method = "POST"
         headers = {
             "Content-Type": "application/x-www-form-urlencoded",
-            "Idempotency-Key": str(uuid4()),
+            "Idempotency-Key": idempotency_key or str(uuid4()),
         }
         url = f"{self.url}/{entity}s"
-        return await self._request(method, url, data=kwargs, headers=headers)
+        return await self._request(
+            method, url, data=kwargs, headers=headers, resource=f"{entity}s"
+        )
 
     async def create_customer(
-        self, user_id: str, email: str = None
+        self, user_id: str, email: str = None, idempotency_key: str = None
     ) -> StripeCustomerInner:
         """
         Create a customer
 
         @param user_id: user identifier in the Stripe payment system
         @param email: user email to send notifications
+        @param idempotency_key: key to make retries of the request safe
         @note: user identifier may be specified the same as database identifier for convenience
         @return: class `StripeCustomerInner` if customer is created or already exists
         @raise: exceptions from `exceptions.py` file
@@ -90,7 +241,11 @@ class StripeClient:
         )
 
         try:
-            await self._create("customer", **customer.dict())
+            await self._create(
+                "customer",
+                idempotency_key=idempotency_key,
+                **customer.dict(),
+            )
         except BadRequest as e:
             if e.response.body["error"]["code"] != "resource_already_exists":
                 raise e
@@ -105,11 +260,37 @@ class StripeClient:
         @return: class `StripePaymentIntent` instance
         @raise: exceptions from `exceptions.py` file
         """
-        resp = await self._get("payment_intent", payment_intent_id)
-        return StripePaymentIntent.parse_obj(resp.body)
+        resp = await self._request(
+            "GET",
+            f"{self.url}/payment_intents/{payment_intent_id}",
+            resource="payment_intents/{id}",
+        )
+        return decode_payment_intent(resp.body)
+
+    async def list_payments(
+        self, created_gte: int, customer_id: str = None
+    ) -> List[StripePaymentIntent]:
+        """
+        Get PaymentIntents created since the given time
+
+        @param created_gte: minimum creation time as Unix timestamp
+        @param customer_id: ID of the Customer to filter PaymentIntents by
+        @return: list of class `StripePaymentIntent` instances
+        @raise: exceptions from `exceptions.py` file
+        """
+        params: Dict[str, Any] = {"created[gte]": created_gte}
+        if customer_id:
+            params["customer"] = customer_id
+        objects = await self._list("payment_intent", params)
+        return [decode_payment_intent(data) for data in objects]
 
     async def create_payment(
-        self, customer_id: str, amount: int, currency: str, email: str
+        self,
+        customer_id: str,
+        amount: int,
+        currency: str,
+        email: str,
+        idempotency_key: str = None,
     ) -> StripePaymentIntent:
         """
         Creates a PaymentIntent object
@@ -118,6 +299,7 @@ class StripeClient:
         @param amount: Amount intended to be collected by this PaymentIntent
         @param currency: Three-letter ISO currency code, in lowercase
         @param email: Customer email to send notifications
+        @param idempotency_key: key to make retries of the request safe
         @return: class `StripePaymentIntent` instance
         @raise: exceptions from `exceptions.py` file
         """
@@ -133,8 +315,12 @@ class StripeClient:
         )
 
         data = {**payment.dict(), **metadata}
-        resp = await self._create("payment_intent", **data)
-        return StripePaymentIntent.parse_obj(resp.body)
+        resp = await self._create(
+            "payment_intent",
+            idempotency_key=idempotency_key,
+            **data,
+        )
+        return decode_payment_intent(resp.body)
 
     async def create_recurring_payment(
         self,
@@ -142,6 +328,7 @@ class StripeClient:
         amount: int,
         currency: str,
         payment_method_id: str,
+        idempotency_key: str = None,
     ) -> StripePaymentIntent:
         """
          Create recurring payment intent
@@ -150,6 +337,7 @@ class StripeClient:
         @param amount: Amount intended to be collected by this PaymentIntent
         @param currency: Three-letter ISO currency code, in lowercase
         @param payment_method_id: ID of the payment method to attach to this PaymentIntent
+        @param idempotency_key: key to make retries of the request safe
         @return: class `StripePaymentIntent` instance
         @raise: exceptions from `exceptions.py` file
         """
@@ -167,13 +355,17 @@ class StripeClient:
         data = {**payment.dict(), **metadata}
 
         try:
-            resp = await self._create("payment_intent", **data)
+            resp = await self._create(
+                "payment_intent",
+                idempotency_key=idempotency_key,
+                **data,
+            )
         except RequestFailed as e:
             payment_data = e.response.body["error"]["payment_intent"]
         else:
             payment_data = resp.body
 
-        return StripePaymentIntent.parse_obj(payment_data)
+        return decode_payment_intent(payment_data)
 
     async def get_refund(self, refund_id: str) -> StripeRefund:
         """
@@ -183,16 +375,40 @@ class StripeClient:
         @return: class `StripeRefund` instance if a valid ID was provided, raise an exception otherwise
         @raise: exceptions from `exceptions.py` file
         """
-        resp = await self._get("refund", refund_id)
-        return StripeRefund.parse_obj(resp.body)
+        resp = await self._request(
+            "GET",
+            f"{self.url}/refunds/{refund_id}",
+            resource="refunds/{id}",
+        )
+        return decode_refund(resp.body)
+
+    async def list_refunds(
+        self, created_gte: int, payment_intent_id: str = None
+    ) -> List[StripeRefund]:
+        """
+        Get refunds created since the given time
+
+        @param created_gte: minimum creation time as Unix timestamp
+        @param payment_intent_id: ID of the PaymentIntent to filter refunds by
+        @return: list of class `StripeRefund` instances
+        @raise: exceptions from `exceptions.py` file
+        """
+        params: Dict[str, Any] = {"created[gte]": created_gte}
+        if payment_intent_id:
+            params["payment_intent"] = payment_intent_id
+        objects = await self._list("refund", params)
+        return [decode_refund(data) for data in objects]
 
-    async def create_refund(self, payment_intent_id: str, amount: int) -> StripeRefund:
+    async def create_refund(
+        self, payment_intent_id: str, amount: int, idempotency_key: str = None
+    ) -> StripeRefund:
         """
         Create a refund
 
         @param payment_intent_id: ID of the PaymentIntent to refund
         @param amount: a positive integer in cents representing how much of this charge to refund,
         can refund only up to the remaining, unrefunded amount of the charge
+        @param idempotency_key: key to make retries of the request safe
         @return: class `StripeRefund` instance if the refund succeeded, raise an exception if the PaymentIntent
         has already been refunded, or if an invalid identifier was provided
         @raise: exceptions from `exceptions.py` file
@@ -202,5 +418,9 @@ class StripeClient:
             amount=amount,
         )
 
-        resp = await self._create("refund", **refund.dict())
-        return StripeRefund.parse_obj(resp.body)
+        resp = await self._create(
+            "refund",
+            idempotency_key=idempotency_key,
+            **refund.dict(),
+        )
+        return decode_refund(resp.body)
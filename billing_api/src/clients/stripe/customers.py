@@ -0,0 +1,76 @@
+"""Module with Stripe customers lookup definition"""
+
+from typing import Dict, List, Optional
+
+from src.core.settings import settings
+from src.db.models import Orders
+from src.db.repositories.customer import CustomerRepository
+from src.utils.cache import LRUCache
+
+from .client import StripeClient
+
+CUSTOMER_CACHE_SIZE = settings.stripe.customer_cache_size
+
+
+class StripeCustomers:
+    """Class to find Stripe customers of users, creating them in Stripe only once"""
+
+    def __init__(
+        self,
+        client: StripeClient,
+        name: str,
+        cache_size: int = CUSTOMER_CACHE_SIZE,
+    ):
+        self.client = client
+        # Stripe account name, customers are stored per account
+        self.name = name
+        # User identifier to Stripe customer identifier
+        self.known = LRUCache(cache_size)
+
+    def stats(self) -> Dict[str, int]:
+        return self.known.stats()
+
+    async def get_id(self, order: Orders) -> str:
+        """
+        Get Stripe customer of the order user
+
+        @note: customer is created in Stripe only if it is not known locally
+        @param order: class `Orders` instance with user data
+        @return: customer identifier in Stripe
+        """
+        user_id = str(order.user_id)
+        customer_id = self.known.get(user_id)
+        if customer_id:
+            return customer_id
+
+        customer = await CustomerRepository.get(user_id, self.name)
+        if not customer:
+            stripe_customer = await self.client.create_customer(
+                user_id,
+                order.user_email,
+            )
+            customer = await CustomerRepository.create(
+                user_id,
+                self.name,
+                stripe_customer.id,
+            )
+
+        self.known.set(user_id, customer.external_id)
+        return customer.external_id
+
+    async def get_shared_id(self, orders: List[Orders]) -> Optional[str]:
+        """
+        Get Stripe customer shared by all orders
+
+        @param orders: list of class `Orders` instances
+        @return: customer identifier in Stripe if all orders belong to one known customer
+        """
+        user_ids = {str(order.user_id) for order in orders}
+        if len(user_ids) != 1:
+            return None
+        user_id = user_ids.pop()
+        customer_id = self.known.get(user_id)
+        if customer_id:
+            return customer_id
+        customer = await CustomerRepository.get(user_id, self.name)
+        return customer.external_id if customer else None
@@ -0,0 +1,89 @@
+"""Module with decoders of Stripe API responses to client models"""
+
+from src.clients.stripe.models import (
+    Charge,
+    Charges,
+    Metadata,
+    StripeChargeStatus,
+    StripePaymentIntent,
+    StripePaymentStatus,
+    StripeRefund,
+)
+from src.core.settings import settings
+
+FAST_DECODE = settings.stripe.fast_decode
+
+_TRUE_VALUES = frozenset(("1", "true", "True", 1, True))
+
+
+def construct_payment_intent(data: dict) -> StripePaymentIntent:
+    """
+    Build payment intent model without validation
+
+    @note: only the fields read by the adapter are projected, the response is trusted
+    @param data: PaymentIntent object from Stripe API response
+    @return: class `StripePaymentIntent` instance
+    """
+    charges = (data.get("charges") or {}).get("data") or ()
+    metadata = data.get("metadata") or {}
+    return StripePaymentIntent.construct(
+        id=data["id"],
+        client_secret=data.get("client_secret"),
+        status=StripePaymentStatus(data["status"]),
+        charges=Charges.construct(
+            data=[
+                Charge.construct(
+                    id=charge["id"],
+                    payment_method=charge.get("payment_method"),
+                    payment_method_details=charge.get("payment_method_details"),
+                    status=StripeChargeStatus(charge["status"]),
+                )
+                for charge in charges
+            ]
+        ),
+        metadata=Metadata.construct(
+            is_automatic=metadata.get("is_automatic") in _TRUE_VALUES
+        ),
+    )
+
+
+def construct_refund(data: dict) -> StripeRefund:
+    """
+    Build refund model without validation
+
+    @note: only the fields read by the adapter are projected, the response is trusted
+    @param data: Refund object from Stripe API response
+    @return: class `StripeRefund` instance
+    """
+    return StripeRefund.construct(
+        id=data["id"],
+        amount=data["amount"],
+        currency=data["currency"],
+        reason=data.get("reason"),
+        payment_intent=data["payment_intent"],
+        status=StripeChargeStatus(data["status"]),
+    )
+
+
+def decode_payment_intent(data: dict) -> StripePaymentIntent:
+    """
+    Decode payment intent with the mode configured by `STRIPE_FAST_DECODE` setting
+
+    @param data: PaymentIntent object from Stripe API response
+    @return: class `StripePaymentIntent` instance
+    """
+    if FAST_DECODE:
+        return construct_payment_intent(data)
+    return StripePaymentIntent.parse_obj(data)
+
+
+def decode_refund(data: dict) -> StripeRefund:
+    """
+    Decode refund with the mode configured by `STRIPE_FAST_DECODE` setting
+
+    @param data: Refund object from Stripe API response
+    @return: class `StripeRefund` instance
+    """
+    if FAST_DECODE:
+        return construct_refund(data)
+    return StripeRefund.parse_obj(data)
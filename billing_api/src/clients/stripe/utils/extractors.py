@@ -1,6 +1,10 @@
 """Module with data extractor from Stripe API responses"""
 import abc
 
+from src.models.common import PaymentMethod
+
+from ..models import StripePaymentIntent
+
 
 class AbcPMDExtractor(abc.ABC):
     """Abstract class for payment method data extractor"""
@@ -51,3 +55,25 @@ def get_pmd_extractor(pm_type: str) -> AbcPMDExtractor:
     if not extractor_cls:
         raise ValueError()
     return extractor_cls()
+
+
+def extract_payment_method(payment: StripePaymentIntent) -> PaymentMethod:
+    """
+    Extract payment method data from the last charge of payment intent
+
+    @param payment: class `StripePaymentIntent` instance with charges
+    @return: payment method data
+    """
+    charge = payment.charges.data[0]
+    payment_method = charge.payment_method_details
+
+    _id = charge.payment_method
+    _type = payment_method["type"]
+    pmd_extractor = get_pmd_extractor(_type)
+    data = pmd_extractor.extract(payment_method[_type])
+
+    return PaymentMethod(
+        id=_id,
+        type=_type,
+        data=data,
+    )
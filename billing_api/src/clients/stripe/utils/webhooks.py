@@ -0,0 +1,52 @@
+"""Module with Stripe webhook events verification"""
+
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+from src.clients.exceptions import InvalidEventError
+
+SIGNATURE_SCHEME = "v1"
+
+
+def verify_signature(
+    payload: bytes,
+    signature_header: Optional[str],
+    secret: str,
+    tolerance: float,
+) -> None:
+    """
+    Verify `Stripe-Signature` header of a webhook event
+
+    @param payload: raw request body
+    @param signature_header: value of `Stripe-Signature` header
+    @param secret: webhook endpoint signing secret
+    @param tolerance: maximum age of the event signature in seconds
+    @raise:
+        - `InvalidEventError`: if the signature is missing, invalid or expired
+    """
+    if not secret:
+        raise InvalidEventError("Webhook signing secret is not configured")
+    if not signature_header:
+        raise InvalidEventError("Signature header is missing")
+
+    timestamp = None
+    signatures = []
+    for item in signature_header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == SIGNATURE_SCHEME:
+            signatures.append(value)
+
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise InvalidEventError("Signature header is malformed")
+
+    signed_payload = b".".join((timestamp.encode(), payload))
+    expected = hmac.new(secret.encode(), signed_payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise InvalidEventError("Signature does not match the payload")
+
+    if tolerance and time.time() - int(timestamp) > tolerance:
+        raise InvalidEventError("Signature timestamp is outside the tolerance zone")
@@ -1,28 +1,146 @@
 """Module with Stripe client adapter definition"""
 
-from src.core.settings import settings
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import orjson
+from aiohttp import ClientError
+from src.core.settings import GatewaySettings, settings
 from src.db.models import Orders
-from src.models.common import OrderState, Payment, PaymentMethod, Refund
+from src.models.common import (
+    OrderState,
+    Payment,
+    PaymentDetails,
+    PaymentEvent,
+    PaymentMethod,
+    PaymentSystem,
+    Refund,
+)
+from src.utils.idempotency import get_idempotency_key, get_order_operation
 
-from .abstract import AbstractClientAdapter
-from .stripe.client import StripeClient
+from .abstract import AbstractClientAdapter, StatusGetter
+from .exceptions import InvalidEventError
+from .rate_limiter import create_rate_limiter
+from .stripe.client import StripeClient, create_session_holder
+from .stripe.exceptions import InternalError, TooManyRequests
+from .stripe.customers import StripeCustomers
 from .stripe.utils.converters import (
     convert_charge_status,
     convert_payment_state,
     convert_to_decimal,
     convert_to_int,
 )
-from .stripe.utils.extractors import get_pmd_extractor
+from .stripe.utils.decoders import decode_payment_intent, decode_refund
+from .stripe.utils.extractors import extract_payment_method
+from .stripe.utils.webhooks import verify_signature
+
+logger = logging.getLogger(__name__)
 
 STRIPE_URL = settings.stripe.url
 API_KEY = settings.stripe.api_key
+WEBHOOK_SECRET = settings.stripe.webhook_secret
+WEBHOOK_TOLERANCE = settings.stripe.webhook_tolerance
+LIST_MAX_WINDOW = settings.stripe.list_max_window
+# Clock skew between the database and Stripe tolerated by bulk listing
+LIST_CREATED_MARGIN = 300
+# Exceptions meaning that Stripe is unavailable
+FAILURE_EXCEPTIONS = (
+    InternalError,
+    TooManyRequests,
+    ClientError,
+    asyncio.TimeoutError,
+)
+
+
+def _get_idempotency_key(order: Orders) -> str:
+    """
+    Get idempotency key of the order remote operation
+
+    @param order: class `Orders` instance
+    @return: key stored with the order or derived from its identifier for older orders
+    """
+    if order.idempotency_key:
+        return order.idempotency_key
+    operation = get_order_operation(order.is_refund, order.is_automatic)
+    return get_idempotency_key(operation, order.id)
+
+
+def _get_created_gte(orders: List[Orders]) -> Optional[int]:
+    """
+    Get the earliest possible creation time of remote objects of orders
+
+    @note: remote objects are created after their orders
+    @param orders: list of class `Orders` instances
+    @return: Unix timestamp or `None` if the orders are too old to be listed
+    """
+    created = min(order.created for order in orders)
+    created_gte = int(created.timestamp()) - LIST_CREATED_MARGIN
+    if time.time() - created_gte > LIST_MAX_WINDOW:
+        return None
+    return created_gte
+
+
+async def _collect_statuses(
+    orders: List[Orders],
+    listed: Dict[str, Optional[OrderState]],
+    get_status: StatusGetter,
+) -> Dict[str, OrderState]:
+    """
+    Map listed remote statuses to orders, requesting the ones not listed separately
+
+    @note: gateway failures of separate requests are raised, so they reach the circuit breaker
+    @param orders: list of class `Orders` instances
+    @param listed: remote object identifier to order state mapping
+    @param get_status: coroutine function getting status of an order
+    @return: order identifier to order state mapping, failed and unknown orders are skipped
+    """
+    missing = [order for order in orders if order.external_id not in listed]
+    if missing:
+        logger.info(
+            f"{len(missing)} of {len(orders)} Stripe objects are not listed, "
+            "requesting them separately.",
+        )
+    statuses = await AbstractClientAdapter.gather_statuses(
+        missing,
+        get_status,
+        reraise=FAILURE_EXCEPTIONS,
+    )
+    for order in orders:
+        state = listed.get(order.external_id)
+        if state:
+            statuses[str(order.id)] = state
+    return statuses
 
 
 class StripeClientAdapter(AbstractClientAdapter):
     """Stripe adapter realization"""
 
-    def __init__(self, client: StripeClient):
+    failure_exceptions = FAILURE_EXCEPTIONS
+
+    def __init__(
+        self,
+        client: StripeClient,
+        name: str = PaymentSystem.STRIPE.value,
+        webhook_secret: str = WEBHOOK_SECRET,
+    ):
         self.client = client
+        self.name = name
+        self.webhook_secret = webhook_secret
+        self.customers = StripeCustomers(client, name)
+
+    async def start(self) -> None:
+        await self.client.start()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            **self.client.snapshot(),
+            "customer_cache": self.customers.stats(),
+        }
 
     async def get_payment_status(self, order: Orders, **kwargs) -> OrderState:
         """
@@ -35,6 +153,51 @@ class StripeClientAdapter(AbstractClientAdapter):
         payment = await self.client.get_payment(order.external_id)
         return convert_payment_state(payment)
 
+    async def get_payment_details(self, order: Orders, **kwargs) -> PaymentDetails:
+        """
+        Get Stripe payment status with payment method details from one payment intent retrieval
+
+        @param order: class `Orders` instance with payment data
+        @param kwargs: no kwargs is used
+        @return: class `PaymentDetails` instance
+        """
+        payment = await self.client.get_payment(order.external_id)
+        state = convert_payment_state(payment)
+        payment_method = None
+        if state == OrderState.PAID and payment.charges.data:
+            payment_method = extract_payment_method(payment)
+        return PaymentDetails(state=state, payment_method=payment_method)
+
+    async def get_payment_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        """
+        Get Stripe payment statuses of many orders by listing payment intents
+
+        @param orders: list of class `Orders` instances with payment data
+        @param kwargs: no kwargs is used
+        @return: order identifier to order state mapping, failed orders are skipped
+        """
+        orders = [order for order in orders if order.external_id]
+        if not orders:
+            return {}
+
+        created_gte = _get_created_gte(orders)
+        if created_gte is None:
+            return await _collect_statuses(orders, {}, self.get_payment_status)
+
+        payments = await self.client.list_payments(
+            created_gte,
+            customer_id=await self.customers.get_shared_id(orders),
+        )
+        # Payment intents in states without a common order state are skipped
+        listed: Dict[str, Optional[OrderState]] = {
+            payment.id: convert_payment_state(payment) for payment in payments
+        }
+        return await _collect_statuses(orders, listed, self.get_payment_status)
+
     async def create_payment(self, order: Orders, **kwargs) -> Payment:
         """
         Get Stripe payment intent
@@ -43,15 +206,13 @@ class StripeClientAdapter(AbstractClientAdapter):
         @param kwargs: no kwargs is used
         @return: created payment data
         """
-        customer = await self.client.create_customer(
-            str(order.user_id),
-            order.user_email,
-        )
+        customer_id = await self.customers.get_id(order)
         stripe_payment = await self.client.create_payment(
-            customer.id,
+            customer_id,
             convert_to_int(order.payment_amount),
             order.payment_currency_code,
             order.user_email,
+            idempotency_key=_get_idempotency_key(order),
         )
         return Payment(
             id=stripe_payment.id,
@@ -73,6 +234,7 @@ class StripeClientAdapter(AbstractClientAdapter):
             convert_to_int(order.payment_amount),
             order.payment_currency_code,
             order.payment_method.external_id,
+            idempotency_key=_get_idempotency_key(order),
         )
         return Payment(
             id=stripe_payment.id,
@@ -91,6 +253,32 @@ class StripeClientAdapter(AbstractClientAdapter):
         refund = await self.client.get_refund(order.external_id)
         return convert_charge_status(refund.status)
 
+    async def get_refund_statuses(
+        self,
+        orders: List[Orders],
+        **kwargs,
+    ) -> Dict[str, OrderState]:
+        """
+        Get Stripe refund statuses of many orders by listing refunds
+
+        @param orders: list of class `Orders` instances with refund data
+        @param kwargs: no kwargs is used
+        @return: order identifier to order state mapping, failed orders are skipped
+        """
+        orders = [order for order in orders if order.external_id]
+        if not orders:
+            return {}
+
+        created_gte = _get_created_gte(orders)
+        if created_gte is None:
+            return await _collect_statuses(orders, {}, self.get_refund_status)
+
+        refunds = await self.client.list_refunds(created_gte)
+        listed: Dict[str, Optional[OrderState]] = {
+            refund.id: convert_charge_status(refund.status) for refund in refunds
+        }
+        return await _collect_statuses(orders, listed, self.get_refund_status)
+
     async def create_refund(self, order: Orders, **kwargs) -> Refund:
         """
         Create Stripe refund
@@ -102,6 +290,7 @@ class StripeClientAdapter(AbstractClientAdapter):
         refund = await self.client.create_refund(
             order.src_order.external_id,
             convert_to_int(order.payment_amount),
+            idempotency_key=_get_idempotency_key(order),
         )
         return Refund(
             id=refund.id,
@@ -120,20 +309,7 @@ class StripeClientAdapter(AbstractClientAdapter):
         @return: payment method data
         """
         payment = await self.client.get_payment(order.external_id)
-
-        charge = payment.charges.data[0]
-        payment_method = charge.payment_method_details
-
-        _id = charge.payment_method
-        _type = payment_method["type"]
-        pmd_extractor = get_pmd_extractor(_type)
-        data = pmd_extractor.extract(payment_method[_type])
-
-        return PaymentMethod(
-            id=_id,
-            type=_type,
-            data=data,
-        )
+        return extract_payment_method(payment)
 
     async def get_payment(self, order: Orders, **kwargs) -> Payment:
         """
@@ -151,11 +327,97 @@ class StripeClientAdapter(AbstractClientAdapter):
             state=convert_payment_state(stripe_payment),
         )
 
+    async def parse_event(
+        self,
+        payload: bytes,
+        headers: Mapping[str, str],
+        **kwargs,
+    ) -> Optional[PaymentEvent]:
+        """
+        Verify and parse Stripe webhook event
 
-def get_stripe_adapter() -> AbstractClientAdapter:
+        @param payload: raw request body
+        @param headers: request headers with `Stripe-Signature` header
+        @param kwargs: no kwargs is used
+        @return: payment event if it changes an order state, otherwise, `None`
+        @raise:
+            - `InvalidEventError`: if the event signature or payload is not valid
+        """
+        verify_signature(
+            payload,
+            headers.get("Stripe-Signature"),
+            self.webhook_secret,
+            WEBHOOK_TOLERANCE,
+        )
+        try:
+            event = orjson.loads(payload)
+        except ValueError:
+            raise InvalidEventError("Event payload is not a valid JSON")
+
+        event_type = event.get("type", "")
+        try:
+            data = event["data"]["object"]
+            if event_type.startswith("payment_intent."):
+                payment = decode_payment_intent(data)
+                state = convert_payment_state(payment)
+                payment_method = None
+                is_paid_by_user = (
+                    state == OrderState.PAID and not payment.metadata.is_automatic
+                )
+                # Without charges the method is requested when the order is updated
+                if is_paid_by_user and payment.charges.data:
+                    payment_method = extract_payment_method(payment)
+                external_id, is_refund = payment.id, False
+            elif event_type.startswith("charge.refund."):
+                refund = decode_refund(data)
+                state = convert_charge_status(refund.status)
+                payment_method = None
+                external_id, is_refund = refund.id, True
+            else:
+                return None
+        except (KeyError, IndexError, ValueError) as e:
+            # The event is signed, so it is acknowledged to stop its redelivery
+            logger.warning(f"Stripe event {event.get('id')} is skipped: {e}")
+            return None
+
+        if not state:
+            return None
+        return PaymentEvent(
+            id=event["id"],
+            external_id=external_id,
+            is_refund=is_refund,
+            state=state,
+            payment_method=payment_method,
+        )
+
+
+def get_stripe_adapter(gateway: GatewaySettings = None) -> AbstractClientAdapter:
     """
     Get configured Stripe client adapter
+    @param gateway: Stripe account settings, `STRIPE_*` settings are used by default
     @return: Stripe client adapter
     """
-    client = StripeClient(STRIPE_URL, API_KEY)
-    return StripeClientAdapter(client)
+    if not gateway:
+        return StripeClientAdapter(StripeClient(STRIPE_URL, API_KEY))
+
+    # Every account has its own API rate limit and its own session,
+    # so closing one gateway does not close the connections of the others
+    client = StripeClient(
+        gateway.url or STRIPE_URL,
+        gateway.api_key or API_KEY,
+        session_holder=create_session_holder(gateway.name),
+        read_limiter=create_rate_limiter(
+            f"{gateway.name}_read",
+            settings.stripe.read_rate,
+            settings.stripe.read_burst,
+        ),
+        write_limiter=create_rate_limiter(
+            f"{gateway.name}_write",
+            settings.stripe.write_rate,
+            settings.stripe.write_burst,
+        ),
+        name=gateway.name,
+    )
+    return StripeClientAdapter(
+        client, gateway.name, gateway.webhook_secret or WEBHOOK_SECRET
+    )
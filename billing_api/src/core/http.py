@@ -0,0 +1,87 @@
+"""Module with shared HTTP client session helpers"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+logger = logging.getLogger(__name__)
+
+
+class SessionHolder:
+    """Class to own one long-lived, connection-pooled `aiohttp.ClientSession`"""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15,
+        dns_cache_ttl: Optional[int] = 10,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self._session: Optional[ClientSession] = None
+
+    @property
+    def session(self) -> Optional[ClientSession]:
+        """Property to get opened session or `None` if it is not started"""
+        if self._session is None or self._session.closed:
+            return None
+        return self._session
+
+    async def start(self) -> ClientSession:
+        """
+        Open the pooled session
+
+        @note: calling the method on already started holder returns the same session
+        @return: class `aiohttp.ClientSession` instance
+        """
+        if self.session:
+            return self.session
+
+        connector = TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl is not None,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        self._session = ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=self.timeout),
+        )
+        logger.info(
+            f"HTTP session '{self.name}' started with pool limit {self.limit} "
+            f"({self.limit_per_host} per host)."
+        )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled session and release its connections"""
+        session = self.session
+        self._session = None
+        if session:
+            await session.close()
+            logger.info(f"HTTP session '{self.name}' closed.")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get session pool state to be displayed in health reports
+
+        @return: `dict` with pool limits and the number of connections in use
+        """
+        session = self.session
+        connector = session.connector if session else None
+        return {
+            "started": session is not None,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            # aiohttp has no public counter of acquired connections
+            "in_use": len(connector._acquired) if connector else 0,
+        }
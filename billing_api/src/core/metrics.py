@@ -0,0 +1,70 @@
+"""Module with Prometheus metrics of the billing API"""
+
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+GATEWAY_CALL_DURATION = Histogram(
+    "billing_gateway_call_duration_seconds",
+    "Duration of payment gateway adapter method calls including retries",
+    ["gateway", "method", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+GATEWAY_CALLS_IN_FLIGHT = Gauge(
+    "billing_gateway_calls_in_flight",
+    "Payment gateway adapter method calls in progress",
+    ["gateway", "method"],
+    multiprocess_mode="livesum",
+)
+GATEWAY_REQUEST_DURATION = Histogram(
+    "billing_gateway_request_duration_seconds",
+    "Duration of single HTTP request attempts to payment gateway APIs",
+    ["gateway", "method", "resource"],
+    buckets=LATENCY_BUCKETS,
+)
+GATEWAY_REQUESTS_IN_FLIGHT = Gauge(
+    "billing_gateway_requests_in_flight",
+    "HTTP requests to payment gateway APIs in progress",
+    ["gateway"],
+    multiprocess_mode="livesum",
+)
+GATEWAY_RESPONSES = Counter(
+    "billing_gateway_responses_total",
+    "HTTP responses of payment gateway APIs by status code",
+    ["gateway", "method", "resource", "status"],
+)
+GATEWAY_RETRIES = Counter(
+    "billing_gateway_retries_total",
+    "HTTP requests to payment gateway APIs retried with backoff",
+    ["gateway", "method", "resource", "exception"],
+)
+
+AUTH_CLAIMS_CACHE = Counter(
+    "billing_auth_claims_cache_total",
+    "Lookups of verified token claims in the cache by result",
+    ["result"],
+)
+
+
+def render_metrics() -> bytes:
+    """
+    Render metrics in Prometheus text format
+
+    @note: metrics of all workers are collected if `PROMETHEUS_MULTIPROC_DIR` is set
+    @return: metrics text
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
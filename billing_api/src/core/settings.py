@@ -3,9 +3,10 @@
 import logging
 import pathlib
 from logging.config import dictConfig
+from typing import List, Optional
 
 from dotenv import load_dotenv
-from pydantic import BaseSettings, Field
+from pydantic import BaseModel, BaseSettings, Field
 from src.core.logging import LOGGING_CFG
 
 BASE_DIR = pathlib.Path(__file__).parent.parent
@@ -29,6 +30,28 @@ class DatabaseSettings(BaseSettings):
 class StripeSettings(BaseSettings):
     url: str = Field("https://api.stripe.com/v1", env="STRIPE_URL")
     api_key: str = Field(None, env="STRIPE_API_KEY")
+    # Connection pool limits of every configured gateway
+    pool_limit: int = Field(100, env="STRIPE_POOL_LIMIT")
+    pool_limit_per_host: int = Field(0, env="STRIPE_POOL_LIMIT_PER_HOST")
+    keepalive_timeout: float = Field(30, env="STRIPE_KEEPALIVE_TIMEOUT")
+    dns_cache_ttl: int = Field(300, env="STRIPE_DNS_CACHE_TTL")
+    request_timeout: float = Field(None, env="STRIPE_REQUEST_TIMEOUT")
+    # `local` gives every worker its own budget, `postgres` shares one budget between workers
+    rate_limiter_backend: str = Field("local", env="STRIPE_RATE_LIMITER_BACKEND")
+    rate_limit_lease: int = Field(5, env="STRIPE_RATE_LIMIT_LEASE")
+    read_rate: float = Field(80, env="STRIPE_READ_RATE")
+    read_burst: float = Field(80, env="STRIPE_READ_BURST")
+    write_rate: float = Field(80, env="STRIPE_WRITE_RATE")
+    write_burst: float = Field(80, env="STRIPE_WRITE_BURST")
+    max_retry_time: float = Field(10, env="STRIPE_MAX_RETRY_TIME")
+    fast_decode: bool = Field(default=False, env="STRIPE_FAST_DECODE")
+    customer_cache_size: int = Field(10000, env="STRIPE_CUSTOMER_CACHE_SIZE")
+    list_page_size: int = Field(100, env="STRIPE_LIST_PAGE_SIZE")
+    list_max_pages: int = Field(10, env="STRIPE_LIST_MAX_PAGES")
+    # Orders created earlier than this number of seconds ago are requested one by one
+    list_max_window: int = Field(86400, env="STRIPE_LIST_MAX_WINDOW")
+    webhook_secret: str = Field(None, env="STRIPE_WEBHOOK_SECRET")
+    webhook_tolerance: float = Field(300, env="STRIPE_WEBHOOK_TOLERANCE")
 
 
 class BackoffSettings(BaseSettings):
@@ -37,16 +60,84 @@ class BackoffSettings(BaseSettings):
     max_value: float = Field(None, env="BACKOFF_MAX_VALUE")
 
 
+class CircuitBreakerSettings(BaseSettings):
+    failure_threshold: int = Field(5, env="CIRCUIT_BREAKER_FAILURE_THRESHOLD")
+    recovery_timeout: float = Field(30, env="CIRCUIT_BREAKER_RECOVERY_TIMEOUT")
+    half_open_max_calls: int = Field(1, env="CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS")
+
+
+class GatewaySettings(BaseModel):
+    name: str
+    payment_system: str = "stripe"
+    # Unset connection values are taken from the payment system settings
+    url: Optional[str] = None
+    api_key: Optional[str] = None
+    webhook_secret: Optional[str] = None
+    weight: float = 1
+    # Lowercase currency codes accepted by the gateway, empty list accepts any currency
+    currencies: List[str] = []
+
+
+class RoutingSettings(BaseSettings):
+    gateways: List[GatewaySettings] = Field([], env="GATEWAYS")
+    window: float = Field(60, env="ROUTING_WINDOW")
+    min_samples: int = Field(20, env="ROUTING_MIN_SAMPLES")
+    max_p99: float = Field(2, env="ROUTING_MAX_P99")
+    max_error_rate: float = Field(0.2, env="ROUTING_MAX_ERROR_RATE")
+
+
+class CatalogSettings(BaseSettings):
+    refresh_interval: float = Field(300, env="PRODUCT_CATALOG_REFRESH_INTERVAL")
+    reconnect_interval: float = Field(5, env="PRODUCT_CATALOG_RECONNECT_INTERVAL")
+
+
+class OrderSettings(BaseSettings):
+    # Orders not sent to a payment system for longer are recovered by the sweep
+    reserve_timeout: float = Field(120, env="ORDER_RESERVE_TIMEOUT")
+    # Payment system idempotency keys are kept for 24 hours
+    recovery_max_age: float = Field(82800, env="ORDER_RECOVERY_MAX_AGE")
+    recovery_batch_size: int = Field(100, env="ORDER_RECOVERY_BATCH_SIZE")
+    # Maximum number of concurrent payment system calls of one batch status update
+    update_concurrency: int = Field(4, env="ORDER_UPDATE_CONCURRENCY")
+    # Maximum number of concurrent requests of orders not found in a payment system listing
+    status_concurrency: int = Field(10, env="ORDER_STATUS_CONCURRENCY")
+    # Maximum number of concurrent recurring payments of one batch
+    recurring_concurrency: int = Field(10, env="ORDER_RECURRING_CONCURRENCY")
+
+
+class UserApiSettings(BaseSettings):
+    # Serialize user API responses with orjson from validated rows
+    fast_responses: bool = Field(default=False, env="USER_API_FAST_RESPONSES")
+
+
 class AuthSettings(BaseSettings):
     debug: int = Field(0, env="AUTH_DEBUG")
     debug_user_id: str = Field("debug-user-id", env="DEBUG_USER_ID")
+    claims_cache_size: int = Field(10000, env="AUTH_CLAIMS_CACHE_SIZE")
+    claims_cache_ttl: float = Field(300, env="AUTH_CLAIMS_CACHE_TTL")
     scheme: str = Field("http")
     host: str = Field("0.0.0.0", env="AUTH_HOST")
     port: int = Field(8001, env="AUTH_PORT")
     pubkey_path: str = Field("api/v1/auth/pubkey", env="AUTH_PUBKEY_PATH")
+    pubkey_ttl: float = Field(300, env="AUTH_PUBKEY_TTL")
+    pubkey_timeout: float = Field(5, env="AUTH_PUBKEY_TIMEOUT")
+    pubkey_min_refresh_interval: float = Field(
+        10, env="AUTH_PUBKEY_MIN_REFRESH_INTERVAL"
+    )
+    pubkey_cache_path: Optional[str] = Field(None, env="AUTH_PUBKEY_CACHE_PATH")
     roles_path_pattern: str = Field(
         "api/v1/admin/user/%s/role/%s", env="ROLES_PATH_PATTERN"
     )
+    roles_pool_limit: int = Field(20, env="ROLES_POOL_LIMIT")
+    roles_request_timeout: float = Field(10, env="ROLES_REQUEST_TIMEOUT")
+    # Seconds to retry a single role change while the auth service is unreachable
+    roles_max_retry_time: float = Field(10, env="ROLES_MAX_RETRY_TIME")
+    roles_concurrency: int = Field(10, env="ROLES_CONCURRENCY")
+    roles_outbox_batch_size: int = Field(100, env="ROLES_OUTBOX_BATCH_SIZE")
+    roles_outbox_interval: float = Field(5, env="ROLES_OUTBOX_INTERVAL")
+    roles_outbox_lease: float = Field(60, env="ROLES_OUTBOX_LEASE")
+    roles_outbox_max_attempts: int = Field(20, env="ROLES_OUTBOX_MAX_ATTEMPTS")
+    roles_outbox_max_backoff: float = Field(300, env="ROLES_OUTBOX_MAX_BACKOFF")
 
     def get_pubkey_url(self):
         return f"{self.scheme}://{self.host}:{self.port}/{self.pubkey_path}"
@@ -59,6 +150,11 @@ class Settings(BaseSettings):
     stripe: StripeSettings = StripeSettings()
     db: DatabaseSettings = DatabaseSettings()
     backoff: BackoffSettings = BackoffSettings()
+    circuit_breaker: CircuitBreakerSettings = CircuitBreakerSettings()
+    routing: RoutingSettings = RoutingSettings()
+    orders: OrderSettings = OrderSettings()
+    catalog: CatalogSettings = CatalogSettings()
+    user_api: UserApiSettings = UserApiSettings()
     auth: AuthSettings = AuthSettings()
 
 
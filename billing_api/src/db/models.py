@@ -1,6 +1,6 @@
 """Module with ORM models definition"""
 
-from src.models.common import OrderState, SubscriptionState
+from src.models.common import OrderState, RoleAction, SubscriptionState
 from tortoise import fields
 from tortoise.models import Model
 
@@ -14,6 +14,18 @@ class AbstractModel(Model):
         abstract = True
 
 
+class RateLimits(Model):
+    name = fields.CharField(max_length=50, pk=True)
+    tokens = fields.FloatField(null=False)
+    updated = fields.DatetimeField()
+
+    class Meta:
+        table = "rate_limits"
+
+    def __str__(self):
+        return "RateLimit: %s -- %s" % (self.name, self.tokens)
+
+
 class PaymentMethods(AbstractModel):
     user_id = fields.UUIDField(null=False)
     external_id = fields.CharField(max_length=50, null=False)
@@ -33,6 +45,23 @@ class PaymentMethods(AbstractModel):
         )
 
 
+class Customers(AbstractModel):
+    user_id = fields.UUIDField(null=False)
+    payment_system = fields.CharField(max_length=50, null=False)
+    external_id = fields.CharField(max_length=50, null=False)
+
+    class Meta:
+        table = "customers"
+        unique_together = ("user_id", "payment_system")
+
+    def __str__(self):
+        return "Customer: %s -- %s -- %s" % (
+            self.payment_system,
+            self.user_id,
+            self.external_id,
+        )
+
+
 class Products(AbstractModel):
     name = fields.CharField(max_length=255, null=False)
     description = fields.TextField()
@@ -68,7 +97,7 @@ class Subscriptions(AbstractModel):
 
 
 class Orders(AbstractModel):
-    external_id = fields.CharField(max_length=50, null=True)
+    external_id = fields.CharField(max_length=50, null=True, index=True)
     user_id = fields.UUIDField(null=False)
     product: fields.ForeignKeyRelation[Products] = fields.ForeignKeyField(
         "billing.Products", related_name="orders", on_delete=fields.RESTRICT
@@ -77,6 +106,8 @@ class Orders(AbstractModel):
         "billing.Subscriptions", related_name="orders", on_delete=fields.RESTRICT
     )
     payment_system = fields.CharField(max_length=50, null=False)
+    # Gateway instance of the payment system the order is made with
+    gateway = fields.CharField(max_length=50, null=True)
     payment_method: fields.ForeignKeyRelation[PaymentMethods] = fields.ForeignKeyField(
         "billing.PaymentMethods",
         related_name="orders",
@@ -95,6 +126,7 @@ class Orders(AbstractModel):
     )
     is_automatic = fields.BooleanField(default=False, null=False)
     user_email = fields.CharField(max_length=35, null=False)
+    idempotency_key = fields.CharField(max_length=255, null=True)
 
     class Meta:
         table = "orders"
@@ -107,3 +139,20 @@ class Orders(AbstractModel):
             self.payment_amount,
             self.payment_currency_code,
         )
+
+
+class RoleOutbox(AbstractModel):
+    user_id = fields.UUIDField(null=False)
+    role_id = fields.UUIDField(null=False)
+    action: RoleAction = fields.CharEnumField(RoleAction, null=False)
+    attempts = fields.IntField(default=0, null=False)
+    next_attempt = fields.DatetimeField(null=False)
+    # Set when the change is delivered or given up, the latter has `error`
+    delivered = fields.DatetimeField(null=True)
+    error = fields.TextField(null=True)
+
+    class Meta:
+        table = "role_outbox"
+
+    def __str__(self):
+        return "RoleOutbox: %s -- %s -- %s" % (self.action, self.user_id, self.role_id)
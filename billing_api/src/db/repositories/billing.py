@@ -0,0 +1,109 @@
+"""Module with definition of `BillingRepository` class"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Type, TypeVar
+
+from src.db.models import Orders, Products, Subscriptions
+from src.models.common import OrderState, SubscriptionState
+from tortoise.models import Model
+from tortoise.transactions import in_transaction
+
+M = TypeVar("M", bound=Model)
+
+# Model and its alias in the snapshot query
+_SNAPSHOT_MODELS = (
+    (Subscriptions, "s"),
+    (Products, "sp"),
+    (Orders, "o"),
+)
+
+_SNAPSHOT_QUERY = """
+    SELECT {columns}
+    FROM (SELECT 1) AS snapshot
+    LEFT JOIN LATERAL (
+        SELECT * FROM subscriptions
+        WHERE user_id = $1 AND state IN ('active', 'pre_active')
+        LIMIT 1
+    ) AS s ON TRUE
+    LEFT JOIN products AS sp ON sp.id = s.product_id
+    LEFT JOIN LATERAL (
+        SELECT * FROM orders
+        WHERE user_id = $1 AND state IN ('draft', 'processing')
+            AND NOT is_refund AND NOT is_automatic AND external_id IS NOT NULL
+        LIMIT 1
+    ) AS o ON TRUE
+"""
+
+
+@dataclass
+class BillingSnapshot:
+    """User billing state"""
+
+    # Subscription with state `active` or `pre_active` with its product
+    subscription: Optional[Subscriptions]
+    # Order with state `draft` or `processing` made by user and sent to a payment system
+    unpaid_order: Optional[Orders]
+
+
+@lru_cache()
+def _get_snapshot_query() -> str:
+    # Model columns are known only after Tortoise is initialized
+    columns = ", ".join(
+        f"{alias}.{column} AS {alias}__{column}"
+        for model, alias in _SNAPSHOT_MODELS
+        for column in sorted(model._meta.db_fields)
+    )
+    return _SNAPSHOT_QUERY.format(columns=columns)
+
+
+def _build(model: Type[M], alias: str, row: dict) -> Optional[M]:
+    values = {column: row[f"{alias}__{column}"] for column in model._meta.db_fields}
+    if values["id"] is None:
+        return None
+    return model._init_from_db(**values)
+
+
+class BillingRepository:
+    """Class with operations on user billing state spanning several ORM models"""
+
+    @staticmethod
+    async def get_snapshot(user_id: str) -> BillingSnapshot:
+        """
+        Get user subscription and unpaid order with one query
+
+        @param user_id: user identifier
+        @return: class `BillingSnapshot` instance, missing objects are `None`
+        """
+        _, rows = await Subscriptions._meta.db.execute_query(
+            _get_snapshot_query(),
+            [str(user_id)],
+        )
+        row = dict(rows[0])
+        subscription = _build(Subscriptions, "s", row)
+        if subscription:
+            subscription.product = _build(Products, "sp", row)
+        return BillingSnapshot(
+            subscription=subscription,
+            unpaid_order=_build(Orders, "o", row),
+        )
+
+    @staticmethod
+    async def discard_unsent_order(order: Orders) -> None:
+        """
+        Delete order made by user, but not sent to a payment system, with its subscription
+
+        @note: the client secret of the payment never reached the user, so nothing is paid.
+        Only order with state `draft` and without external identifier is deleted
+        @param order: class `Orders` instance of the order
+        """
+        async with in_transaction():
+            await Orders.filter(
+                pk=order.id,
+                state=OrderState.DRAFT,
+                external_id__isnull=True,
+            ).delete()
+            await Subscriptions.filter(
+                pk=order.subscription_id,
+                state=SubscriptionState.INACTIVE,
+            ).delete()
@@ -0,0 +1,48 @@
+"""Module with definition of `CustomerRepository` class"""
+
+from typing import Optional
+from uuid import uuid4
+
+from src.db.models import Customers
+from tortoise import timezone
+
+
+class CustomerRepository:
+    """Class with operations on Customers ORM models"""
+
+    @staticmethod
+    async def get(user_id: str, payment_system: str) -> Optional[Customers]:
+        """
+        Get user customer in a payment system
+
+        @param user_id: user identifier
+        @param payment_system: payment system or gateway account name of the customer
+        @return: class `Customers` instance if it exists, otherwise, `None`
+        """
+        return await Customers.get_or_none(
+            user_id=user_id, payment_system=payment_system
+        )
+
+    @staticmethod
+    async def create(user_id: str, payment_system: str, external_id: str) -> Customers:
+        """
+        Create user customer
+
+        @note: If customer of the user in the payment system exists it is returned
+        @param user_id: user identifier
+        @param payment_system: payment system or gateway account name of the customer
+        @param external_id: customer identifier in a payment system
+        @return: class `Customers` instance
+        """
+        now = timezone.now()
+        customer, _ = await Customers.get_or_create(
+            user_id=user_id,
+            payment_system=payment_system,
+            defaults={
+                "id": uuid4(),
+                "external_id": external_id,
+                "created": now,
+                "modified": now,
+            },
+        )
+        return customer
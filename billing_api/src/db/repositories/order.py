@@ -1,12 +1,22 @@
 """Module with definition of `OrderRepository` class"""
 
+from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
 from uuid import uuid4
 
-from src.db.models import Orders, OrderState, PaymentMethods
+from src.db.models import Orders, OrderState
+from src.models.common import PaymentOperation
+from src.utils.idempotency import get_idempotency_key, get_order_operation
 from tortoise import timezone
 
+_UPDATE_STATES_QUERY = """
+    UPDATE orders SET state = v.state::order_state, modified = clock_timestamp()
+    FROM unnest($1::uuid[], $2::text[]) AS v(id, state)
+    WHERE orders.id = v.id AND orders.state NOT IN ('paid', v.state::order_state)
+    RETURNING orders.id
+"""
+
 
 class OrderRepository:
     """Class with operations on Orders ORM models"""
@@ -25,6 +35,49 @@ class OrderRepository:
             "payment_method",
         )
 
+    @staticmethod
+    async def get_many(order_ids: List[str]) -> List[Orders]:
+        """
+        Get orders by primary keys with one query
+
+        @param order_ids: order identifiers
+        @return: list of class `Orders` instances with subscription, missing orders are skipped
+        """
+        return await Orders.filter(pk__in=order_ids).select_related("subscription")
+
+    @staticmethod
+    async def get_by_external_id(
+        payment_system: str, external_id: str, is_refund: bool = False
+    ) -> Optional[Orders]:
+        """
+        Get order by its identifier in a payment system
+
+        @param payment_system: payment system of the order
+        @param external_id: order identifier in the payment system
+        @param is_refund: set to `True` to get refund order, otherwise, `False`
+        @return: class `Orders` instance if it exists, otherwise, `None`
+        """
+        return await Orders.get_or_none(
+            payment_system=payment_system,
+            external_id=external_id,
+            is_refund=is_refund,
+        ).prefetch_related(
+            "product",
+            "subscription",
+            "payment_method",
+        )
+
+    @staticmethod
+    async def get_state_for_update(order_id: str) -> Optional[OrderState]:
+        """
+        Get order state locking the order row until the end of the current transaction
+
+        @param order_id: order identifier
+        @return: order state if the order exists, otherwise, `None`
+        """
+        order = await Orders.select_for_update().get_or_none(pk=order_id)
+        return order.state if order else None
+
     @staticmethod
     async def get_subscription_order(user_id: str, subscription_id: str) -> Orders:
         """
@@ -87,8 +140,10 @@ class OrderRepository:
         @param is_refund: set to `True` if order is refund, otherwise, `False`
         @return: class `Orders` instance
         """
+        order_id = uuid4()
+        operation = get_order_operation(is_refund, is_automatic)
         order = await Orders.create(
-            id=uuid4(),
+            id=order_id,
             user_id=user_id,
             subscription_id=subscription_id,
             external_id=external_id,
@@ -102,6 +157,7 @@ class OrderRepository:
             src_order=src_order,
             is_automatic=is_automatic,
             is_refund=is_refund,
+            idempotency_key=get_idempotency_key(operation, order_id),
             created=timezone.now(),
             modified=timezone.now(),
         )
@@ -121,23 +177,85 @@ class OrderRepository:
             modified=timezone.now(),
         )
 
+    @staticmethod
+    async def update_states(states: Dict[str, OrderState]) -> List[str]:
+        """
+        Update states of many orders with one query
+
+        @note: paid orders and orders already having the state are not updated
+        @param states: order identifier to new order state mapping
+        @return: identifiers of updated orders
+        """
+        if not states:
+            return []
+        # Rows of `UPDATE ... RETURNING` are returned only by `execute_query_dict`
+        rows = await Orders._meta.db.execute_query_dict(
+            _UPDATE_STATES_QUERY,
+            [list(states), [state.value for state in states.values()]],
+        )
+        return [str(row["id"]) for row in rows]
+
     @staticmethod
     async def get_unpaid_order(user_id: str) -> Optional[Orders]:
         """
         Get unpaid user order
 
+        @note: orders not sent to a payment system can not be paid, so they are skipped
         @param user_id: user identifier
         @return: class `Orders` instance if it exists, otherwise, `None`
         """
         return await Orders.get_or_none(
             user_id=user_id,
             state__in=[OrderState.DRAFT, OrderState.PROCESSING],
+            external_id__isnull=False,
             is_refund=False,
             is_automatic=False,
         ).prefetch_related(
             "product",
         )
 
+    @staticmethod
+    async def get_pending_refund_order(subscription_id: str) -> Optional[Orders]:
+        """
+        Get refund order of subscription not sent to a payment system
+
+        @note: the order is reused by the next refund attempt,
+        so the attempt is sent with the same idempotency key
+        @param subscription_id: subscription identifier
+        @return: class `Orders` instance if it exists, otherwise, `None`
+        """
+        return (
+            await Orders.filter(
+                subscription_id=subscription_id,
+                state=OrderState.DRAFT,
+                external_id__isnull=True,
+                is_refund=True,
+            )
+            .order_by("-created")
+            .prefetch_related("subscription", "src_order")
+            .first()
+        )
+
+    @staticmethod
+    async def get_unsent_orders(created_before: datetime, limit: int) -> List[Orders]:
+        """
+        Get orders reserved, but not sent to a payment system
+
+        @param created_before: time to get orders created before
+        @param limit: maximum number of orders
+        @return: list of class `Orders` instances from the oldest one
+        """
+        return (
+            await Orders.filter(
+                state=OrderState.DRAFT,
+                external_id__isnull=True,
+                created__lt=created_before,
+            )
+            .order_by("created")
+            .limit(limit)
+            .prefetch_related("subscription", "payment_method", "src_order")
+        )
+
     @staticmethod
     async def create_refund_order(order: Orders, amount: Decimal) -> Orders:
         """
@@ -147,13 +265,15 @@ class OrderRepository:
         @param amount: amount of the compensation
         @return: class `Orders` instance of created refund order
         """
+        order_id = uuid4()
         refund_order = await Orders.create(
-            id=uuid4(),
+            id=order_id,
             user_id=order.user_id,
             subscription=order.subscription,
             external_id=None,
             product=order.product,
             payment_system=order.payment_system,
+            gateway=order.gateway,
             payment_method=order.payment_method,
             payment_amount=amount,
             payment_currency_code=order.payment_currency_code,
@@ -162,38 +282,8 @@ class OrderRepository:
             src_order=order,
             is_automatic=False,
             is_refund=True,
+            idempotency_key=get_idempotency_key(PaymentOperation.REFUND, order_id),
             created=timezone.now(),
             modified=timezone.now(),
         )
         return refund_order
-
-    @staticmethod
-    async def create_recurring_order(
-        order: Orders, payment_method: PaymentMethods
-    ) -> Orders:
-        """
-        Create order for recurring payment
-
-        @param order: previous order
-        @param payment_method: user payment method
-        @return: class `Orders` instance of created order
-        """
-        recurring_order = await Orders.create(
-            id=uuid4(),
-            user_id=order.user_id,
-            subscription=order.subscription,
-            external_id=None,
-            product=order.product,
-            payment_system=payment_method.payment_system,
-            payment_method=payment_method,
-            payment_amount=order.product.price,
-            payment_currency_code=order.product.currency_code,
-            user_email=order.user_email,
-            state=OrderState.DRAFT,
-            src_order=None,
-            is_automatic=True,
-            is_refund=False,
-            created=timezone.now(),
-            modified=timezone.now(),
-        )
-        return recurring_order
@@ -1,11 +1,13 @@
 """Module with definition of `PaymentMethodRepository` class"""
 
 import json
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from src.db.models import PaymentMethods
 from tortoise import timezone
+from tortoise.functions import Count, Max
 
 
 class PaymentMethodRepository:
@@ -31,6 +33,20 @@ class PaymentMethodRepository:
         """
         return await PaymentMethods.filter(user_id=user_id, is_default=True).first()
 
+    @staticmethod
+    async def get_defaults(user_ids: List[str]) -> Dict[str, PaymentMethods]:
+        """
+        Get default payment methods of many users with one query
+
+        @param user_ids: user identifiers
+        @return: user identifier to class `PaymentMethods` instance mapping,
+        users without default payment method are skipped
+        """
+        payment_methods = await PaymentMethods.filter(
+            user_id__in=user_ids, is_default=True
+        )
+        return {str(pm.user_id): pm for pm in payment_methods}
+
     @staticmethod
     async def get_user_payment_methods(user_id: str) -> List[PaymentMethods]:
         """
@@ -41,6 +57,35 @@ class PaymentMethodRepository:
         """
         return await PaymentMethods.filter(user_id=user_id).all()
 
+    @staticmethod
+    async def get_user_payment_methods_rows(user_id: str, *fields: str) -> List[dict]:
+        """
+        Get all user payment methods without building ORM models
+
+        @param user_id: user identifier
+        @param fields: payment method fields to get
+        @return: list of `dict` rows with `fields`
+        """
+        return await PaymentMethods.filter(user_id=user_id).values(*fields)
+
+    @staticmethod
+    async def get_user_payment_methods_version(
+        user_id: str,
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        Get version of all user payment methods without loading them
+
+        @param user_id: user identifier
+        @return: number of payment methods and the last time any of them was modified
+        """
+        versions = (
+            await PaymentMethods.filter(user_id=user_id)
+            .annotate(count=Count("id"), last_modified=Max("modified"))
+            .values("count", "last_modified")
+        )
+        version = versions[0]
+        return version["count"], version["last_modified"]
+
     @staticmethod
     async def create(
         user_id: str,
@@ -0,0 +1,177 @@
+"""Module with definition of `RecurringOrderRepository` class"""
+
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from src.db.models import Orders, OrderState, PaymentMethods
+from src.models.common import Payment, PaymentOperation
+from src.utils.idempotency import get_idempotency_key
+from tortoise import timezone
+
+_LAST_PAID_ORDERS_QUERY = """
+    SELECT DISTINCT ON (subscription_id) id FROM orders
+    WHERE subscription_id = ANY($1::uuid[]) AND state = 'paid' AND NOT is_refund
+    ORDER BY subscription_id, created DESC
+"""
+
+_UPDATE_PAYMENTS_QUERY = """
+    UPDATE orders SET
+        external_id = v.external_id,
+        state = v.state::order_state,
+        modified = clock_timestamp()
+    FROM unnest($1::uuid[], $2::text[], $3::text[]) AS v(id, external_id, state)
+    WHERE orders.id = v.id
+"""
+
+
+def _first_by_subscription(orders: List[Orders]) -> Dict[str, Orders]:
+    first_orders: Dict[str, Orders] = {}
+    for order in orders:
+        first_orders.setdefault(str(order.subscription_id), order)
+    return first_orders
+
+
+def _new_recurring_order(order: Orders, payment_method: PaymentMethods) -> Orders:
+    order_id = uuid4()
+    return Orders(
+        id=order_id,
+        user_id=order.user_id,
+        subscription=order.subscription,
+        external_id=None,
+        product=order.product,
+        payment_system=payment_method.payment_system,
+        # Payment method is saved in the gateway account of the previous order
+        gateway=order.gateway,
+        payment_method=payment_method,
+        payment_amount=order.product.price,
+        payment_currency_code=order.product.currency_code,
+        user_email=order.user_email,
+        state=OrderState.DRAFT,
+        src_order=None,
+        is_automatic=True,
+        is_refund=False,
+        idempotency_key=get_idempotency_key(
+            PaymentOperation.RECURRING_PAYMENT, order_id
+        ),
+        created=timezone.now(),
+        modified=timezone.now(),
+    )
+
+
+class RecurringOrderRepository:
+    """Class with operations on ORM models of subscription recurring payment orders"""
+
+    @staticmethod
+    async def get_pending_recurring_order(subscription_id: str) -> Optional[Orders]:
+        """
+        Get unfinished recurring payment order of subscription
+
+        @note: the order is reused by the next recurring payment attempt,
+        so the attempt is sent with the same idempotency key
+        @param subscription_id: subscription identifier
+        @return: class `Orders` instance if it exists, otherwise, `None`
+        """
+        return (
+            await Orders.filter(
+                subscription_id=subscription_id,
+                state__in=[OrderState.DRAFT, OrderState.PROCESSING],
+                is_refund=False,
+                is_automatic=True,
+            )
+            .order_by("-created")
+            .prefetch_related("payment_method")
+            .first()
+        )
+
+    @staticmethod
+    async def get_pending_recurring_orders(
+        subscription_ids: List[str],
+    ) -> Dict[str, Orders]:
+        """
+        Get unfinished recurring payment orders of many subscriptions
+
+        @param subscription_ids: subscription identifiers
+        @return: subscription identifier to class `Orders` instance mapping,
+        subscriptions without such orders are skipped
+        """
+        orders = (
+            await Orders.filter(
+                subscription_id__in=subscription_ids,
+                state__in=[OrderState.DRAFT, OrderState.PROCESSING],
+                is_refund=False,
+                is_automatic=True,
+            )
+            .order_by("-created")
+            .prefetch_related("payment_method")
+        )
+        return _first_by_subscription(orders)
+
+    @staticmethod
+    async def get_subscription_orders(subscription_ids: List[str]) -> Dict[str, Orders]:
+        """
+        Get last paid orders of many subscriptions
+
+        @param subscription_ids: subscription identifiers
+        @return: subscription identifier to class `Orders` instance mapping,
+        subscriptions without paid orders are skipped
+        """
+        _, rows = await Orders._meta.db.execute_query(
+            _LAST_PAID_ORDERS_QUERY,
+            [[str(subscription_id) for subscription_id in subscription_ids]],
+        )
+        orders = await Orders.filter(
+            id__in=[row["id"] for row in rows],
+        ).prefetch_related("product", "subscription")
+        return {str(order.subscription_id): order for order in orders}
+
+    @staticmethod
+    async def create_recurring_order(
+        order: Orders, payment_method: PaymentMethods
+    ) -> Orders:
+        """
+        Create order for recurring payment
+
+        @param order: previous order
+        @param payment_method: user payment method
+        @return: class `Orders` instance of created order
+        """
+        recurring_order = _new_recurring_order(order, payment_method)
+        await recurring_order.save(force_create=True)
+        return recurring_order
+
+    @staticmethod
+    async def create_recurring_orders(
+        orders: List[Tuple[Orders, PaymentMethods]]
+    ) -> List[Orders]:
+        """
+        Create orders for recurring payments of many subscriptions with one query
+
+        @param orders: list of previous order and user payment method
+        @return: list of class `Orders` instances of created orders
+        """
+        recurring_orders = [
+            _new_recurring_order(order, payment_method)
+            for order, payment_method in orders
+        ]
+        if recurring_orders:
+            await Orders.bulk_create(recurring_orders)
+        return recurring_orders
+
+    @staticmethod
+    async def update_payments(payments: Dict[str, Payment]):
+        """
+        Save payments created for many reserved orders with one query
+
+        @param payments: order identifier to created payment mapping
+        """
+        if not payments:
+            return
+        # `execute_query` chooses how to run a query by its first word, unlike this method
+        await Orders._meta.db.execute_query_dict(
+            _UPDATE_PAYMENTS_QUERY,
+            [
+                list(payments),
+                [payment.id for payment in payments.values()],
+                [payment.state.value for payment in payments.values()],
+            ],
+        )
@@ -0,0 +1,132 @@
+"""Module with definition of `RoleOutboxRepository` class"""
+
+from datetime import timedelta
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from src.db.models import RoleOutbox
+from src.models.common import RoleAction
+from tortoise import timezone
+
+_ON_CONFLICT = """
+    ON CONFLICT (user_id, role_id) WHERE delivered IS NULL DO UPDATE SET
+        action = EXCLUDED.action,
+        attempts = 0,
+        next_attempt = EXCLUDED.next_attempt,
+        error = NULL,
+        modified = EXCLUDED.modified
+"""
+
+_ENQUEUE_INSERT = """
+    INSERT INTO role_outbox (id, user_id, role_id, action, attempts, next_attempt, created, modified)
+    VALUES ($1, $2, $3, $4, 0, clock_timestamp(), clock_timestamp(), clock_timestamp())
+"""
+
+_ENQUEUE_MANY_INSERT = """
+    INSERT INTO role_outbox (id, user_id, role_id, action, attempts, next_attempt, created, modified)
+    SELECT v.id, v.user_id, v.role_id, v.action::role_action, 0,
+        clock_timestamp(), clock_timestamp(), clock_timestamp()
+    FROM unnest($1::uuid[], $2::uuid[], $3::uuid[], $4::text[]) AS v(id, user_id, role_id, action)
+"""
+
+# Queries are joined from constant fragments only, values are passed as parameters
+_ENQUEUE_QUERY = _ENQUEUE_INSERT + _ON_CONFLICT  # noqa: S608
+_ENQUEUE_MANY_QUERY = _ENQUEUE_MANY_INSERT + _ON_CONFLICT  # noqa: S608
+
+_CLAIM_QUERY = """
+    UPDATE role_outbox SET next_attempt = clock_timestamp() + make_interval(secs => $2)
+    WHERE id IN (
+        SELECT id FROM role_outbox
+        WHERE delivered IS NULL AND next_attempt <= clock_timestamp()
+        ORDER BY next_attempt
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, role_id, action, attempts, modified
+"""
+
+
+class RoleOutboxRepository:
+    """Class with operations on RoleOutbox ORM models"""
+
+    @staticmethod
+    async def enqueue(user_id: str, role_id: str, action: RoleAction) -> None:
+        """
+        Save role change to be delivered to the auth service
+
+        @note: call it inside the transaction changing the subscription, a pending change of
+        the same user role is replaced, so only the latest one is delivered
+        @param user_id: user identifier
+        @param role_id: role identifier
+        @param action: role change
+        """
+        await RoleOutbox._meta.db.execute_query(
+            _ENQUEUE_QUERY, [str(uuid4()), str(user_id), str(role_id), action.value]
+        )
+
+    @staticmethod
+    async def enqueue_many(changes: List[Tuple[str, str, RoleAction]]) -> None:
+        """
+        Save many role changes to be delivered to the auth service with one query
+
+        @note: call it inside the transaction changing the subscriptions,
+        of several changes of the same user role only the last one is saved
+        @param changes: list of user identifier, role identifier and role change
+        """
+        # One statement can not update the same pending row twice
+        actions = {
+            (str(user_id), str(role_id)): action for user_id, role_id, action in changes
+        }
+        if not actions:
+            return
+        await RoleOutbox._meta.db.execute_query(
+            _ENQUEUE_MANY_QUERY,
+            [
+                [str(uuid4()) for _ in actions],
+                [user_id for user_id, _ in actions],
+                [role_id for _, role_id in actions],
+                [action.value for action in actions.values()],
+            ],
+        )
+
+    @staticmethod
+    async def claim(limit: int, lease: float) -> List[dict]:
+        """
+        Take due role changes for delivery
+
+        @note: claimed changes are not due again for `lease` seconds, so workers do not deliver
+        the same change at once and no transaction is kept open during delivery
+        @param limit: maximum number of changes
+        @param lease: seconds to retry the changes after if they are not marked
+        @return: `dict` rows with `id`, `user_id`, `role_id`, `action`, `attempts`, `modified`
+        """
+        # Rows of `UPDATE ... RETURNING` are returned only by `execute_query_dict`
+        return await RoleOutbox._meta.db.execute_query_dict(_CLAIM_QUERY, [limit, lease])
+
+    @staticmethod
+    async def mark_delivered(change: dict, error: Optional[str] = None) -> None:
+        """
+        Mark role change as delivered
+
+        @note: the change is left pending if it is replaced after it was claimed
+        @param change: claimed role change
+        @param error: reason to give up the change, `None` if it is delivered
+        """
+        await RoleOutbox.filter(id=change["id"], modified=change["modified"]).update(
+            delivered=timezone.now(), error=error
+        )
+
+    @staticmethod
+    async def retry_later(change: dict, delay: float, error: str) -> None:
+        """
+        Schedule next delivery attempt of role change
+
+        @param change: claimed role change
+        @param delay: seconds to the next attempt
+        @param error: reason of the failed attempt
+        """
+        await RoleOutbox.filter(id=change["id"], modified=change["modified"]).update(
+            attempts=change["attempts"] + 1,
+            next_attempt=timezone.now() + timedelta(seconds=delay),
+            error=error,
+        )
@@ -1,7 +1,8 @@
 """Module with definition of `SubscriptionRepository` class"""
 
+from collections import defaultdict
 from datetime import timedelta
-from typing import Optional
+from typing import Dict, List, Optional
 from uuid import uuid4
 
 from src.db.models import Subscriptions, SubscriptionState
@@ -23,6 +24,19 @@ class SubscriptionRepository:
             "product"
         )
 
+    @staticmethod
+    async def get_many(subscription_ids: List[str]) -> List[Subscriptions]:
+        """
+        Get subscriptions by primary keys with one query
+
+        @param subscription_ids: subscription identifiers
+        @return: list of class `Subscriptions` instances with product,
+        missing subscriptions are skipped
+        """
+        return await Subscriptions.filter(pk__in=subscription_ids).select_related(
+            "product"
+        )
+
     @staticmethod
     async def get_user_subscription(user_id: str) -> Optional[Subscriptions]:
         """
@@ -75,6 +89,24 @@ class SubscriptionRepository:
             modified=timezone.now(),
         )
 
+    @staticmethod
+    async def activate_many(subscriptions: List[Subscriptions]):
+        """
+        Activate many subscriptions with one query per product period
+
+        @param subscriptions: class `Subscriptions` instances with product
+        """
+        periods: Dict[int, List[str]] = defaultdict(list)
+        for subscription in subscriptions:
+            periods[subscription.product.period].append(subscription.id)
+        for period, subscription_ids in periods.items():
+            await Subscriptions.filter(pk__in=subscription_ids).update(
+                state=SubscriptionState.ACTIVE,
+                start_date=timezone.now(),
+                end_date=timezone.now() + timedelta(days=period),
+                modified=timezone.now(),
+            )
+
     @staticmethod
     async def deactivate(subscription_id: str):
         """
@@ -88,6 +120,18 @@ class SubscriptionRepository:
             modified=timezone.now(),
         )
 
+    @staticmethod
+    async def deactivate_many(subscription_ids: List[str]):
+        """
+        Deactivate many subscriptions with one query
+
+        @param subscription_ids: subscription identifiers
+        """
+        await Subscriptions.filter(pk__in=subscription_ids).update(
+            state=SubscriptionState.INACTIVE,
+            modified=timezone.now(),
+        )
+
     @staticmethod
     async def pre_activate(subscription_id: str):
         """
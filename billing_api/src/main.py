@@ -1,9 +1,22 @@
+import math
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 from src.api.v1.service import service_router
 from src.api.v1.user import user_router
+from src.api.v1.webhook import webhook_router
+from src.clients import gateway_registry
+from src.clients.circuit_breaker import CircuitBreakerOpenError
+from src.core.metrics import render_metrics
 from src.core.tortoise import TORTOISE_CFG
 from src.db.events import tortoise_init, tortoise_release
+from src.resources.error_messages import PAYMENT_SYSTEM_UNAVAILABLE
+from src.services.auth import public_key_store
+from src.services.catalog import product_catalog
+from src.services.role_outbox import role_outbox_dispatcher
+from src.services.roles import roles_service
 
 app = FastAPI(
     title="Billing API",
@@ -11,15 +24,40 @@ app = FastAPI(
 )
 app.include_router(service_router, prefix="/api")
 app.include_router(user_router, prefix="/api")
+app.include_router(webhook_router, prefix="/api")
+
+
+@app.exception_handler(CircuitBreakerOpenError)
+async def circuit_breaker_open_handler(request: Request, exc: CircuitBreakerOpenError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": PAYMENT_SYSTEM_UNAVAILABLE},
+        headers={"Retry-After": str(math.ceil(max(exc.retry_after, 1)))},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.on_event("startup")
 async def startup():
     await tortoise_init(config=TORTOISE_CFG)
+    await product_catalog.start()
+    await gateway_registry.start()
+    await public_key_store.start()
+    await roles_service.start()
+    await role_outbox_dispatcher.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await role_outbox_dispatcher.close()
+    await roles_service.close()
+    await public_key_store.close()
+    await gateway_registry.close()
+    await product_catalog.close()
     await tortoise_release()
 
 
@@ -2,12 +2,18 @@
 
 from datetime import date
 from decimal import Decimal
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from .common import OrderState, PaymentSystem, SubscriptionState
 
+# Orders updated by one request, the scheduler sends 100 orders per request by default
+MAX_ORDER_IDS = 1000
+# Subscriptions renewed by one request, the scheduler sends 100 subscriptions by default
+MAX_SUBSCRIPTION_IDS = MAX_ORDER_IDS
+
 
 class PaymentInfoIn(BaseModel):
     """Input payment data model"""
@@ -62,3 +68,32 @@ class OrderOut(BaseModel):
     state: OrderState
     payment_amount: Decimal
     payment_currency_code: str
+
+
+class OrderIdsIn(BaseModel):
+    """Input order identifiers model"""
+
+    order_ids: List[UUID] = Field(..., max_items=MAX_ORDER_IDS)
+
+
+class OrderUpdateOut(BaseModel):
+    """Output order update result model"""
+
+    id: UUID
+    state: Optional[OrderState]
+    updated: bool
+    error: Optional[str]
+
+
+class SubscriptionIdsIn(BaseModel):
+    """Input subscription identifiers model"""
+
+    subscription_ids: List[UUID] = Field(..., max_items=MAX_SUBSCRIPTION_IDS)
+
+
+class SubscriptionUpdateOut(BaseModel):
+    """Output subscription update result model"""
+
+    id: UUID
+    updated: bool
+    error: Optional[str]
@@ -26,12 +26,27 @@ class OrderState(str, Enum):
     ERROR = "error"
 
 
+class RoleAction(str, Enum):
+    """Auth service role changes enum"""
+
+    GRANT = "grant"
+    REVOKE = "revoke"
+
+
 class PaymentSystem(str, Enum):
     """Payment systems enum"""
 
     STRIPE = "stripe"
 
 
+class PaymentOperation(str, Enum):
+    """Remote payment operations enum"""
+
+    PAYMENT = "payment"
+    RECURRING_PAYMENT = "recurring_payment"
+    REFUND = "refund"
+
+
 class PaymentMethod(BaseModel):
     """Payment method model"""
 
@@ -49,6 +64,23 @@ class Payment(BaseModel):
     is_automatic: bool
 
 
+class PaymentDetails(BaseModel):
+    """Payment state with the payment method used to pay"""
+
+    state: Optional[OrderState]
+    payment_method: Optional[PaymentMethod]
+
+
+class PaymentEvent(BaseModel):
+    """Payment system event model"""
+
+    id: str
+    external_id: str
+    is_refund: bool
+    state: OrderState
+    payment_method: Optional[PaymentMethod]
+
+
 class Refund(BaseModel):
     """Refund model"""
 
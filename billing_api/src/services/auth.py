@@ -1,17 +1,22 @@
 """Module with user authorization service"""
 
+import hashlib
+import json
 import logging
+import time
 from datetime import datetime
 from typing import Any, Dict, Optional, Set
 
-import backoff
-from aiohttp import ClientConnectorError, ClientSession, ServerConnectionError
-from async_lru import alru_cache
-from authlib.jose import jwt
+from authlib.common.encoding import urlsafe_b64decode
+from authlib.jose import Key, jwt
 from authlib.jose.errors import BadSignatureError, ExpiredTokenError, JoseError
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from src.core.metrics import AUTH_CLAIMS_CACHE
 from src.core.settings import settings
+from src.resources.error_messages import AUTH_SERVICE_UNAVAILABLE
+from src.services.public_keys import GettingPubKeyError, PublicKeyStore
+from src.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +25,20 @@ http_bearer = HTTPBearer(auto_error=False)
 DEBUG = settings.auth.debug
 DEBUG_USER_ID = settings.auth.debug_user_id
 AUTH_URL = settings.auth.get_pubkey_url()
+CLAIMS_CACHE_TTL = settings.auth.claims_cache_ttl
 
-BACKOFF_FACTOR = settings.backoff.factor
-BACKOFF_BASE = settings.backoff.base
-BACKOFF_MAX_VALUE = settings.backoff.max_value
+# SHA-256 digest of a token to its verified claims
+verified_claims = LRUCache(settings.auth.claims_cache_size)
 
-
-class GettingPubKeyError(Exception):
-    """Exception class for error while getting a public key for a token verifying"""
-
-    pass
+public_key_store = PublicKeyStore(
+    AUTH_URL,
+    ttl=settings.auth.pubkey_ttl,
+    timeout=settings.auth.pubkey_timeout,
+    min_refresh_interval=settings.auth.pubkey_min_refresh_interval,
+    cache_path=settings.auth.pubkey_cache_path,
+)
+# Claims verified with a revoked key must not outlive the key
+public_key_store.on_rotate.append(verified_claims.clear)
 
 
 class AuthorizedUser:
@@ -76,17 +85,17 @@ class AuthorizedUser:
         return "superuser" in self._roles
 
 
-def _validate_token(token: str, public_key: str) -> Optional[Dict[str, Any]]:
+def _validate_token(token: str, public_key: Key) -> Optional[Dict[str, Any]]:
     """
     Token Validation Check
 
     @param token: JWT token string
-    @param public_key: Public key to verify token signature
+    @param public_key: Parsed public key to verify token signature
     @return: `dict` with token claims if token is valid. Otherwise, `None`.
     """
     try:
         claims = jwt.decode(token, public_key)
-    except (BadSignatureError, JoseError):
+    except (BadSignatureError, JoseError, ValueError):
         return None
 
     try:
@@ -99,30 +108,35 @@ def _validate_token(token: str, public_key: str) -> Optional[Dict[str, Any]]:
     return claims
 
 
-@alru_cache(cache_exceptions=False)
-@backoff.on_exception(
-    backoff.expo,
-    (ClientConnectorError, ServerConnectionError, GettingPubKeyError),
-    base=BACKOFF_BASE,
-    factor=BACKOFF_FACTOR,
-    max_value=BACKOFF_MAX_VALUE,
-)
-async def get_public_key(url: str) -> str:
+def _get_token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _cache_claims(token_digest: bytes, claims: Dict[str, Any]) -> None:
     """
-    Get public key from Auth service to check token signature
+    Put verified token claims to the cache until the token expires
 
-    @param url: Auth service API endpoint path
-    @return: public key string
-    @raise:
-        - `GettingPubKeyError`: if response status code from auth service is not 200
+    @param token_digest: SHA-256 digest of the token
+    @param claims: verified token claims
     """
-    async with ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                logger.error("Error while getting public key from auth service")
-                raise GettingPubKeyError()
-            body = await resp.json()
-            return body["public_key"]
+    expires_at = time.time() + CLAIMS_CACHE_TTL
+    if claims.get("exp") is not None:
+        expires_at = min(expires_at, claims["exp"])
+    verified_claims.set(token_digest, claims, expires_at=expires_at)
+
+
+def _get_token_kid(token: str) -> Optional[str]:
+    """
+    Get identifier of the key the token is signed with
+
+    @param token: JWT token string
+    @return: `kid` header value if the token has one. Otherwise, `None`.
+    """
+    try:
+        header = json.loads(urlsafe_b64decode(token.split(".", 1)[0].encode()))
+    except (ValueError, TypeError):
+        return None
+    return header.get("kid") if isinstance(header, dict) else None
 
 
 async def get_user(
@@ -133,6 +147,8 @@ async def get_user(
 
     @param token: `HTTPAuthorizationCredentials` class instance or `None`
     @return: `AuthorizedUser` class instance
+    @raise:
+        - `HTTPException`: if public keys of the auth service are unavailable
     """
     if DEBUG:
         debug_claims = {
@@ -144,10 +160,26 @@ async def get_user(
     if not token:
         return None
 
-    public_key = await get_public_key(AUTH_URL)
+    token_digest = _get_token_digest(token.credentials)
+    claims = verified_claims.get(token_digest)
+    if claims is not None:
+        AUTH_CLAIMS_CACHE.labels("hit").inc()
+        return AuthorizedUser(claims)
+
+    AUTH_CLAIMS_CACHE.labels("miss").inc()
+    try:
+        public_key = await public_key_store.get(_get_token_kid(token.credentials))
+    except GettingPubKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=AUTH_SERVICE_UNAVAILABLE,
+        )
+    if public_key is None:
+        return None
 
     claims = _validate_token(token.credentials, public_key)
     if not claims:
         return None
 
+    _cache_claims(token_digest, claims)
     return AuthorizedUser(claims)
@@ -0,0 +1,149 @@
+"""Module with in-process product catalog kept fresh by Postgres notifications"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import asyncpg
+from src.core.settings import settings
+from src.db.models import Products
+from src.db.repositories.product import ProductRepository
+
+logger = logging.getLogger(__name__)
+
+# Channel notified by the `data.products` trigger, see `db/init.sql`
+CHANNEL = "products_changed"
+REFRESH_INTERVAL = settings.catalog.refresh_interval
+RECONNECT_INTERVAL = settings.catalog.reconnect_interval
+
+
+class ProductCatalog:
+    """
+    Class to serve products from memory
+
+    All products are loaded at startup and reloaded when the `data.products` trigger
+    notifies `CHANNEL`, or every `refresh_interval` seconds in case a notification is lost.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = REFRESH_INTERVAL,
+        reconnect_interval: float = RECONNECT_INTERVAL,
+    ):
+        self.refresh_interval = refresh_interval
+        self.reconnect_interval = reconnect_interval
+        self._products: Dict[str, Products] = {}
+        self._loaded = False
+        self._changed: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def load(self) -> None:
+        """Load all products from the database"""
+        products = await Products.all()
+        self._products = {str(product.id): product for product in products}
+        self._loaded = True
+        logger.info(f"Product catalog loaded with {len(products)} products.")
+
+    async def _get_products(self) -> Dict[str, Products]:
+        if not self._loaded:
+            # The catalog is not started by the app lifecycle, e.g. in scripts
+            await self.load()
+        return self._products
+
+    async def get(self, product_id: str) -> Optional[Products]:
+        """
+        Get product by identifier
+
+        @note: a product missing in the catalog is looked up in the database,
+        as it may be created after the last reload
+        @param product_id: product identifier
+        @return: class `Products` instance if it exists, otherwise, `None`
+        """
+        products = await self._get_products()
+        product = products.get(str(product_id))
+        if product is None:
+            product = await ProductRepository.get_by_id(product_id)
+            if product is not None:
+                self.invalidate()
+        return product
+
+    async def get_active(self) -> List[Products]:
+        """
+        Get all active products
+
+        @return: list of class `Products` instances
+        """
+        products = await self._get_products()
+        return [product for product in products.values() if product.active]
+
+    def invalidate(self, *args) -> None:
+        """Reload the catalog in background, called by Postgres notifications"""
+        if self._changed:
+            self._changed.set()
+
+    async def _run_reload_loop(self, changed: asyncio.Event) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(changed.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Notifications received during the reload trigger one more reload
+            changed.clear()
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Error while reloading product catalog: {e!r}")
+
+    async def _run_listener(self) -> None:
+        credentials = settings.db
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=credentials.host,
+                    port=credentials.port,
+                    user=credentials.user,
+                    password=credentials.password,
+                    database=credentials.database,
+                )
+                await connection.add_listener(CHANNEL, self.invalidate)
+                # Changes made while the listener was disconnected are not notified
+                self.invalidate()
+                logger.info(f"Product catalog is listening to '{CHANNEL}'.")
+                while not connection.is_closed():
+                    await asyncio.sleep(self.reconnect_interval)
+                logger.warning("Product catalog listener connection is closed.")
+            except (
+                OSError,
+                asyncio.TimeoutError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ) as e:
+                # `InterfaceError` is raised e.g. when the connection is closed under the listener
+                logger.error(f"Error while listening to product changes: {e!r}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def start(self) -> None:
+        """Load products and start listening to their changes"""
+        await self.load()
+        if not self._tasks:
+            changed = asyncio.Event()
+            self._changed = changed
+            self._tasks = [
+                asyncio.create_task(self._run_reload_loop(changed)),
+                asyncio.create_task(self._run_listener()),
+            ]
+
+    async def close(self) -> None:
+        """Stop listening to product changes"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._changed = None
+
+
+product_catalog = ProductCatalog()
@@ -0,0 +1,346 @@
+"""Module with order state applying service"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from src.clients import get_order_gateway
+from src.clients.abstract import AbstractClientAdapter
+from src.core.settings import settings
+from src.db.models import Orders
+from src.db.repositories.billing import BillingRepository
+from src.db.repositories.order import OrderRepository
+from src.db.repositories.payment_method import PaymentMethodRepository
+from src.db.repositories.subscription import SubscriptionRepository
+from src.models.common import OrderState, Payment, PaymentMethod, Refund
+from src.resources.error_messages import (
+    ORDER_IS_PAID,
+    ORDER_NOT_FOUND,
+    ORDER_STATUS_UNAVAILABLE,
+)
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+
+logger = logging.getLogger(__name__)
+
+RESERVE_TIMEOUT = settings.orders.reserve_timeout
+RECOVERY_MAX_AGE = settings.orders.recovery_max_age
+RECOVERY_BATCH_SIZE = settings.orders.recovery_batch_size
+UPDATE_CONCURRENCY = settings.orders.update_concurrency
+
+
+async def apply_order_state(
+    order: Orders,
+    order_status: OrderState,
+    payment_gateway: AbstractClientAdapter,
+    user_payment_method: Optional[PaymentMethod] = None,
+) -> None:
+    """
+    Apply order state received from a payment system
+
+    @note: paid order made by user saves user payment method and pre-activates subscription.
+    The order row is locked, so the state received both by webhook and by polling is applied once
+    @param order: class `Orders` instance with prefetched subscription and payment method
+    @param order_status: order state in the payment system
+    @param payment_gateway: payment system client adapter of the order
+    @param user_payment_method: payment method of the paid order if it is already known,
+    otherwise, it is requested from the payment system
+    """
+    is_paid_by_user = (
+        order_status == OrderState.PAID
+        and not order.is_automatic
+        and not order.is_refund
+    )
+    # Payment method to be saved for the user, it is known only for orders paid by user
+    paid_by: Optional[PaymentMethod] = None
+    if is_paid_by_user:
+        paid_by = user_payment_method or await payment_gateway.get_payment_method(
+            order,
+        )
+
+    async with in_transaction():
+        current_state = await OrderRepository.get_state_for_update(order.id)
+        if current_state == OrderState.PAID:
+            logger.info(f"Order {order.id} is already paid.")
+            return
+
+        payment_method = order.payment_method
+        if paid_by:
+            payment_method = await PaymentMethodRepository.create(
+                user_id=order.user_id,
+                external_id=paid_by.id,
+                payment_type=paid_by.type,
+                payment_system=order.payment_system,
+                data=paid_by.data,
+            )
+            logger.info(
+                f"Payment method {payment_method.id} for order {order.id} / user {order.user_id} created successfully."
+            )
+
+            await SubscriptionRepository.pre_activate(order.subscription.id)
+
+        if payment_method:
+            await OrderRepository.update(
+                order.id,
+                state=order_status,
+                payment_method=payment_method,
+            )
+            logger.info(
+                f"Order {order.id} updated successfully with state {order_status.value} "
+                f"and payment method {payment_method.id}."
+            )
+
+        else:
+            await OrderRepository.update(
+                order.id,
+                state=order_status,
+            )
+            logger.info(
+                f"Order {order.id} updated successfully with state {order_status.value}."
+            )
+
+
+async def finalize_payment(
+    order: Orders, payment: Payment, gateway: Optional[str] = None
+) -> None:
+    """
+    Save payment created for a reserved order
+
+    @param order: class `Orders` instance committed before the payment system call
+    @param payment: created payment data
+    @param gateway: name of the gateway the payment is created with, if it is chosen by the call
+    """
+    fields = {"gateway": gateway} if gateway else {}
+    await OrderRepository.update(
+        order.id,
+        external_id=payment.id,
+        state=payment.state,
+        **fields,
+    )
+    logger.info(
+        f"Order {order.id} updated state to {payment.state} and now has external id {payment.id}"
+    )
+
+
+async def finalize_refund(refund_order: Orders, refund: Refund) -> None:
+    """
+    Save refund created for a reserved refund order and deactivate its subscription
+
+    @param refund_order: class `Orders` instance committed before the payment system call
+    @param refund: created refund data
+    """
+    async with in_transaction():
+        await OrderRepository.update(
+            refund_order.id, external_id=refund.id, state=refund.state
+        )
+        await SubscriptionRepository.to_deactivate(refund_order.subscription_id)
+    logger.info(
+        f"Refund order {refund_order.id} created refund {refund.id}, "
+        f"subscription {refund_order.subscription_id} is going to be deactivated soon"
+    )
+
+
+async def _recover_order(order: Orders, created_after: datetime) -> OrderState:
+    if not order.is_automatic and not order.is_refund:
+        await BillingRepository.discard_unsent_order(order)
+        return OrderState.ERROR
+
+    if order.created < created_after:
+        # The payment system may not recognize the idempotency key anymore
+        logger.error(
+            f"Order {order.id} was not sent to {order.payment_system} in time, "
+            f"check it in the payment system dashboard."
+        )
+        await OrderRepository.update(order.id, state=OrderState.ERROR)
+        return OrderState.ERROR
+
+    # The call is repeated with the order idempotency key, so nothing is charged twice
+    payment_gateway = get_order_gateway(order)
+    if order.is_refund:
+        refund = await payment_gateway.create_refund(order)
+        await finalize_refund(order, refund)
+        return refund.state
+
+    payment = await payment_gateway.create_recurring_payment(order)
+    await finalize_payment(order, payment)
+    return payment.state
+
+
+async def recover_unsent_orders(
+    reserve_timeout: float = RESERVE_TIMEOUT,
+    max_age: float = RECOVERY_MAX_AGE,
+    limit: int = RECOVERY_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Finish orders reserved, but not sent to a payment system, e.g. after a worker crash
+
+    @note: orders made by user are deleted with their subscriptions, recurring payments and refunds
+    are sent again with the same idempotency key unless they are older than `max_age`
+    @param reserve_timeout: seconds after which an unsent order is considered abandoned
+    @param max_age: seconds after which an unsent order is not sent again
+    @param limit: maximum number of orders to recover
+    @return: `dict` with numbers of recovered and failed orders
+    """
+    now = timezone.now()
+    orders = await OrderRepository.get_unsent_orders(
+        now - timedelta(seconds=reserve_timeout), limit
+    )
+    created_after = now - timedelta(seconds=max_age)
+    recovered, failed = 0, 0
+    for order in orders:
+        try:
+            state = await _recover_order(order, created_after)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Error while recovering order {order.id}: {e!r}")
+            continue
+        recovered += 1
+        logger.info(f"Unsent order {order.id} is recovered with state {state}.")
+    return {"recovered": recovered, "failed": failed}
+
+
+async def _get_group_statuses(
+    semaphore: asyncio.Semaphore, orders: List[Orders]
+) -> Dict[str, OrderState]:
+    first_order = orders[0]
+    async with semaphore:
+        try:
+            payment_gateway = get_order_gateway(first_order)
+            if first_order.is_refund:
+                return await payment_gateway.get_refund_statuses(orders)
+            return await payment_gateway.get_payment_statuses(orders)
+        except Exception as e:
+            # Orders of the group are reported as having unavailable status
+            logger.error(
+                f"Error while getting statuses of {len(orders)} orders "
+                f"from {first_order.gateway or first_order.payment_system}: {e!r}",
+            )
+            return {}
+
+
+async def _get_order_statuses(
+    orders: List[Orders], concurrency: int
+) -> Dict[str, OrderState]:
+    # Orders of one gateway are requested with one bulk call per operation
+    groups: Dict[Tuple[str, bool], List[Orders]] = defaultdict(list)
+    for order in orders:
+        groups[(order.gateway or order.payment_system, order.is_refund)].append(order)
+    semaphore = asyncio.Semaphore(concurrency)
+    calls = (_get_group_statuses(semaphore, group) for group in groups.values())
+
+    statuses: Dict[str, OrderState] = {}
+    for group_statuses in await asyncio.gather(*calls):
+        statuses.update(group_statuses)
+    return statuses
+
+
+def _classify_orders(
+    orders: List[Orders], statuses: Dict[str, OrderState]
+) -> Tuple[Dict[str, OrderState], List[Orders]]:
+    # Only orders paid by user need their payment methods, so they are applied one by one
+    states, paid_by_user = {}, []
+    for order in orders:
+        order_status = statuses.get(str(order.id))
+        if order_status is None or order_status == order.state:
+            continue
+        if (
+            order_status == OrderState.PAID
+            and not order.is_automatic
+            and not order.is_refund
+        ):
+            paid_by_user.append(order)
+        else:
+            states[str(order.id)] = order_status
+    return states, paid_by_user
+
+
+async def _apply_paid(semaphore: asyncio.Semaphore, order: Orders) -> Optional[str]:
+    async with semaphore:
+        try:
+            # The payment method is requested from the payment system of the order
+            await apply_order_state(order, OrderState.PAID, get_order_gateway(order))
+        except Exception as e:
+            logger.error(f"Error while updating order {order.id}: {e!r}")
+            return ORDER_STATUS_UNAVAILABLE
+    return None
+
+
+async def _apply_paid_by_user(
+    orders: List[Orders], concurrency: int
+) -> Tuple[List[str], Dict[str, str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(_apply_paid(semaphore, order) for order in orders))
+    paid, errors = [], {}
+    for order, error in zip(orders, results):
+        if error:
+            errors[str(order.id)] = error
+        else:
+            paid.append(str(order.id))
+    return paid, errors
+
+
+def _get_result(
+    order_id: str,
+    order: Optional[Orders],
+    statuses: Dict[str, OrderState],
+    updated: Dict[str, OrderState],
+    errors: Dict[str, str],
+) -> dict:
+    if not order:
+        return {
+            "id": order_id,
+            "state": None,
+            "updated": False,
+            "error": ORDER_NOT_FOUND,
+        }
+    if order.state == OrderState.PAID:
+        error = ORDER_IS_PAID
+    elif order_id not in statuses:
+        error = ORDER_STATUS_UNAVAILABLE
+    else:
+        error = errors.get(order_id)
+    return {
+        "id": order_id,
+        "state": updated.get(order_id, order.state),
+        "updated": order_id in updated,
+        "error": error,
+    }
+
+
+async def update_orders_info(
+    order_ids: List[str], concurrency: int = UPDATE_CONCURRENCY
+) -> List[dict]:
+    """
+    Apply order states received from payment systems to many orders
+
+    @note: orders are loaded with one query and their states are saved with one query,
+    only orders paid by user are applied separately to save their payment methods.
+    Orders of a payment system that failed to answer get error `ORDER_STATUS_UNAVAILABLE`
+    @param order_ids: order identifiers
+    @param concurrency: maximum number of concurrent payment system calls
+    @return: `dict` results with `id`, `state`, `updated` and `error` in the order of `order_ids`
+    """
+    orders = {
+        str(order.id): order for order in await OrderRepository.get_many(order_ids)
+    }
+    unpaid_orders = [
+        order for order in orders.values() if order.state != OrderState.PAID
+    ]
+    statuses = await _get_order_statuses(unpaid_orders, concurrency)
+    states, paid_by_user = _classify_orders(unpaid_orders, statuses)
+
+    # Updated order identifier to its new state
+    updated = {
+        order_id: states[order_id]
+        for order_id in await OrderRepository.update_states(states)
+    }
+    paid, errors = await _apply_paid_by_user(paid_by_user, concurrency)
+    updated.update(dict.fromkeys(paid, OrderState.PAID))
+    logger.info(f"Orders updated: {len(updated)} of {len(order_ids)}.")
+
+    return [
+        _get_result(order_id, orders.get(order_id), statuses, updated, errors)
+        for order_id in map(str, order_ids)
+    ]
@@ -0,0 +1,241 @@
+"""Module with public key store of the auth service"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from authlib.jose import JsonWebKey, Key
+
+logger = logging.getLogger(__name__)
+
+RawKeys = Dict[Optional[str], str]
+Keys = Dict[Optional[str], Key]
+
+
+class GettingPubKeyError(Exception):
+    """Exception class for error while getting a public key for a token verifying"""
+
+    pass
+
+
+def _parse_keys(body: dict) -> RawKeys:
+    """
+    Get keys from auth service response
+
+    @param body: `{"keys": [{"kid": ..., "public_key": ...}]}` or `{"public_key": ...}`
+    @return: key identifier to public key mapping, single key has `None` identifier
+    """
+    keys = body.get("keys")
+    if keys is not None:
+        return {key.get("kid"): key["public_key"] for key in keys}
+    return {None: body["public_key"]}
+
+
+def _import_keys(raw_keys: RawKeys) -> Keys:
+    """
+    Parse PEM public keys once, so that tokens are verified without parsing them again
+
+    @param raw_keys: key identifier to PEM public key mapping
+    @return: key identifier to key object mapping
+    """
+    return {kid: JsonWebKey.import_key(key) for kid, key in raw_keys.items()}
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        logger.error(f"Error while refreshing public keys: {task.exception()}")
+
+
+class PublicKeyStore:
+    """
+    Class to keep auth service public keys fresh without blocking token verification
+
+    Keys are refreshed in background every `ttl` seconds, stale keys are served while
+    the refresh is in progress or the auth service is down. The last fetched keys are
+    saved to disk to be used right after a restart.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 300,
+        timeout: float = 5,
+        min_refresh_interval: float = 10,
+        cache_path: Optional[str] = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.min_refresh_interval = min_refresh_interval
+        self.cache_path = cache_path
+        self.on_rotate: List[Callable[[], None]] = []
+        self._raw_keys: RawKeys = {}
+        self._keys: Keys = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._refresh_loop: Optional[asyncio.Task] = None
+
+    def _set_keys(self, raw_keys: RawKeys, keys: Keys) -> None:
+        rotated = bool(self._raw_keys) and raw_keys != self._raw_keys
+        self._raw_keys = raw_keys
+        self._keys = keys
+        if rotated:
+            logger.info("Auth service public keys are rotated.")
+            for callback in self.on_rotate:
+                callback()
+
+    def _load_from_disk(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                raw_keys = _parse_keys(json.load(f))
+            keys = _import_keys(raw_keys)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load public keys from {self.cache_path}: {e}")
+            return
+        self._set_keys(raw_keys, keys)
+        # Keys from disk are served, but they are refreshed as soon as possible
+        self._fetched_at = None
+        logger.info(f"Last known public keys loaded from {self.cache_path}.")
+
+    def _save_to_disk(self) -> None:
+        if not self.cache_path:
+            return
+        body = {
+            "keys": [
+                {"kid": kid, "public_key": key} for kid, key in self._raw_keys.items()
+            ]
+        }
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(body, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save public keys to {self.cache_path}: {e}")
+
+    async def _fetch(self) -> None:
+        """
+        Get public keys from auth service
+
+        @raise:
+            - `GettingPubKeyError`: if the auth service does not respond with keys
+        """
+        self._attempted_at = time.monotonic()
+        try:
+            async with ClientSession(
+                timeout=ClientTimeout(total=self.timeout)
+            ) as session:
+                async with session.get(self.url) as resp:
+                    if resp.status != 200:
+                        raise GettingPubKeyError(
+                            f"Auth service responded {resp.status}"
+                        )
+                    raw_keys = _parse_keys(await resp.json())
+            keys = _import_keys(raw_keys)
+        except (ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            raise GettingPubKeyError(repr(e))
+
+        self._set_keys(raw_keys, keys)
+        self._fetched_at = time.monotonic()
+        self._save_to_disk()
+
+    def _start_refresh(self) -> asyncio.Task:
+        refreshing = self._refreshing
+        if not refreshing or refreshing.done():
+            refreshing = asyncio.create_task(self._fetch())
+            refreshing.add_done_callback(_log_refresh_error)
+            self._refreshing = refreshing
+        return refreshing
+
+    async def refresh(self) -> None:
+        """
+        Refresh public keys, concurrent callers share one request to the auth service
+
+        @raise:
+            - `GettingPubKeyError`: if the auth service does not respond with keys
+        """
+        await asyncio.shield(self._start_refresh())
+
+    @property
+    def is_stale(self) -> bool:
+        """Property to check whether keys are older than `ttl`"""
+        return (
+            self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+        )
+
+    def _can_refresh(self) -> bool:
+        return (
+            self._attempted_at is None
+            or time.monotonic() - self._attempted_at >= self.min_refresh_interval
+        )
+
+    def _lookup(self, kid: Optional[str]) -> Optional[Key]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if kid is None and len(self._keys) == 1:
+            # The token is signed without a key identifier
+            return next(iter(self._keys.values()))
+        return None
+
+    async def get(self, kid: Optional[str] = None) -> Optional[Key]:
+        """
+        Get public key to verify token signature
+
+        @note: waits for the auth service only if there is no key with the identifier,
+        stale keys are returned while they are refreshed in background
+        @param kid: key identifier from the token header
+        @return: public key object if it is known, otherwise, `None`
+        @raise:
+            - `GettingPubKeyError`: if there are no keys at all and the auth service is down
+        """
+        key = self._lookup(kid)
+        if key is not None:
+            if self.is_stale and self._can_refresh():
+                self._start_refresh()
+            return key
+
+        # Unknown key may be a rotated one
+        in_progress = self._refreshing and not self._refreshing.done()
+        if in_progress or self._can_refresh():
+            try:
+                await self.refresh()
+            except GettingPubKeyError:
+                pass
+
+        if not self._keys:
+            raise GettingPubKeyError("Auth service public keys are unavailable")
+        if list(self._keys) == [None]:
+            # The auth service does not publish key identifiers
+            return self._keys[None]
+        return self._lookup(kid)
+
+    async def _run_refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except GettingPubKeyError:
+                await asyncio.sleep(self.min_refresh_interval)
+            else:
+                await asyncio.sleep(self.ttl)
+
+    async def start(self) -> None:
+        """Load last known keys and start refreshing keys in background"""
+        self._load_from_disk()
+        if not self._refresh_loop:
+            self._refresh_loop = asyncio.create_task(self._run_refresh_loop())
+
+    async def close(self) -> None:
+        """Stop refreshing keys"""
+        for task in (self._refresh_loop, self._refreshing):
+            if task and not task.done():
+                task.cancel()
+        self._refresh_loop = None
+        self._refreshing = None
@@ -0,0 +1,141 @@
+"""Module with dispatcher delivering saved role changes to the auth service"""
+
+import asyncio
+import logging
+from typing import List, Optional
+
+from src.core.settings import settings
+from src.db.repositories.role_outbox import RoleOutboxRepository
+from src.models.common import RoleAction
+from src.services.roles import (
+    RoleServiceConflictError,
+    RoleServiceNotFoundError,
+    RolesService,
+    roles_service,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = settings.auth.roles_outbox_batch_size
+INTERVAL = settings.auth.roles_outbox_interval
+LEASE = settings.auth.roles_outbox_lease
+MAX_ATTEMPTS = settings.auth.roles_outbox_max_attempts
+MAX_BACKOFF = settings.auth.roles_outbox_max_backoff
+
+
+class RoleOutboxDispatcher:
+    """
+    Class to deliver role changes saved with subscription changes to the auth service
+
+    Changes are delivered by every worker in background, a claimed change is not taken
+    by other workers for `lease` seconds. Failed deliveries are retried with exponential
+    backoff up to `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        service: RolesService,
+        batch_size: int = BATCH_SIZE,
+        interval: float = INTERVAL,
+        lease: float = LEASE,
+        max_attempts: int = MAX_ATTEMPTS,
+        max_backoff: float = MAX_BACKOFF,
+    ):
+        self.service = service
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        """Deliver saved changes without waiting for the next interval"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    @staticmethod
+    def _describe(error: Exception) -> str:
+        return getattr(error, "msg", None) or repr(error)
+
+    def _get_delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.interval * 2 ** attempts)
+
+    async def _handle_result(self, change: dict, error: Optional[Exception]) -> None:
+        action = change["action"]
+        user_role = f"role {change['role_id']} of user {change['user_id']}"
+        if error is None or (
+            action == RoleAction.GRANT and isinstance(error, RoleServiceConflictError)
+        ):
+            await RoleOutboxRepository.mark_delivered(change)
+            logger.info(f"Auth service {action} of {user_role} is delivered.")
+        elif isinstance(error, RoleServiceNotFoundError):
+            await RoleOutboxRepository.mark_delivered(change, error=error.msg)
+            logger.error(f"Auth service {action} of {user_role} failed: {error.msg}")
+        elif change["attempts"] + 1 >= self.max_attempts:
+            description = self._describe(error)
+            await RoleOutboxRepository.mark_delivered(change, error=description)
+            logger.error(
+                f"Auth service {action} of {user_role} is given up: {description}"
+            )
+        else:
+            description = self._describe(error)
+            delay = self._get_delay(change["attempts"])
+            await RoleOutboxRepository.retry_later(change, delay, description)
+            logger.warning(
+                f"Auth service {action} of {user_role} failed: {description}, "
+                f"retrying in {delay} seconds."
+            )
+
+    async def dispatch(self) -> int:
+        """
+        Deliver one batch of due role changes
+
+        @return: number of claimed changes
+        """
+        changes = await RoleOutboxRepository.claim(self.batch_size, self.lease)
+        senders = (
+            (RoleAction.GRANT, self.service.grant_roles),
+            (RoleAction.REVOKE, self.service.revoke_roles),
+        )
+        for action, send in senders:
+            batch: List[dict] = [c for c in changes if c["action"] == action]
+            if not batch:
+                continue
+            errors = await send([(c["user_id"], c["role_id"]) for c in batch])
+            for change, error in zip(batch, errors):
+                await self._handle_result(change, error)
+        return len(changes)
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while True:
+            wakeup.clear()
+            try:
+                claimed = await self.dispatch()
+            except Exception as e:
+                logger.error(f"Error while delivering role changes: {e!r}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start delivering role changes in background"""
+        if not self._loop_task:
+            wakeup = asyncio.Event()
+            self._wakeup = wakeup
+            self._loop_task = asyncio.create_task(self._run(wakeup))
+
+    async def close(self) -> None:
+        """Stop delivering role changes"""
+        if self._loop_task:
+            self._loop_task.cancel()
+        self._loop_task = None
+        self._wakeup = None
+
+
+role_outbox_dispatcher = RoleOutboxDispatcher(roles_service)
@@ -1,10 +1,19 @@
 """Module with role management service"""
 
+import asyncio
 import logging
+from contextlib import AsyncExitStack
+from typing import List, Optional, Tuple
 
-import aiohttp
 import backoff
-from aiohttp import ClientConnectorError, ClientResponse, ServerConnectionError
+from aiohttp import (
+    ClientConnectorError,
+    ClientError,
+    ClientResponse,
+    ClientSession,
+    ServerConnectionError,
+)
+from src.core.http import SessionHolder
 from src.core.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -12,6 +21,17 @@ logger = logging.getLogger(__name__)
 BACKOFF_FACTOR = settings.backoff.factor
 BACKOFF_BASE = settings.backoff.base
 BACKOFF_MAX_VALUE = settings.backoff.max_value
+MAX_RETRY_TIME = settings.auth.roles_max_retry_time
+CONCURRENCY = settings.auth.roles_concurrency
+
+roles_session = SessionHolder(
+    "auth_roles",
+    limit=settings.auth.roles_pool_limit,
+    timeout=settings.auth.roles_request_timeout,
+)
+
+# User identifier and role identifier
+UserRole = Tuple[str, str]
 
 
 class RoleServiceException(Exception):
@@ -45,22 +65,50 @@ async def handle_response(resp: ClientResponse) -> ClientResponse:
     Handle response from auth service
 
     @param resp: `aiohttp.ClientResponse` response object
-    @return: `aiohttp.ClientResponse` object for the cases where response has status code 200.
-    @raise: one of exceptions from `EXCEPTIONS_MAPPING` dictionary depending on response status code
+    @return: `aiohttp.ClientResponse` object for the cases where response has a success status code.
+    @raise: one of exceptions from `EXCEPTIONS_MAPPING` dictionary depending on response status code,
+    `RoleServiceException` for other error status codes
     """
-    exception_cls = EXCEPTIONS_MAPPING[resp.status]
-    if not exception_cls:
+    if resp.status < 400:
         return resp
-    body = await resp.json()
-    description = body["description"]
+    exception_cls = EXCEPTIONS_MAPPING.get(resp.status, RoleServiceException)
+    try:
+        body = await resp.json(content_type=None)
+        description = body["description"]
+    except (ValueError, TypeError, KeyError):
+        description = f"Auth service responded {resp.status}"
     raise exception_cls(description)
 
 
 class RolesService:
     """Class to perform granting and revoking roles to users"""
 
-    def __init__(self, url_pattern: str):
+    def __init__(
+        self,
+        url_pattern: str,
+        session_holder: SessionHolder = None,
+        concurrency: int = CONCURRENCY,
+    ):
         self.url_pattern = url_pattern
+        self.session_holder = session_holder or roles_session
+        self.concurrency = concurrency
+
+    async def start(self) -> None:
+        """Open the pooled session"""
+        await self.session_holder.start()
+
+    async def close(self) -> None:
+        """Close the pooled session"""
+        await self.session_holder.close()
+
+    async def _request(self, method: str, url: str) -> None:
+        async with AsyncExitStack() as stack:
+            session = self.session_holder.session
+            if session is None:
+                # Session is not started by the app lifecycle, e.g. in scripts
+                session = await stack.enter_async_context(ClientSession())
+            resp = await stack.enter_async_context(session.request(method, url))
+            await handle_response(resp)
 
     @backoff.on_exception(
         backoff.expo,
@@ -68,11 +116,10 @@ class RolesService:
         base=BACKOFF_BASE,
         factor=BACKOFF_FACTOR,
         max_value=BACKOFF_MAX_VALUE,
+        max_time=MAX_RETRY_TIME,
     )
-    async def _request(self, method: str, url: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url) as resp:
-                return handle_response(resp)
+    async def _request_with_retries(self, method: str, url: str) -> None:
+        await self._request(method, url)
 
     async def grant_role(self, user_id: str, role_id: str) -> None:
         """
@@ -83,7 +130,7 @@ class RolesService:
         """
         method = "POST"
         url = self.url_pattern % (user_id, role_id)
-        await self._request(method, url)
+        await self._request_with_retries(method, url)
 
     async def revoke_role(self, user_id: str, role_id: str) -> None:
         """
@@ -94,13 +141,68 @@ class RolesService:
         """
         method = "DELETE"
         url = self.url_pattern % (user_id, role_id)
-        await self._request(method, url)
+        await self._request_with_retries(method, url)
+
+    async def _batch_request(
+        self,
+        semaphore: asyncio.Semaphore,
+        method: str,
+        user_role: UserRole,
+    ) -> Optional[Exception]:
+        async with semaphore:
+            try:
+                # Failed changes are retried by the caller, e.g. the outbox dispatcher
+                await self._request(method, self.url_pattern % user_role)
+            except (RoleServiceException, ClientError, asyncio.TimeoutError) as e:
+                return e
+            return None
+
+    async def _batch(
+        self,
+        method: str,
+        user_roles: List[UserRole],
+    ) -> List[Optional[Exception]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return list(
+            await asyncio.gather(
+                *(
+                    self._batch_request(semaphore, method, user_role)
+                    for user_role in user_roles
+                ),
+            ),
+        )
+
+    async def grant_roles(
+        self, user_roles: List[UserRole]
+    ) -> List[Optional[Exception]]:
+        """
+        Perform role granting for many users with bounded concurrency
+
+        @note: calls are not retried, errors of an unreachable auth service are returned
+        @param user_roles: list of user identifier and role identifier pairs
+        @return: exceptions in the order of `user_roles`, `None` for granted roles
+        """
+        return await self._batch("POST", user_roles)
+
+    async def revoke_roles(
+        self, user_roles: List[UserRole]
+    ) -> List[Optional[Exception]]:
+        """
+        Perform role revoking for many users with bounded concurrency
+
+        @note: calls are not retried, errors of an unreachable auth service are returned
+        @param user_roles: list of user identifier and role identifier pairs
+        @return: exceptions in the order of `user_roles`, `None` for revoked roles
+        """
+        return await self._batch("DELETE", user_roles)
+
+
+roles_service = RolesService(settings.auth.get_roles_url())
 
 
 def get_roles_service() -> RolesService:
     """
     Get configured class `RolesService` instance
-    @return: class `RolesService` instance
+    @return: class `RolesService` instance sharing the pooled session
     """
-    roles_url_pattern = settings.auth.get_roles_url()
-    return RolesService(roles_url_pattern)
+    return roles_service
@@ -0,0 +1,202 @@
+"""Module with subscription batch lifecycle service"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from src.clients import get_order_gateway
+from src.core.settings import settings
+from src.db.models import Orders, PaymentMethods, Subscriptions
+from src.db.repositories.payment_method import PaymentMethodRepository
+from src.db.repositories.recurring_order import RecurringOrderRepository
+from src.db.repositories.role_outbox import RoleOutboxRepository
+from src.db.repositories.subscription import SubscriptionRepository
+from src.models.common import Payment, RoleAction, SubscriptionState
+from src.resources.error_messages import (
+    INACTIVE_PRODUCT,
+    PAID_ORDER_NOT_FOUND,
+    PAYMENT_METHOD_NOT_FOUND,
+    PAYMENT_SYSTEM_UNAVAILABLE,
+    RECURRING_PAYMENT_IN_PROCESS,
+    SUBSCRIPTION_NOT_FOUND,
+)
+from src.services.role_outbox import role_outbox_dispatcher
+from tortoise.transactions import in_transaction
+
+logger = logging.getLogger(__name__)
+
+RECURRING_CONCURRENCY = settings.orders.recurring_concurrency
+
+
+def _result(subscription_id: str, error: Optional[str] = None) -> dict:
+    return {"id": subscription_id, "updated": error is None, "error": error}
+
+
+async def _get_subscriptions(
+    subscription_ids: List[str],
+) -> Tuple[Dict[str, Subscriptions], Dict[str, str]]:
+    subscriptions = {
+        str(subscription.id): subscription
+        for subscription in await SubscriptionRepository.get_many(subscription_ids)
+    }
+    errors = {
+        subscription_id: SUBSCRIPTION_NOT_FOUND
+        for subscription_id in subscription_ids
+        if subscription_id not in subscriptions
+    }
+    return subscriptions, errors
+
+
+async def activate_subscriptions(subscription_ids: List[str]) -> List[dict]:
+    """
+    Change state of many subscriptions to `active`
+
+    @note: subscriptions are changed with one transaction, roles of subscriptions
+    that were not active are granted by the outbox dispatcher after the commit
+    @param subscription_ids: subscription identifiers
+    @return: `dict` results with `id`, `updated` and `error` in the order of `subscription_ids`
+    """
+    subscriptions, errors = await _get_subscriptions(subscription_ids)
+    role_changes = [
+        (subscription.user_id, subscription.product.role_id, RoleAction.GRANT)
+        for subscription in subscriptions.values()
+        if subscription.state
+        in [SubscriptionState.INACTIVE, SubscriptionState.PRE_ACTIVE]
+    ]
+    async with in_transaction():
+        await SubscriptionRepository.activate_many(list(subscriptions.values()))
+        await RoleOutboxRepository.enqueue_many(role_changes)
+
+    role_outbox_dispatcher.wake()
+    logger.info(
+        f"Subscriptions activated: {len(subscriptions)} of {len(subscription_ids)}, "
+        f"roles to grant: {len(role_changes)}."
+    )
+    return [_result(id_, errors.get(id_)) for id_ in subscription_ids]
+
+
+async def deactivate_subscriptions(subscription_ids: List[str]) -> List[dict]:
+    """
+    Deactivate many subscriptions
+
+    @note: subscriptions are changed with one transaction, roles are revoked
+    by the outbox dispatcher after the commit
+    @param subscription_ids: subscription identifiers
+    @return: `dict` results with `id`, `updated` and `error` in the order of `subscription_ids`
+    """
+    subscriptions, errors = await _get_subscriptions(subscription_ids)
+    async with in_transaction():
+        await SubscriptionRepository.deactivate_many(list(subscriptions))
+        await RoleOutboxRepository.enqueue_many(
+            [
+                (subscription.user_id, subscription.product.role_id, RoleAction.REVOKE)
+                for subscription in subscriptions.values()
+            ]
+        )
+
+    role_outbox_dispatcher.wake()
+    logger.info(
+        f"Subscriptions deactivated: {len(subscriptions)} of {len(subscription_ids)}."
+    )
+    return [_result(id_, errors.get(id_)) for id_ in subscription_ids]
+
+
+def _check_subscription(
+    subscription: Subscriptions,
+    payment_method: Optional[PaymentMethods],
+    order: Optional[Orders],
+) -> Optional[str]:
+    if not subscription.product.active:
+        return INACTIVE_PRODUCT
+    if not payment_method:
+        return PAYMENT_METHOD_NOT_FOUND
+    if order and order.external_id:
+        return RECURRING_PAYMENT_IN_PROCESS
+    return None
+
+
+async def _reserve_recurring_orders(
+    subscriptions: Dict[str, Subscriptions], errors: Dict[str, str]
+) -> Dict[str, Orders]:
+    subscription_ids = list(subscriptions)
+    payment_methods = await PaymentMethodRepository.get_defaults(
+        [str(subscription.user_id) for subscription in subscriptions.values()]
+    )
+    pending_orders = await RecurringOrderRepository.get_pending_recurring_orders(
+        subscription_ids
+    )
+    previous_orders = await RecurringOrderRepository.get_subscription_orders(
+        subscription_ids
+    )
+
+    orders: Dict[str, Orders] = {}
+    new_orders: List[Tuple[Orders, PaymentMethods]] = []
+    for subscription_id, subscription in subscriptions.items():
+        payment_method = payment_methods.get(str(subscription.user_id))
+        order = pending_orders.get(subscription_id)
+        previous_order = previous_orders.get(subscription_id)
+        error = _check_subscription(subscription, payment_method, order)
+        if error:
+            errors[subscription_id] = error
+        elif order:
+            # The unsent order is reused together with its idempotency key
+            orders[subscription_id] = order
+        elif not previous_order:
+            errors[subscription_id] = PAID_ORDER_NOT_FOUND
+        else:
+            new_orders.append((previous_order, payment_method))
+
+    # The orders are committed before the payment gateway calls
+    for order in await RecurringOrderRepository.create_recurring_orders(new_orders):
+        orders[str(order.subscription_id)] = order
+    return orders
+
+
+async def _create_payment(
+    semaphore: asyncio.Semaphore,
+    subscription_id: str,
+    order: Orders,
+    errors: Dict[str, str],
+) -> Optional[Payment]:
+    async with semaphore:
+        try:
+            return await get_order_gateway(order).create_recurring_payment(order)
+        except Exception as e:
+            logger.error(
+                f"Error while making a recurring payment for subscription "
+                f"{subscription_id} / order {order.id}: {e!r}",
+            )
+            errors[subscription_id] = PAYMENT_SYSTEM_UNAVAILABLE
+            return None
+
+
+async def withdraw_subscriptions_price(
+    subscription_ids: List[str], concurrency: int = RECURRING_CONCURRENCY
+) -> List[dict]:
+    """
+    Make recurring payments of many subscriptions
+
+    @note: orders are read and created with bulk queries and payments are saved with one query,
+    payment system calls are made concurrently and a failed call fails its subscription only
+    @param subscription_ids: subscription identifiers
+    @param concurrency: maximum number of concurrent payment system calls
+    @return: `dict` results with `id`, `updated` and `error` in the order of `subscription_ids`
+    """
+    subscriptions, errors = await _get_subscriptions(subscription_ids)
+    orders = await _reserve_recurring_orders(subscriptions, errors)
+    semaphore = asyncio.Semaphore(concurrency)
+    calls = (
+        _create_payment(semaphore, id_, order, errors) for id_, order in orders.items()
+    )
+    results = await asyncio.gather(*calls)
+    payments = {
+        str(order.id): payment
+        for order, payment in zip(orders.values(), results)
+        if payment
+    }
+    # Orders with failed calls stay unsent, the next attempt or the recovery sends them again
+    await RecurringOrderRepository.update_payments(payments)
+    logger.info(
+        f"Recurring payments created: {len(payments)} of {len(subscription_ids)}."
+    )
+    return [_result(id_, errors.get(id_)) for id_ in subscription_ids]
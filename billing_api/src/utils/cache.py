@@ -0,0 +1,79 @@
+"""Module with in-process cache definition"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Cached value with its expiration Unix timestamp
+Entry = Tuple[Any, Optional[float]]
+
+
+class LRUCache:
+    """Bounded cache evicting the least recently used and expired items"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get cached value
+
+        @param key: cache key
+        @return: cached value if it exists, otherwise, `None`
+        """
+        try:
+            value, expires_at = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float = None) -> None:
+        """
+        Put value to the cache
+
+        @param key: cache key
+        @param value: value to cache
+        @param expires_at: Unix timestamp when the value expires, it never expires by default
+        """
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove value from the cache
+
+        @param key: cache key
+        """
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all values from the cache"""
+        self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+
+        @return: `dict` with cache size and hit/miss counters
+        """
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,54 @@
+"""Module with HTTP conditional responses helpers"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*versions: Any) -> str:
+    """
+    Strong entity tag deriving
+
+    @note: the same versions always give the same tag, so it is stable across workers
+    @param versions: versions of rows the response is built from, e.g. identifiers and
+    `modified` fields
+    @return: quoted entity tag
+    """
+    digest = hashlib.sha256("|".join(map(str, versions)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        return tag[2:]
+    return tag
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so weak tags of clients match too
+    return etag in {_strip_weak(tag) for tag in if_none_match.split(",")}
+
+
+def check_etag(
+    request: Request, response: Response, etag: str, cache_control: str
+) -> Optional[Response]:
+    """
+    Conditional response handling
+
+    @param request: incoming request with optional `If-None-Match` header
+    @param response: response to set cache headers to
+    @param etag: entity tag of the current response data
+    @param cache_control: `Cache-Control` header value
+    @return: response with status code 304 if the client has the current data,
+    otherwise, `None`
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
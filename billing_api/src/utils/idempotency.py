@@ -0,0 +1,31 @@
+"""Module with idempotency keys definition way"""
+
+from src.models.common import PaymentOperation
+
+
+def get_idempotency_key(operation: PaymentOperation, entity_id: str) -> str:
+    """
+    Idempotency key deriving
+
+    @note: the same local entity and operation always give the same key, so retries
+    of the request at any layer are collapsed into one remote operation
+    @param operation: remote operation type
+    @param entity_id: local entity identifier, e.g. order or user identifier
+    @return: idempotency key string
+    """
+    return f"{operation.value}-{entity_id}"
+
+
+def get_order_operation(is_refund: bool, is_automatic: bool) -> PaymentOperation:
+    """
+    Order remote operation type getting
+
+    @param is_refund: `True` if order is refund
+    @param is_automatic: `True` if order is created for a recurring payment
+    @return: remote operation performed to pay the order
+    """
+    if is_refund:
+        return PaymentOperation.REFUND
+    if is_automatic:
+        return PaymentOperation.RECURRING_PAYMENT
+    return PaymentOperation.PAYMENT
@@ -0,0 +1,45 @@
+"""Module with fast JSON responses helpers"""
+
+from decimal import Decimal
+from typing import Any, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    # FastAPI encodes decimals as floats, the fast responses keep the same output
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+class FastJSONResponse(JSONResponse):
+    """Response serialized with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+def fast_response(
+    model: Type[BaseModel], data: Any, response: Response, many: bool = False
+) -> FastJSONResponse:
+    """
+    Response building with one validation pass
+
+    @note: endpoint `response_model` is not applied to returned responses,
+    so `data` is validated here only once
+    @param model: output model
+    @param data: `dict` row or list of `dict` rows if `many`
+    @param response: response with headers set by the endpoint, e.g. `ETag`
+    @param many: whether `data` is a list of rows
+    @return: class `FastJSONResponse` instance
+    """
+    content: Any
+    if many:
+        content = [model.parse_obj(row).dict() for row in data]
+    else:
+        content = model.parse_obj(data).dict()
+    return FastJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,60 @@
+"""
+Local Stripe stand-in server
+
+Implements the Stripe API endpoints used by `StripeClient` with configurable
+latency, 429/5xx injection and payment state transitions. Point the billing API
+to it with `STRIPE_URL=http://<host>:<port>/v1`.
+
+Usage (from `billing_api` directory):
+    python -m stripe_stub --profile flaky --port 12111
+    python -m stripe_stub --latency lognormal:0.2:0.5 --rate-429 0.1
+"""
+
+import argparse
+import dataclasses
+import logging
+import os
+
+from aiohttp import web
+
+from .app import create_app
+from .profiles import PROFILES, Latency
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=os.environ.get("STRIPE_STUB_HOST", "0.0.0.0"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("STRIPE_STUB_PORT", 12111))
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=os.environ.get("STRIPE_STUB_PROFILE", "default"),
+    )
+    parser.add_argument("--latency", type=Latency.parse, help="e.g. uniform:0.05:0.2")
+    parser.add_argument("--rate-429", type=float)
+    parser.add_argument("--rate-5xx", type=float)
+    parser.add_argument("--rate-ambiguous-5xx", type=float)
+    parser.add_argument("--processing-delay", type=float)
+    parser.add_argument("--refund-delay", type=float)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    overrides = {
+        profile_field.name: getattr(args, profile_field.name)
+        for profile_field in dataclasses.fields(PROFILES[args.profile])
+        if getattr(args, profile_field.name) is not None
+    }
+    profile = dataclasses.replace(PROFILES[args.profile], **overrides)
+    logging.getLogger(__name__).info(f"Stripe stand-in profile: {profile}")
+
+    web.run_app(create_app(profile), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
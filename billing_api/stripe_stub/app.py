@@ -0,0 +1,210 @@
+"""Module with HTTP application of the Stripe stand-in"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Tuple
+
+from aiohttp import web
+
+from .profiles import Profile
+from .state import StubError, StubState
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+STATE_KEY = "state"
+PROFILE_KEY = "profile"
+STATS_KEY = "stats"
+IDEMPOTENCY_KEY = "idempotency"
+
+
+def _error_response(status: int, error: dict) -> web.Response:
+    return web.json_response({"error": error}, status=status)
+
+
+def _injected_5xx() -> web.Response:
+    return _error_response(
+        500,
+        {
+            "message": "An unknown error occurred (injected by the stand-in)",
+            "type": "api_error",
+        },
+    )
+
+
+@web.middleware
+async def faults_middleware(request: web.Request, handler: Handler):
+    """Add profile latency, check authorization and inject faults"""
+    if request.path.startswith("/_stub"):
+        return await handler(request)
+
+    profile: Profile = request.app[PROFILE_KEY]
+    stats: Counter = request.app[STATS_KEY]
+    resource = request.match_info.route.resource
+    path = resource.canonical if resource else request.path
+    stats[f"{request.method} {path}"] += 1
+
+    await asyncio.sleep(profile.latency.sample())
+
+    if not request.headers.get("Authorization", "").startswith("Bearer "):
+        stats["401"] += 1
+        return _error_response(
+            401,
+            {
+                "message": "You did not provide an API key.",
+                "type": "invalid_request_error",
+            },
+        )
+    if profile.roll(profile.rate_429):
+        stats["429"] += 1
+        return _error_response(
+            429,
+            {
+                "code": "rate_limit",
+                "message": "Too many requests hit the API too quickly.",
+                "type": "invalid_request_error",
+            },
+        )
+    if profile.roll(profile.rate_5xx):
+        stats["5xx"] += 1
+        return _injected_5xx()
+
+    try:
+        response = await handler(request)
+    except StubError as e:
+        response = _error_response(e.status, e.error)
+
+    if request.method == "POST" and profile.roll(profile.rate_ambiguous_5xx):
+        stats["ambiguous_5xx"] += 1
+        return _injected_5xx()
+    return response
+
+
+def idempotent(handler: Handler) -> Handler:
+    """Replay the stored response for a repeated `Idempotency-Key`"""
+
+    async def wrapper(request: web.Request) -> web.StreamResponse:
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return await handler(request)
+
+        responses: Dict[str, Tuple[int, bytes]] = request.app[IDEMPOTENCY_KEY]
+        replay = responses.get(key)
+        if replay:
+            request.app[STATS_KEY]["idempotent_replays"] += 1
+            return web.Response(
+                status=replay[0],
+                body=replay[1],
+                content_type="application/json",
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = await handler(request)
+        except StubError as e:
+            response = _error_response(e.status, e.error)
+        # Stripe does not store results of requests failed with 5xx
+        if isinstance(response, web.Response) and response.status < 500:
+            responses[key] = (response.status, response.body)
+        return response
+
+    return wrapper
+
+
+class StubHandlers:
+    """Class with request handlers of Stripe endpoints"""
+
+    def __init__(self, state: StubState, stats: Counter):
+        self.state = state
+        self.stats = stats
+
+    async def create_customer(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        return web.json_response(self.state.create_customer(data))
+
+    async def get_customer(self, request: web.Request) -> web.Response:
+        customer_id = request.match_info["object_id"]
+        return web.json_response(self.state.get_customer(customer_id))
+
+    async def create_payment_method(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        return web.json_response(self.state.create_payment_method(data))
+
+    async def attach_payment_method(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        payment_method_id = request.match_info["object_id"]
+        return web.json_response(
+            self.state.attach_payment_method(payment_method_id, data),
+        )
+
+    async def create_payment_intent(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        return web.json_response(self.state.create_payment_intent(data))
+
+    async def get_payment_intent(self, request: web.Request) -> web.Response:
+        payment_intent_id = request.match_info["object_id"]
+        return web.json_response(self.state.get_payment_intent(payment_intent_id))
+
+    async def list_payment_intents(self, request: web.Request) -> web.Response:
+        return web.json_response(self.state.list_payment_intents(dict(request.query)))
+
+    async def confirm_payment_intent(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        payment_intent_id = request.match_info["object_id"]
+        return web.json_response(
+            self.state.confirm_payment_intent(payment_intent_id, data),
+        )
+
+    async def create_refund(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        return web.json_response(self.state.create_refund(data))
+
+    async def get_refund(self, request: web.Request) -> web.Response:
+        refund_id = request.match_info["object_id"]
+        return web.json_response(self.state.get_refund(refund_id))
+
+    async def list_refunds(self, request: web.Request) -> web.Response:
+        return web.json_response(self.state.list_refunds(dict(request.query)))
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+
+def create_app(profile: Profile) -> web.Application:
+    """
+    Create Stripe stand-in application
+
+    @param profile: latency and fault injection profile
+    @return: class `aiohttp.web.Application` instance
+    """
+    app = web.Application(middlewares=[faults_middleware])
+    state = StubState(profile)
+    stats: Counter = Counter()
+    app[PROFILE_KEY] = profile
+    app[STATE_KEY] = state
+    app[STATS_KEY] = stats
+    app[IDEMPOTENCY_KEY] = {}
+
+    handlers = StubHandlers(state, stats)
+    add_get, add_post = app.router.add_get, app.router.add_post
+    add_post("/v1/customers", idempotent(handlers.create_customer))
+    add_get("/v1/customers/{object_id}", handlers.get_customer)
+    add_post("/v1/payment_methods", idempotent(handlers.create_payment_method))
+    add_post(
+        "/v1/payment_methods/{object_id}/attach",
+        idempotent(handlers.attach_payment_method),
+    )
+    add_post("/v1/payment_intents", idempotent(handlers.create_payment_intent))
+    add_get("/v1/payment_intents", handlers.list_payment_intents)
+    add_get("/v1/payment_intents/{object_id}", handlers.get_payment_intent)
+    add_post(
+        "/v1/payment_intents/{object_id}/confirm",
+        idempotent(handlers.confirm_payment_intent),
+    )
+    add_post("/v1/refunds", idempotent(handlers.create_refund))
+    add_get("/v1/refunds", handlers.list_refunds)
+    add_get("/v1/refunds/{object_id}", handlers.get_refund)
+    add_get("/_stub/stats", handlers.get_stats)
+    return app
@@ -0,0 +1,98 @@
+"""Module with latency and fault injection profiles of the Stripe stand-in"""
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class Latency:
+    """Latency distribution, all values are in seconds"""
+
+    kind: str = "constant"
+    a: float = 0
+    b: float = 0
+
+    @classmethod
+    def parse(cls, value: str) -> "Latency":
+        """
+        Parse distribution from string
+
+        @param value: string like `constant:0.05`, `uniform:0.05:0.2`, `normal:0.1:0.02`,
+        `lognormal:0.1:0.5` (median and sigma) or `exponential:0.1` (mean)
+        @return: class `Latency` instance
+        """
+        kind, *params = value.split(":")
+        if kind not in _SAMPLERS:
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        return cls(kind, *(float(param) for param in params))
+
+    def sample(self) -> float:
+        """
+        Get random latency from the distribution
+
+        @return: latency in seconds
+        """
+        return max(0, _SAMPLERS[self.kind](self.a, self.b))
+
+
+# Latencies and faults are simulated, so they need no cryptographic randomness
+_SAMPLERS = {
+    "constant": lambda a, b: a,
+    "uniform": lambda a, b: random.uniform(a, b),  # noqa: S311
+    "normal": lambda a, b: random.gauss(a, b),
+    "lognormal": lambda a, b: a * math.exp(random.gauss(0, b)),
+    "exponential": lambda a, b: random.expovariate(1 / a) if a else 0,
+}
+
+
+@dataclass
+class Profile:
+    """Stand-in behaviour profile"""
+
+    # Latency added to every request
+    latency: Latency = field(default_factory=Latency)
+    # Share of requests rejected with 429 before they are handled
+    rate_429: float = 0
+    # Share of requests failed with 5xx before they are handled
+    rate_5xx: float = 0
+    # Share of write requests failed with 5xx after they are applied
+    rate_ambiguous_5xx: float = 0
+    # Seconds a confirmed payment intent stays in `processing` state
+    processing_delay: float = 0
+    # Seconds a refund stays in `pending` state
+    refund_delay: float = 0
+
+    def roll(self, rate: float) -> bool:
+        """
+        Decide if a fault has to be injected
+
+        @param rate: fault probability
+        @return: `True` if the fault has to be injected
+        """
+        return rate > 0 and random.random() < rate  # noqa: S311
+
+
+PROFILES: Dict[str, Profile] = {
+    "instant": Profile(),
+    "default": Profile(latency=Latency("lognormal", 0.12, 0.35)),
+    "slow": Profile(
+        latency=Latency("lognormal", 0.6, 0.5),
+        processing_delay=5,
+        refund_delay=5,
+    ),
+    "flaky": Profile(
+        latency=Latency("lognormal", 0.15, 0.5),
+        rate_429=0.05,
+        rate_5xx=0.02,
+        rate_ambiguous_5xx=0.02,
+        processing_delay=2,
+    ),
+    "degraded": Profile(
+        latency=Latency("lognormal", 1.5, 0.8),
+        rate_429=0.2,
+        rate_5xx=0.3,
+        rate_ambiguous_5xx=0.05,
+    ),
+}
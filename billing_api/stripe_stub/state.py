@@ -0,0 +1,327 @@
+"""Module with in-memory objects storage of the Stripe stand-in"""
+
+import secrets
+import time
+from typing import Dict, List
+
+from .profiles import Profile
+
+DECLINED_CARDS = frozenset(("4000000000000002", "4000000000009995"))
+METADATA_PREFIX = "metadata["
+
+
+class StubError(Exception):
+    """Exception rendered as Stripe error response"""
+
+    def __init__(self, status: int, error: dict, *args):
+        super().__init__(*args)
+        self.status = status
+        self.error = error
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+def _card_brand(number: str) -> str:
+    if number.startswith("4"):
+        return "visa"
+    if number[:2] in {"51", "52", "53", "54", "55"}:
+        return "mastercard"
+    if number[:2] in {"34", "37"}:
+        return "amex"
+    return "unknown"
+
+
+def _not_found(object_type: str, object_id: str) -> StubError:
+    return StubError(
+        404,
+        {
+            "code": "resource_missing",
+            "message": f"No such {object_type}: '{object_id}'",
+            "type": "invalid_request_error",
+        },
+    )
+
+
+def _paginate(objects: List[dict], params: dict) -> dict:
+    """
+    Build list object of the objects sorted from newest to oldest
+
+    @param objects: objects in creation order
+    @param params: `limit`, `starting_after` and `created[gte]` list parameters
+    @return: Stripe list object
+    """
+    limit = min(int(params.get("limit", 10)), 100)
+    created_gte = int(params.get("created[gte]", 0))
+    objects = [obj for obj in reversed(objects) if obj["created"] >= created_gte]
+    starting_after = params.get("starting_after")
+    if starting_after:
+        ids = [obj["id"] for obj in objects]
+        start = ids.index(starting_after) + 1 if starting_after in ids else 0
+        objects = objects[start:]
+    return {
+        "object": "list",
+        "data": objects[:limit],
+        "has_more": len(objects) > limit,
+    }
+
+
+def _get_metadata(data: dict) -> Dict[str, str]:
+    start = len(METADATA_PREFIX)
+    return {
+        key[start:-1]: value
+        for key, value in data.items()
+        if key.startswith(METADATA_PREFIX)
+    }
+
+
+class StubState:
+    """Class to store Stripe objects and to apply their state transitions"""
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.customers: Dict[str, dict] = {}
+        self.payment_methods: Dict[str, dict] = {}
+        self.payment_intents: Dict[str, dict] = {}
+        self.refunds: Dict[str, dict] = {}
+        # Card numbers are not a part of Stripe payment method object
+        self._card_numbers: Dict[str, str] = {}
+        # Timestamps when objects leave their pending states
+        self._settle_at: Dict[str, float] = {}
+
+    def create_customer(self, data: dict) -> dict:
+        customer_id = data.get("id") or _new_id("cus")
+        if customer_id in self.customers:
+            raise StubError(
+                400,
+                {
+                    "code": "resource_already_exists",
+                    "message": "Customer already exists.",
+                    "type": "invalid_request_error",
+                },
+            )
+        customer: dict = {
+            "id": customer_id,
+            "object": "customer",
+            "created": int(time.time()),
+            "email": data.get("email"),
+            "metadata": {},
+        }
+        self.customers[customer_id] = customer
+        return customer
+
+    def get_customer(self, customer_id: str) -> dict:
+        customer = self.customers.get(customer_id)
+        if not customer:
+            raise _not_found("customer", customer_id)
+        return customer
+
+    def create_payment_method(self, data: dict) -> dict:
+        number = data.get("card[number]", "4242424242424242")
+        payment_method_id = _new_id("pm")
+        payment_method = {
+            "id": payment_method_id,
+            "object": "payment_method",
+            "created": int(time.time()),
+            "customer": None,
+            "type": data.get("type", "card"),
+            "card": {
+                "brand": _card_brand(number),
+                "exp_month": int(data.get("card[exp_month]", 12)),
+                "exp_year": int(data.get("card[exp_year]", 2030)),
+                "last4": number[-4:],
+                "funding": "credit",
+            },
+        }
+        self.payment_methods[payment_method_id] = payment_method
+        self._card_numbers[payment_method_id] = number
+        return payment_method
+
+    def attach_payment_method(self, payment_method_id: str, data: dict) -> dict:
+        payment_method = self.payment_methods.get(payment_method_id)
+        if not payment_method:
+            raise _not_found("payment_method", payment_method_id)
+        customer_id = data.get("customer", "")
+        self.get_customer(customer_id)
+        payment_method["customer"] = customer_id
+        return payment_method
+
+    def create_payment_intent(self, data: dict) -> dict:
+        customer_id = data.get("customer")
+        if customer_id:
+            self.get_customer(customer_id)
+        payment_intent_id = _new_id("pi")
+        payment_intent = {
+            "id": payment_intent_id,
+            "object": "payment_intent",
+            "amount": int(data["amount"]),
+            "currency": data["currency"],
+            "customer": customer_id,
+            "client_secret": f"{payment_intent_id}_secret_{secrets.token_hex(12)}",
+            "created": int(time.time()),
+            "livemode": False,
+            "metadata": _get_metadata(data),
+            "payment_method": data.get("payment_method"),
+            "receipt_email": data.get("receipt_email"),
+            "setup_future_usage": data.get("setup_future_usage"),
+            "status": "requires_payment_method",
+            "charges": {"object": "list", "data": [], "has_more": False},
+        }
+        self.payment_intents[payment_intent_id] = payment_intent
+        if data.get("confirm") in ("true", "True", "1") and data.get("payment_method"):
+            self._charge(payment_intent, data["payment_method"])
+        return payment_intent
+
+    def get_payment_intent(self, payment_intent_id: str) -> dict:
+        payment_intent = self.payment_intents.get(payment_intent_id)
+        if not payment_intent:
+            raise _not_found("payment_intent", payment_intent_id)
+        self._settle_payment_intent(payment_intent)
+        return payment_intent
+
+    def list_payment_intents(self, params: dict) -> dict:
+        customer_id = params.get("customer")
+        payment_intents = [
+            payment_intent
+            for payment_intent in self.payment_intents.values()
+            if not customer_id or payment_intent["customer"] == customer_id
+        ]
+        for payment_intent in payment_intents:
+            self._settle_payment_intent(payment_intent)
+        return _paginate(payment_intents, params)
+
+    def confirm_payment_intent(self, payment_intent_id: str, data: dict) -> dict:
+        payment_intent = self.get_payment_intent(payment_intent_id)
+        payment_method_id = data.get("payment_method") or payment_intent.get(
+            "payment_method"
+        )
+        if not payment_method_id:
+            raise StubError(
+                400,
+                {
+                    "code": "payment_intent_unexpected_state",
+                    "message": "You must provide a payment method.",
+                    "type": "invalid_request_error",
+                },
+            )
+        self._charge(payment_intent, payment_method_id)
+        return payment_intent
+
+    def create_refund(self, data: dict) -> dict:
+        payment_intent = self.get_payment_intent(data.get("payment_intent", ""))
+        if payment_intent["status"] != "succeeded":
+            raise StubError(
+                400,
+                {
+                    "code": "charge_not_refundable",
+                    "message": "This PaymentIntent does not have a successful charge.",
+                    "type": "invalid_request_error",
+                },
+            )
+        charge = payment_intent["charges"]["data"][0]
+        amount = int(data.get("amount") or charge["amount"])
+        if amount > charge["amount"] - charge["amount_refunded"]:
+            raise StubError(
+                400,
+                {
+                    "code": "amount_too_large",
+                    "message": "Refund amount is greater than unrefunded amount.",
+                    "type": "invalid_request_error",
+                },
+            )
+        charge["amount_refunded"] += amount
+        refund_id = _new_id("re")
+        refund = {
+            "id": refund_id,
+            "object": "refund",
+            "amount": amount,
+            "charge": charge["id"],
+            "created": int(time.time()),
+            "currency": payment_intent["currency"],
+            "metadata": {},
+            "payment_intent": payment_intent["id"],
+            "reason": data.get("reason"),
+            "status": "pending" if self.profile.refund_delay else "succeeded",
+        }
+        self.refunds[refund_id] = refund
+        self._settle_at[refund_id] = time.monotonic() + self.profile.refund_delay
+        return refund
+
+    def get_refund(self, refund_id: str) -> dict:
+        refund = self.refunds.get(refund_id)
+        if not refund:
+            raise _not_found("refund", refund_id)
+        self._settle_refund(refund)
+        return refund
+
+    def list_refunds(self, params: dict) -> dict:
+        payment_intent_id = params.get("payment_intent")
+        refunds = [
+            refund
+            for refund in self.refunds.values()
+            if not payment_intent_id or refund["payment_intent"] == payment_intent_id
+        ]
+        for refund in refunds:
+            self._settle_refund(refund)
+        return _paginate(refunds, params)
+
+    def _charge(self, payment_intent: dict, payment_method_id: str) -> None:
+        payment_method = self.payment_methods.get(payment_method_id)
+        if not payment_method:
+            raise _not_found("payment_method", payment_method_id)
+
+        declined = self._card_numbers[payment_method_id] in DECLINED_CARDS
+        pending = not declined and self.profile.processing_delay > 0
+        charge_status = "pending" if pending else "succeeded"
+        if declined:
+            charge_status = "failed"
+        charge = {
+            "id": _new_id("ch"),
+            "object": "charge",
+            "amount": payment_intent["amount"],
+            "amount_refunded": 0,
+            "created": int(time.time()),
+            "currency": payment_intent["currency"],
+            "customer": payment_intent["customer"],
+            "metadata": payment_intent["metadata"],
+            "payment_intent": payment_intent["id"],
+            "payment_method": payment_method_id,
+            "payment_method_details": {
+                "card": payment_method["card"],
+                "type": payment_method["type"],
+            },
+            "status": charge_status,
+        }
+        payment_intent["payment_method"] = payment_method_id
+        payment_intent["charges"]["data"].insert(0, charge)
+        if declined:
+            payment_intent["status"] = "requires_payment_method"
+            raise StubError(
+                402,
+                {
+                    "code": "card_declined",
+                    "decline_code": "generic_decline",
+                    "message": "Your card was declined.",
+                    "type": "card_error",
+                    "payment_intent": payment_intent,
+                },
+            )
+        payment_intent["status"] = "processing" if pending else "succeeded"
+        self._settle_at[payment_intent["id"]] = (
+            time.monotonic() + self.profile.processing_delay
+        )
+
+    def _settle_payment_intent(self, payment_intent: dict) -> None:
+        settle_at = self._settle_at.get(payment_intent["id"], 0)
+        if payment_intent["status"] != "processing" or time.monotonic() < settle_at:
+            return
+        payment_intent["status"] = "succeeded"
+        payment_intent["charges"]["data"][0]["status"] = "succeeded"
+
+    def _settle_refund(self, refund: dict) -> None:
+        if (
+            refund["status"] == "pending"
+            and time.monotonic() >= self._settle_at[refund["id"]]
+        ):
+            refund["status"] = "succeeded"
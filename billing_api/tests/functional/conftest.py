@@ -4,9 +4,16 @@ from os import environ as env
 import pytest
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
-from src.clients import stripe_adapter
-from src.db.models import Orders, PaymentMethods, Products, Subscriptions
+from src.clients import gateway_registry, stripe_adapter
+from src.db.models import (
+    Orders,
+    PaymentMethods,
+    Products,
+    RoleOutbox,
+    Subscriptions,
+)
 from src.services import auth
+from tests.functional.fakes import FailingGateway, FakeGateway, FakeGateways
 from tests.functional.settings import test_settings
 
 from billing_api.src import main
@@ -63,6 +70,7 @@ async def mock_db_settings():
 
 async def mock_api_settings():
     stripe_adapter.API_KEY = test_settings.STRIPE_API_KEY
+    stripe_adapter.WEBHOOK_SECRET = test_settings.WEBHOOK_SIGNING_KEY
     auth.DEBUG = 1
     auth.DEBUG_USER_ID = test_settings.DEBUG_USER_ID
 
@@ -85,6 +93,15 @@ async def clear_db():
     await Subscriptions.all().delete()
     await Products.all().delete()
     await PaymentMethods.all().delete()
+    await RoleOutbox.all().delete()
+
+
+@pytest.fixture(name="gateways")
+def fixture_gateways(monkeypatch):
+    """Route orders to fake payment gateways by the gateway names of the orders"""
+    gateways = FakeGateways(stripe=FakeGateway(), failing=FailingGateway())
+    monkeypatch.setattr(gateway_registry, "get_for_order", gateways.get_for_order)
+    return gateways
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -0,0 +1,114 @@
+"""Test data factories and payment gateways answering without a payment system"""
+
+import asyncio
+from datetime import timedelta
+from typing import Dict, List
+from uuid import uuid4
+
+import pytest
+from src.db.models import Orders, PaymentMethods, Subscriptions
+from src.db.repositories.payment_method import PaymentMethodRepository
+from src.db.repositories.subscription import SubscriptionRepository
+from src.models.common import OrderState, Payment, PaymentMethod, Refund
+from tortoise import timezone
+
+
+async def create_subscription(product_id: str = None) -> Subscriptions:
+    return await SubscriptionRepository.create(
+        str(uuid4()),
+        str(product_id or pytest.product_id),
+    )
+
+
+async def create_order(
+    subscription: Subscriptions,
+    age: timedelta = timedelta(0),
+    **fields,
+) -> Orders:
+    created = timezone.now() - age
+    order_fields = {
+        "id": uuid4(),
+        "user_id": subscription.user_id,
+        "product_id": subscription.product_id,
+        "subscription_id": subscription.id,
+        "payment_system": "stripe",
+        "gateway": "stripe",
+        "payment_amount": 10,
+        "payment_currency_code": "usd",
+        "user_email": "functional@mail.ru",
+        "created": created,
+        "modified": created,
+        **fields,
+    }
+    return await Orders.create(**order_fields)
+
+
+async def create_payment_method(subscription: Subscriptions) -> PaymentMethods:
+    return await PaymentMethodRepository.create(
+        user_id=str(subscription.user_id),
+        external_id=f"pm_{uuid4().hex}",
+        payment_system="stripe",
+        payment_type="card",
+        data={"last4": "4242"},
+    )
+
+
+class FakeGateway:
+    """Payment gateway answering with the statuses it is given"""
+
+    def __init__(self):
+        self.statuses: Dict[str, OrderState] = {}
+        self.sent: List[str] = []
+
+    async def get_payment_statuses(self, orders: List[Orders]) -> Dict[str, OrderState]:
+        return self._get_statuses(orders)
+
+    async def get_refund_statuses(self, orders: List[Orders]) -> Dict[str, OrderState]:
+        return self._get_statuses(orders)
+
+    async def get_payment_method(self, order: Orders) -> PaymentMethod:
+        return PaymentMethod(id=f"pm_{order.id.hex}", type="card", data={})
+
+    async def create_recurring_payment(self, order: Orders) -> Payment:
+        self.sent.append(str(order.id))
+        return Payment(
+            id=f"pi_{order.id.hex}",
+            client_secret=None,
+            state=OrderState.PROCESSING,
+            is_automatic=True,
+        )
+
+    async def create_refund(self, order: Orders) -> Refund:
+        self.sent.append(str(order.id))
+        return Refund(
+            id=f"re_{order.id.hex}",
+            amount=order.payment_amount,
+            currency=order.payment_currency_code,
+            payment_intent_id=f"pi_{order.id.hex}",
+            state=OrderState.PROCESSING,
+        )
+
+    def _get_statuses(self, orders: List[Orders]) -> Dict[str, OrderState]:
+        order_ids = {str(order.id) for order in orders}
+        return {
+            order_id: state
+            for order_id, state in self.statuses.items()
+            if order_id in order_ids
+        }
+
+
+class FailingGateway(FakeGateway):
+    """Payment gateway that never answers in time"""
+
+    async def get_payment_statuses(self, orders: List[Orders]) -> Dict[str, OrderState]:
+        raise asyncio.TimeoutError
+
+    async def create_recurring_payment(self, order: Orders) -> Payment:
+        raise asyncio.TimeoutError
+
+
+class FakeGateways(dict):
+    """Gateway name to fake payment gateway mapping"""
+
+    def get_for_order(self, order: Orders) -> FakeGateway:
+        return self[order.gateway]
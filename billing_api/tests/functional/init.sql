@@ -39,6 +39,7 @@ create table if not exists data.orders (
               subscription_id uuid references data.subscriptions on update cascade on delete restrict,
               user_id uuid not null,
               payment_system varchar(50) not null,
+              gateway varchar(50),
               payment_method_id uuid references data.payment_methods on update cascade on delete restrict,
               payment_amount decimal not null,
               payment_currency_code varchar(3) not null,
@@ -47,5 +48,42 @@ create table if not exists data.orders (
               is_automatic boolean default FALSE not null,
               is_refund boolean default FALSE not null,
               src_order_id uuid references data.orders on update cascade on delete restrict,
+              idempotency_key varchar(255),
               created timestamptz default now(),
               modified timestamptz default now());
+create table if not exists data.rate_limits (
+              name varchar(50) primary key,
+              tokens double precision not null,
+              updated timestamptz default now());
+create table if not exists data.customers (
+              id uuid primary key,
+              user_id uuid not null,
+              payment_system varchar(50) not null,
+              external_id varchar(50) not null,
+              created timestamptz default now(),
+              modified timestamptz default now(),
+              unique (user_id, payment_system));
+create index if not exists orders_external_id_idx on data.orders (external_id);
+create index if not exists orders_last_paid_idx on data.orders (subscription_id, created desc) where state = 'paid' and not is_refund;
+create type data.role_action as enum ('grant', 'revoke');
+create table if not exists data.role_outbox (
+              id uuid primary key,
+              user_id uuid not null,
+              role_id uuid not null,
+              action data.role_action not null,
+              attempts integer default 0 not null,
+              next_attempt timestamptz default now() not null,
+              delivered timestamptz,
+              error text,
+              created timestamptz default now(),
+              modified timestamptz default now());
+create unique index if not exists role_outbox_pending_idx on data.role_outbox (user_id, role_id) where delivered is null;
+create index if not exists role_outbox_next_attempt_idx on data.role_outbox (next_attempt) where delivered is null;
+create or replace function data.notify_products_changed() returns trigger as $$
+begin
+    perform pg_notify('products_changed', '');
+    return null;
+end;
+$$ language plpgsql;
+create trigger products_changed after insert or update or delete or truncate on data.products
+              for each statement execute procedure data.notify_products_changed();
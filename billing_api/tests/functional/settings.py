@@ -9,6 +9,7 @@ load_dotenv()
 
 class TestSettings(BaseSettings):
     STRIPE_API_KEY: str = os.environ.get("STRIPE_API_KEY", "test-api-key")
+    WEBHOOK_SIGNING_KEY: str = os.environ.get("STRIPE_WEBHOOK_SECRET", "whsec_test")
     DEBUG_USER_ID: str = "d306f620-2083-4c55-b66f-7171fffecc2b"
     ACCESS_TOKEN = str(
         jwt.encode(
@@ -0,0 +1,68 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from src.clients import gateway_router
+from src.db.models import Orders, Subscriptions
+from src.db.repositories.billing import BillingRepository
+from src.db.repositories.order import OrderRepository
+from src.db.repositories.subscription import SubscriptionRepository
+from src.resources.error_messages import USER_HAS_NO_UNPAID_ORDERS
+from tests.functional.settings import test_settings
+
+PAYMENT_INFO = {
+    "email": "draft@mail.ru",
+    "product_id": None,
+    "payment_system": "stripe",
+}
+
+
+@pytest.mark.asyncio
+class TestDraftOrder:
+    async def test_create_unsent_order(self):
+        subscription = await SubscriptionRepository.create(
+            test_settings.DEBUG_USER_ID,
+            str(pytest.product_id),
+        )
+        pytest.unsent_order = await OrderRepository.create(
+            user_id=test_settings.DEBUG_USER_ID,
+            product_id=pytest.product_id,
+            user_email=PAYMENT_INFO["email"],
+            subscription_id=subscription.id,
+            payment_system="stripe",
+            amount=10,
+            payment_currency_code="usd",
+        )
+        assert pytest.unsent_order.external_id is None
+
+    def test_unsent_order_is_not_resumable(self, test_client):
+        response = test_client.get("api/user/order/draft")
+        assert response.status_code == 404
+        assert response.json()["detail"] == USER_HAS_NO_UNPAID_ORDERS
+
+    def test_failed_payment_is_raised(self, test_client, monkeypatch):
+        monkeypatch.setattr(
+            gateway_router,
+            "create_payment",
+            AsyncMock(side_effect=RuntimeError("gateway")),
+        )
+        with pytest.raises(RuntimeError):
+            test_client.post(
+                "api/user/payment",
+                json={**PAYMENT_INFO, "product_id": str(pytest.product_id)},
+            )
+
+    async def test_failed_payment_is_discarded(self):
+        orders = await Orders.filter(user_id=test_settings.DEBUG_USER_ID)
+        subscriptions = await Subscriptions.filter(
+            user_id=test_settings.DEBUG_USER_ID,
+        )
+        assert [order.id for order in orders] == [pytest.unsent_order.id]
+        assert [subscription.id for subscription in subscriptions] == [
+            pytest.unsent_order.subscription_id,
+        ]
+
+    async def test_unsent_order_is_discarded(self):
+        await BillingRepository.discard_unsent_order(pytest.unsent_order)
+        user_id = test_settings.DEBUG_USER_ID
+        assert not await Orders.filter(user_id=user_id).exists()
+        assert not await Subscriptions.filter(user_id=user_id).exists()
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+from src.db.models import Orders, Subscriptions
+from src.db.repositories.order import OrderRepository
+from src.models.common import OrderState, SubscriptionState
+from src.services.orders import recover_unsent_orders
+from tests.functional.fakes import create_order, create_subscription
+from tortoise import timezone
+
+# Orders of the other tests are younger, so they are neither read nor recovered
+RESERVE_TIMEOUT = timedelta(hours=1)
+MAX_AGE = timedelta(hours=6)
+
+
+async def _get_state(order: Orders) -> OrderState:
+    order = await Orders.get(id=order.id)
+    return order.state
+
+
+async def _create_not_unsent_orders(subscription: Subscriptions) -> None:
+    # Sent, finished and recently reserved orders are not unsent
+    await create_order(subscription, age=timedelta(hours=4), external_id="pi_1")
+    await create_order(subscription, age=timedelta(hours=4), state=OrderState.ERROR)
+    await create_order(subscription, age=timedelta(minutes=30))
+
+
+@pytest.mark.asyncio
+class TestOrderRecovery:
+    async def test_unsent_orders_are_read_oldest_first(self):
+        subscription = await create_subscription()
+        newer = await create_order(subscription, age=timedelta(hours=2))
+        older = await create_order(subscription, age=timedelta(hours=3))
+        await _create_not_unsent_orders(subscription)
+
+        orders = await OrderRepository.get_unsent_orders(
+            timezone.now() - RESERVE_TIMEOUT, limit=10
+        )
+        assert [order.id for order in orders] == [older.id, newer.id]
+        limited = await OrderRepository.get_unsent_orders(
+            timezone.now() - RESERVE_TIMEOUT, limit=1
+        )
+        assert [order.id for order in limited] == [older.id]
+        await Orders.filter(subscription_id=subscription.id).delete()
+
+    async def test_user_order_is_discarded(self, gateways):
+        subscription = await create_subscription()
+        order = await create_order(subscription, age=timedelta(hours=2))
+
+        result = await recover_unsent_orders(
+            RESERVE_TIMEOUT.total_seconds(), MAX_AGE.total_seconds()
+        )
+        assert result == {"recovered": 1, "failed": 0}
+        assert not await Orders.exists(id=order.id)
+        assert not await Subscriptions.exists(id=subscription.id)
+        assert not gateways["stripe"].sent
+
+    async def test_automatic_orders_are_resent(self, gateways):
+        subscription = await create_subscription()
+        recent = await create_order(
+            subscription, age=timedelta(hours=2), is_automatic=True
+        )
+        old = await create_order(subscription, age=MAX_AGE * 2, is_automatic=True)
+
+        result = await recover_unsent_orders(
+            RESERVE_TIMEOUT.total_seconds(), MAX_AGE.total_seconds()
+        )
+        assert result == {"recovered": 2, "failed": 0}
+        assert gateways["stripe"].sent == [str(recent.id)]
+        recent = await Orders.get(id=recent.id)
+        assert recent.external_id == f"pi_{recent.id.hex}"
+        assert recent.state == OrderState.PROCESSING
+        assert await _get_state(old) == OrderState.ERROR
+
+    async def test_refund_order_is_resent(self, gateways):
+        subscription = await create_subscription()
+        paid = await create_order(
+            subscription, age=timedelta(days=3), state=OrderState.PAID
+        )
+        refund = await create_order(
+            subscription, age=timedelta(hours=2), is_refund=True, src_order=paid
+        )
+
+        result = await recover_unsent_orders(
+            RESERVE_TIMEOUT.total_seconds(), MAX_AGE.total_seconds()
+        )
+        assert result == {"recovered": 1, "failed": 0}
+        refund = await Orders.get(id=refund.id).prefetch_related("subscription")
+        assert refund.external_id == f"re_{refund.id.hex}"
+        assert refund.subscription.state == SubscriptionState.TO_DEACTIVATE
@@ -0,0 +1,114 @@
+from uuid import uuid4
+
+import pytest
+from src.db.models import Orders
+from src.db.repositories.order import OrderRepository
+from src.models.common import OrderState, SubscriptionState
+from src.resources.error_messages import (
+    ORDER_IS_PAID,
+    ORDER_NOT_FOUND,
+    ORDER_STATUS_UNAVAILABLE,
+)
+from src.services.orders import update_orders_info
+from tests.functional.fakes import create_order, create_subscription
+
+
+async def _get_state(order: Orders) -> OrderState:
+    order = await Orders.get(id=order.id)
+    return order.state
+
+
+@pytest.mark.asyncio
+class TestOrdersUpdate:
+    async def test_states_are_updated_with_one_query(self):
+        subscription = await create_subscription()
+        changed = await create_order(subscription, state=OrderState.PROCESSING)
+        unchanged = await create_order(subscription, state=OrderState.PROCESSING)
+        paid = await create_order(subscription, state=OrderState.PAID)
+
+        updated = await OrderRepository.update_states(
+            {
+                str(changed.id): OrderState.ERROR,
+                str(unchanged.id): OrderState.PROCESSING,
+                str(paid.id): OrderState.ERROR,
+                str(uuid4()): OrderState.ERROR,
+            },
+        )
+        assert updated == [str(changed.id)]
+        assert await _get_state(changed) == OrderState.ERROR
+        assert await _get_state(paid) == OrderState.PAID
+
+    async def test_results_follow_requested_order(self, gateways):
+        subscription = await create_subscription()
+        unchanged = await create_order(subscription, state=OrderState.PROCESSING)
+        paid = await create_order(subscription, state=OrderState.PAID)
+        gateways["stripe"].statuses[str(unchanged.id)] = OrderState.PROCESSING
+        missing_id = str(uuid4())
+
+        results = await update_orders_info(
+            [str(unchanged.id), missing_id, str(paid.id)]
+        )
+        assert results == [
+            {
+                "id": str(unchanged.id),
+                "state": OrderState.PROCESSING,
+                "updated": False,
+                "error": None,
+            },
+            {
+                "id": missing_id,
+                "state": None,
+                "updated": False,
+                "error": ORDER_NOT_FOUND,
+            },
+            {
+                "id": str(paid.id),
+                "state": OrderState.PAID,
+                "updated": False,
+                "error": ORDER_IS_PAID,
+            },
+        ]
+
+    async def test_changed_state_is_saved(self, gateways):
+        subscription = await create_subscription()
+        changed = await create_order(
+            subscription, state=OrderState.PROCESSING, is_automatic=True
+        )
+        gateways["stripe"].statuses[str(changed.id)] = OrderState.PAID
+
+        results = await update_orders_info([str(changed.id)])
+        assert results[0]["state"] == OrderState.PAID
+        assert results[0]["updated"]
+        assert await _get_state(changed) == OrderState.PAID
+
+    async def test_order_paid_by_user_is_applied(self, gateways):
+        subscription = await create_subscription()
+        by_user = await create_order(subscription, external_id=f"pi_{uuid4().hex}")
+        gateways["stripe"].statuses[str(by_user.id)] = OrderState.PAID
+
+        results = await update_orders_info([str(by_user.id)])
+        assert results[0]["updated"]
+        by_user = await Orders.get(id=by_user.id).prefetch_related(
+            "payment_method",
+            "subscription",
+        )
+        assert by_user.state == OrderState.PAID
+        assert by_user.payment_method.external_id == f"pm_{by_user.id.hex}"
+        assert by_user.subscription.state == SubscriptionState.PRE_ACTIVE
+
+    async def test_failed_gateway_does_not_block_others(self, gateways):
+        subscription = await create_subscription()
+        unavailable = await create_order(
+            subscription, state=OrderState.PROCESSING, gateway="failing"
+        )
+        changed = await create_order(
+            subscription, state=OrderState.PROCESSING, is_automatic=True
+        )
+        gateways["stripe"].statuses[str(changed.id)] = OrderState.ERROR
+
+        results = await update_orders_info([str(unavailable.id), str(changed.id)])
+        assert results[0]["error"] == ORDER_STATUS_UNAVAILABLE
+        assert not results[0]["updated"]
+        assert results[1]["updated"]
+        assert await _get_state(unavailable) == OrderState.PROCESSING
+        assert await _get_state(changed) == OrderState.ERROR
@@ -0,0 +1,23 @@
+from uuid import uuid4
+
+import pytest
+from src.clients.rate_limiter import PostgresTokenBucket
+
+
+@pytest.mark.asyncio
+class TestPostgresTokenBucket:
+    async def test_budget_is_leased_until_empty(self):
+        bucket = PostgresTokenBucket(f"test_{uuid4().hex}", rate=0.001, capacity=2)
+        await bucket.start()
+        assert await bucket._lease()
+        assert await bucket._lease()
+        assert not await bucket._lease()
+
+    async def test_buckets_share_one_budget(self):
+        name = f"test_{uuid4().hex}"
+        first = PostgresTokenBucket(name, rate=0.001, capacity=1)
+        second = PostgresTokenBucket(name, rate=0.001, capacity=1)
+        await first.start()
+        await second.start()
+        assert await first._lease()
+        assert not await second._lease()
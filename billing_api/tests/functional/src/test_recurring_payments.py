@@ -0,0 +1,156 @@
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from src.db.models import Orders, Products
+from src.db.repositories.recurring_order import RecurringOrderRepository
+from src.models.common import OrderState
+from src.resources.error_messages import (
+    INACTIVE_PRODUCT,
+    PAID_ORDER_NOT_FOUND,
+    PAYMENT_METHOD_NOT_FOUND,
+    PAYMENT_SYSTEM_UNAVAILABLE,
+    RECURRING_PAYMENT_IN_PROCESS,
+    SUBSCRIPTION_NOT_FOUND,
+)
+from src.services.subscriptions import withdraw_subscriptions_price
+from tests.functional.fakes import (
+    create_order,
+    create_payment_method,
+    create_subscription,
+)
+
+PERIOD = timedelta(days=31)
+
+
+async def _create_renewable(gateway: str = "stripe", product_id: str = None):
+    subscription = await create_subscription(product_id)
+    await create_payment_method(subscription)
+    await create_order(subscription, age=PERIOD, state=OrderState.PAID, gateway=gateway)
+    return subscription
+
+
+async def _get_orders(subscription, **filters):
+    return await Orders.filter(
+        subscription_id=subscription.id,
+        is_automatic=True,
+        **filters,
+    )
+
+
+async def _withdraw(*subscriptions) -> dict:
+    ids = [str(subscription.id) for subscription in subscriptions]
+    results = await withdraw_subscriptions_price(ids)
+    assert ids == [result["id"] for result in results]
+    return {result["id"]: result["error"] for result in results}
+
+
+@pytest.mark.asyncio
+class TestRecurringPayments:
+    async def test_last_paid_order_is_read(self):
+        subscription = await create_subscription()
+        await create_order(subscription, age=PERIOD * 2, state=OrderState.PAID)
+        last_paid = await create_order(subscription, age=PERIOD, state=OrderState.PAID)
+        # Later refunds and unpaid orders are not paid orders to renew
+        await create_order(
+            subscription, age=PERIOD / 2, state=OrderState.PAID, is_refund=True
+        )
+        await create_order(subscription, state=OrderState.ERROR, is_automatic=True)
+        not_paid = await create_subscription()
+
+        orders = await RecurringOrderRepository.get_subscription_orders(
+            [str(subscription.id), str(not_paid.id)],
+        )
+        assert list(orders) == [str(subscription.id)]
+        assert orders[str(subscription.id)].id == last_paid.id
+
+    async def test_recurring_orders_are_reserved_and_sent(self, gateways):
+        first = await _create_renewable()
+        second = await _create_renewable()
+
+        assert await _withdraw(first, second) == {
+            str(first.id): None,
+            str(second.id): None,
+        }
+        orders = [
+            *await _get_orders(first),
+            *await _get_orders(second),
+        ]
+        assert sorted(gateways["stripe"].sent) == sorted(
+            str(order.id) for order in orders
+        )
+        for order in orders:
+            assert order.external_id == f"pi_{order.id.hex}"
+            assert order.state == OrderState.PROCESSING
+            assert order.payment_method_id is not None
+            assert order.idempotency_key is not None
+
+    async def test_unusable_subscriptions_have_errors(self, gateways):
+        inactive_product = await Products.create(
+            name="Archived Subscription",
+            description="Sample",
+            role_id=uuid4(),
+            price=10.0,
+            currency_code="usd",
+            period=31,
+            active=False,
+        )
+        inactive = await _create_renewable(product_id=inactive_product.id)
+        no_method = await create_subscription()
+        await create_order(no_method, age=PERIOD, state=OrderState.PAID)
+
+        assert await _withdraw(inactive, no_method) == {
+            str(inactive.id): INACTIVE_PRODUCT,
+            str(no_method.id): PAYMENT_METHOD_NOT_FOUND,
+        }
+        assert not gateways["stripe"].sent
+
+    async def test_unrenewable_subscriptions_have_errors(self, gateways):
+        in_process = await _create_renewable()
+        await create_order(
+            in_process,
+            state=OrderState.PROCESSING,
+            is_automatic=True,
+            external_id="pi_1",
+        )
+        not_paid = await create_subscription()
+        await create_payment_method(not_paid)
+
+        assert await _withdraw(in_process, not_paid) == {
+            str(in_process.id): RECURRING_PAYMENT_IN_PROCESS,
+            str(not_paid.id): PAID_ORDER_NOT_FOUND,
+        }
+        assert not gateways["stripe"].sent
+
+    async def test_missing_subscription_has_error(self, gateways):
+        renewed = await _create_renewable()
+        missing_id = str(uuid4())
+
+        results = await withdraw_subscriptions_price([missing_id, str(renewed.id)])
+        assert results == [
+            {"id": missing_id, "updated": False, "error": SUBSCRIPTION_NOT_FOUND},
+            {"id": str(renewed.id), "updated": True, "error": None},
+        ]
+
+    async def test_pending_order_is_reused(self, gateways):
+        subscription = await _create_renewable()
+        pending = await create_order(subscription, is_automatic=True)
+
+        assert await _withdraw(subscription) == {str(subscription.id): None}
+        assert gateways["stripe"].sent == [str(pending.id)]
+        orders = await _get_orders(subscription)
+        assert [order.id for order in orders] == [pending.id]
+        assert orders[0].external_id == f"pi_{pending.id.hex}"
+
+    async def test_failed_payment_fails_its_subscription(self, gateways):
+        failing = await _create_renewable(gateway="failing")
+        renewed = await _create_renewable()
+
+        assert await _withdraw(failing, renewed) == {
+            str(failing.id): PAYMENT_SYSTEM_UNAVAILABLE,
+            str(renewed.id): None,
+        }
+        # The unsent order is sent again by the next attempt or by the recovery
+        unsent = await _get_orders(failing, external_id__isnull=True)
+        assert [order.state for order in unsent] == [OrderState.DRAFT]
+        assert len(await _get_orders(renewed, state=OrderState.PROCESSING)) == 1
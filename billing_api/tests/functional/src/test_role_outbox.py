@@ -0,0 +1,34 @@
+import asyncio
+from contextlib import AsyncExitStack
+from uuid import uuid4
+
+import pytest
+from src.db.models import RoleOutbox
+from src.db.repositories.role_outbox import RoleOutboxRepository
+from src.models.common import RoleAction
+from src.services.role_outbox import RoleOutboxDispatcher, role_outbox_dispatcher
+from src.services.roles import RolesService
+from tortoise import timezone
+
+# Nothing listens to the discard port, so connections are refused
+UNREACHABLE_ROLES_URL = "http://127.0.0.1:9/api/v1/admin/user/%s/role/%s"
+
+
+@pytest.mark.asyncio
+class TestRoleOutbox:
+    async def test_unreachable_auth_is_retried_later(self):
+        dispatcher = RoleOutboxDispatcher(RolesService(UNREACHABLE_ROLES_URL))
+        user_id, role_id = uuid4(), uuid4()
+        async with AsyncExitStack() as stack:
+            # The app dispatcher would claim the change too
+            await role_outbox_dispatcher.close()
+            stack.push_async_callback(role_outbox_dispatcher.start)
+            await RoleOutboxRepository.enqueue(user_id, role_id, RoleAction.GRANT)
+            claimed = await asyncio.wait_for(dispatcher.dispatch(), timeout=5)
+
+        change = await RoleOutbox.get(user_id=user_id, role_id=role_id)
+        assert claimed >= 1
+        assert change.delivered is None
+        assert change.attempts == 1
+        assert change.error is not None
+        assert change.next_attempt > timezone.now()
@@ -0,0 +1,134 @@
+import hashlib
+import hmac
+import time
+from uuid import uuid4
+
+import orjson
+import pytest
+from src.db.models import Orders
+from src.db.repositories.subscription import SubscriptionRepository
+from src.models.common import OrderState, SubscriptionState
+from tests.functional.settings import test_settings
+
+WEBHOOK_URL = "api/webhook/stripe"
+
+
+def _event(external_id: str) -> dict:
+    return {
+        "id": f"evt_{external_id}",
+        "type": "payment_intent.succeeded",
+        "data": {
+            "object": {
+                "id": external_id,
+                "client_secret": None,
+                "status": "succeeded",
+                "charges": {
+                    "data": [
+                        {
+                            "id": f"ch_{external_id}",
+                            "payment_method": f"pm_{external_id}",
+                            "payment_method_details": {
+                                "type": "card",
+                                "card": {
+                                    "brand": "visa",
+                                    "exp_month": 12,
+                                    "exp_year": 2030,
+                                    "last4": "4242",
+                                },
+                            },
+                            "status": "succeeded",
+                        },
+                    ],
+                },
+                "metadata": {"is_automatic": False},
+            },
+        },
+    }
+
+
+def _post(test_client, event: dict, signing_key: str, url: str = WEBHOOK_URL):
+    payload = orjson.dumps(event)
+    timestamp = int(time.time())
+    signed_payload = b".".join((str(timestamp).encode(), payload))
+    signature = hmac.new(
+        signing_key.encode(),
+        signed_payload,
+        hashlib.sha256,
+    ).hexdigest()
+    return test_client.post(
+        url,
+        data=payload,
+        headers={"Stripe-Signature": f"t={timestamp},v1={signature}"},
+    )
+
+
+async def _create_order(external_id: str) -> Orders:
+    user_id = uuid4()
+    subscription = await SubscriptionRepository.create(
+        str(user_id),
+        str(pytest.product_id),
+    )
+    return await Orders.create(
+        external_id=external_id,
+        user_id=user_id,
+        product_id=pytest.product_id,
+        subscription=subscription,
+        payment_system="stripe",
+        gateway="stripe",
+        payment_amount=10,
+        payment_currency_code="usd",
+        user_email="webhook@mail.ru",
+    )
+
+
+@pytest.mark.asyncio
+class TestWebhook:
+    async def test_create_orders(self):
+        pytest.webhook_order = await _create_order(f"pi_{uuid4().hex}")
+        pytest.foreign_order = await _create_order(f"pi_{uuid4().hex}")
+
+    def test_paid_event_is_accepted(self, test_client):
+        response = _post(
+            test_client,
+            _event(pytest.webhook_order.external_id),
+            test_settings.WEBHOOK_SIGNING_KEY,
+        )
+        assert response.status_code == 200
+
+    async def test_paid_event_updates_order(self):
+        order = await Orders.get(id=pytest.webhook_order.id).prefetch_related(
+            "payment_method",
+            "subscription",
+        )
+        assert order.state == OrderState.PAID
+        assert order.payment_method.external_id == f"pm_{order.external_id}"
+        assert order.subscription.state == SubscriptionState.PRE_ACTIVE
+
+    def test_foreign_signature_is_rejected(self, test_client):
+        response = _post(
+            test_client,
+            _event(pytest.foreign_order.external_id),
+            "whsec_other",
+        )
+        assert response.status_code == 400
+
+    async def test_rejected_event_is_not_applied(self):
+        order = await Orders.get(id=pytest.foreign_order.id)
+        assert order.state == OrderState.DRAFT
+
+    def test_unknown_gateway_is_not_found(self, test_client):
+        response = _post(
+            test_client,
+            _event("pi_unknown"),
+            test_settings.WEBHOOK_SIGNING_KEY,
+            url="api/webhook/unknown",
+        )
+        assert response.status_code == 404
+
+    def test_unknown_event_is_acknowledged(self, test_client):
+        response = _post(
+            test_client,
+            {"id": "evt_customer", "type": "customer.created"},
+            test_settings.WEBHOOK_SIGNING_KEY,
+        )
+        assert response.status_code == 200
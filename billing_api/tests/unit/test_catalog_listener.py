@@ -0,0 +1,26 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import asyncpg
+import pytest
+from src.services import catalog
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [
+        asyncpg.InterfaceError("connection is closed"),
+        asyncio.TimeoutError(),
+        ConnectionRefusedError(),
+    ],
+)
+async def test_listener_reconnects_after_error(monkeypatch, error):
+    # The listener task is stopped by the second connection attempt
+    connect = AsyncMock(side_effect=[error, asyncio.CancelledError()])
+    monkeypatch.setattr(catalog.asyncpg, "connect", connect)
+    product_catalog = catalog.ProductCatalog(reconnect_interval=0)
+
+    with pytest.raises(asyncio.CancelledError):
+        await product_catalog._run_listener()
+    assert connect.await_count == 2
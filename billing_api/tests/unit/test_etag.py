@@ -0,0 +1,32 @@
+from src.utils import etag
+
+ETAG = etag.make_etag("product", 1)
+OTHER_ETAG = etag.make_etag("product", 2)
+
+
+def test_same_tag_matches():
+    assert etag._matches(ETAG, ETAG)
+
+
+def test_any_tag_matches():
+    assert etag._matches(" * ", ETAG)
+
+
+def test_weak_tag_matches():
+    assert etag._matches(f"W/{ETAG}", ETAG)
+
+
+def test_weak_tag_in_list_matches():
+    assert etag._matches(f'"other", W/{ETAG}', ETAG)
+
+
+def test_other_strong_tag_does_not_match():
+    assert not etag._matches(f'"other", {OTHER_ETAG}', ETAG)
+
+
+def test_other_weak_tag_does_not_match():
+    assert not etag._matches(f"W/{OTHER_ETAG}", ETAG)
+
+
+def test_versions_change_tag():
+    assert OTHER_ETAG != ETAG
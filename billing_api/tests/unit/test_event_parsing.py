@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+import time
+from typing import Optional, Union
+
+import orjson
+import pytest
+from src.clients.exceptions import InvalidEventError
+from src.clients.stripe.client import StripeClient
+from src.clients.stripe_adapter import StripeClientAdapter
+from src.models.common import OrderState, PaymentEvent
+
+SIGNING_KEY = "whsec_test"
+
+
+def _payment_event(charges: list, is_automatic: bool = False) -> dict:
+    return {
+        "id": "evt_payment",
+        "type": "payment_intent.succeeded",
+        "data": {
+            "object": {
+                "id": "pi_1",
+                "client_secret": None,
+                "status": "succeeded",
+                "charges": {"data": charges},
+                "metadata": {"is_automatic": is_automatic},
+            },
+        },
+    }
+
+
+CHARGE = {
+    "id": "ch_1",
+    "payment_method": "pm_1",
+    "payment_method_details": {
+        "type": "card",
+        "card": {"brand": "visa", "exp_month": 12, "exp_year": 2030, "last4": "4242"},
+    },
+    "status": "succeeded",
+}
+
+REFUND_EVENT = {
+    "id": "evt_refund",
+    "type": "charge.refund.updated",
+    "data": {
+        "object": {
+            "id": "re_1",
+            "amount": 1000,
+            "currency": "usd",
+            "reason": None,
+            "payment_intent": "pi_1",
+            "status": "succeeded",
+        },
+    },
+}
+
+
+async def _parse(event: Union[dict, bytes]) -> Optional[PaymentEvent]:
+    payload = event if isinstance(event, bytes) else orjson.dumps(event)
+    timestamp = int(time.time())
+    signed_payload = b".".join((str(timestamp).encode(), payload))
+    signature = hmac.new(
+        SIGNING_KEY.encode(),
+        signed_payload,
+        hashlib.sha256,
+    ).hexdigest()
+    headers = {"Stripe-Signature": f"t={timestamp},v1={signature}"}
+    adapter = StripeClientAdapter(
+        StripeClient("http://127.0.0.1:9/v1", "sk_test"),
+        webhook_secret=SIGNING_KEY,
+    )
+    return await adapter.parse_event(payload, headers)
+
+
+@pytest.mark.asyncio
+async def test_paid_event_has_payment_method():
+    event = await _parse(_payment_event([CHARGE]))
+    assert event.external_id == "pi_1"
+    assert event.state == OrderState.PAID
+    assert not event.is_refund
+    assert event.payment_method.id == "pm_1"
+
+
+@pytest.mark.asyncio
+async def test_paid_event_without_charges_is_applied():
+    event = await _parse(_payment_event([]))
+    assert event.state == OrderState.PAID
+    assert event.payment_method is None
+
+
+@pytest.mark.asyncio
+async def test_automatic_paid_event_has_no_method():
+    event = await _parse(_payment_event([CHARGE], is_automatic=True))
+    assert event.state == OrderState.PAID
+    assert event.payment_method is None
+
+
+@pytest.mark.asyncio
+async def test_refund_event_is_parsed():
+    event = await _parse(REFUND_EVENT)
+    assert event.external_id == "re_1"
+    assert event.is_refund
+    assert event.state == OrderState.PAID
+
+
+@pytest.mark.asyncio
+async def test_unknown_event_is_skipped():
+    assert await _parse({"id": "evt_customer", "type": "customer.created"}) is None
+
+
+@pytest.mark.asyncio
+async def test_malformed_event_is_skipped():
+    event = {"id": "evt_payment", "type": "payment_intent.succeeded", "data": {}}
+    assert await _parse(event) is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_is_rejected():
+    with pytest.raises(InvalidEventError):
+        await _parse(b"{not json")
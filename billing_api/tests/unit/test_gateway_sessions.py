@@ -0,0 +1,13 @@
+from src.clients.stripe.client import stripe_session
+from src.clients.stripe_adapter import get_stripe_adapter
+from src.core.settings import GatewaySettings
+
+
+def test_gateways_have_own_sessions():
+    adapters = [
+        get_stripe_adapter(GatewaySettings(name=name, api_key="sk_test"))
+        for name in ("stripe_eu", "stripe_us")
+    ]
+    holders = [adapter.client.session_holder for adapter in adapters]
+    assert [holder.name for holder in holders] == ["stripe_eu", "stripe_us"]
+    assert stripe_session not in holders
@@ -0,0 +1,24 @@
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+from src.models.api import (
+    MAX_ORDER_IDS,
+    MAX_SUBSCRIPTION_IDS,
+    OrderIdsIn,
+    SubscriptionIdsIn,
+)
+
+
+@pytest.mark.parametrize(
+    ("model", "field", "max_ids"),
+    [
+        (OrderIdsIn, "order_ids", MAX_ORDER_IDS),
+        (SubscriptionIdsIn, "subscription_ids", MAX_SUBSCRIPTION_IDS),
+    ],
+)
+def test_ids_are_limited(model, field, max_ids):
+    ids = [uuid4() for _ in range(max_ids + 1)]
+    assert len(getattr(model(**{field: ids[:max_ids]}), field)) == max_ids
+    with pytest.raises(ValidationError):
+        model(**{field: ids})
@@ -0,0 +1,35 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from src.clients.abstract import AbstractClientAdapter
+from src.models.common import OrderState
+
+
+class _StatusCounter:
+    """Status getter keeping the largest number of requests made at once"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def get_status(self, order) -> OrderState:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0)
+        self.running -= 1
+        return OrderState.PAID
+
+
+@pytest.mark.asyncio
+async def test_statuses_are_requested_with_limit():
+    orders = [SimpleNamespace(id=uuid4()) for _ in range(50)]
+    counter = _StatusCounter()
+    statuses = await AbstractClientAdapter.gather_statuses(
+        orders,
+        counter.get_status,
+        concurrency=5,
+    )
+    assert len(statuses) == 50
+    assert counter.max_running == 5
@@ -0,0 +1,36 @@
+import hashlib
+import hmac
+import time
+
+import pytest
+from src.clients.exceptions import InvalidEventError
+from src.clients.stripe.utils.webhooks import verify_signature
+
+SIGNING_KEY = "whsec_test"
+PAYLOAD = b'{"id": "evt_1"}'
+
+
+def _sign(timestamp: int, signing_key: str = SIGNING_KEY) -> str:
+    signed_payload = b".".join((str(timestamp).encode(), PAYLOAD))
+    signature = hmac.new(signing_key.encode(), signed_payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def test_fresh_signature_is_accepted():
+    verify_signature(PAYLOAD, _sign(int(time.time())), SIGNING_KEY, tolerance=300)
+
+
+def test_expired_signature_is_rejected():
+    header = _sign(int(time.time()) - 301)
+    with pytest.raises(InvalidEventError):
+        verify_signature(PAYLOAD, header, SIGNING_KEY, tolerance=300)
+
+
+def test_zero_tolerance_accepts_old_signature():
+    verify_signature(PAYLOAD, _sign(int(time.time()) - 3600), SIGNING_KEY, tolerance=0)
+
+
+def test_foreign_signature_is_rejected():
+    header = _sign(int(time.time()), signing_key="whsec_other")
+    with pytest.raises(InvalidEventError):
+        verify_signature(PAYLOAD, header, SIGNING_KEY, tolerance=300)
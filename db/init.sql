@@ -1,3 +1,4 @@
+-- Every statement can be run again, so the script also upgrades existing databases
 create schema if not exists data;
 alter database billing set search_path to data;
 create table if not exists data.payment_methods (
@@ -21,7 +22,10 @@ create table if not exists data.products (
                active boolean default FALSE not null,
                created timestamptz default now(),
                modified timestamptz default now());
-create type data.subscription_state as enum ('active', 'pre_active', 'inactive', 'cancelled', 'to_deactivate');
+do $$ begin
+    create type data.subscription_state as enum ('active', 'pre_active', 'inactive', 'cancelled', 'to_deactivate');
+exception when duplicate_object then null;
+end $$;
 create table if not exists data.subscriptions (
                id uuid primary key,
                product_id uuid references data.products on update cascade on delete restrict ,
@@ -31,7 +35,10 @@ create table if not exists data.subscriptions (
                state data.subscription_state default 'inactive',
                created timestamptz default now(),
                modified timestamptz default now());
-create type data.order_state as enum ('draft', 'processing', 'paid', 'error');
+do $$ begin
+    create type data.order_state as enum ('draft', 'processing', 'paid', 'error');
+exception when duplicate_object then null;
+end $$;
 create table if not exists data.orders (
               id uuid primary key,
               external_id varchar(50),
@@ -39,6 +46,7 @@ create table if not exists data.orders (
               subscription_id uuid references data.subscriptions on update cascade on delete restrict,
               user_id uuid not null,
               payment_system varchar(50) not null,
+              gateway varchar(50),
               payment_method_id uuid references data.payment_methods on update cascade on delete restrict,
               payment_amount decimal not null,
               payment_currency_code varchar(3) not null,
@@ -47,9 +55,56 @@ create table if not exists data.orders (
               is_automatic boolean default FALSE not null,
               is_refund boolean default FALSE not null,
               src_order_id uuid references data.orders on update cascade on delete restrict,
+              idempotency_key varchar(255),
               created timestamptz default now(),
               modified timestamptz default now());
-create user scheduler with password 'scheduler';
+-- Upgrade of databases created before the columns were added
+alter table data.orders add column if not exists idempotency_key varchar(255);
+alter table data.orders add column if not exists gateway varchar(50);
+create table if not exists data.rate_limits (
+              name varchar(50) primary key,
+              tokens double precision not null,
+              updated timestamptz default now());
+create table if not exists data.customers (
+              id uuid primary key,
+              user_id uuid not null,
+              payment_system varchar(50) not null,
+              external_id varchar(50) not null,
+              created timestamptz default now(),
+              modified timestamptz default now(),
+              unique (user_id, payment_system));
+create index if not exists orders_external_id_idx on data.orders (external_id);
+create index if not exists orders_last_paid_idx on data.orders (subscription_id, created desc) where state = 'paid' and not is_refund;
+do $$ begin
+    create type data.role_action as enum ('grant', 'revoke');
+exception when duplicate_object then null;
+end $$;
+create table if not exists data.role_outbox (
+              id uuid primary key,
+              user_id uuid not null,
+              role_id uuid not null,
+              action data.role_action not null,
+              attempts integer default 0 not null,
+              next_attempt timestamptz default now() not null,
+              delivered timestamptz,
+              error text,
+              created timestamptz default now(),
+              modified timestamptz default now());
+create unique index if not exists role_outbox_pending_idx on data.role_outbox (user_id, role_id) where delivered is null;
+create index if not exists role_outbox_next_attempt_idx on data.role_outbox (next_attempt) where delivered is null;
+create or replace function data.notify_products_changed() returns trigger as $$
+begin
+    perform pg_notify('products_changed', '');
+    return null;
+end;
+$$ language plpgsql;
+drop trigger if exists products_changed on data.products;
+create trigger products_changed after insert or update or delete or truncate on data.products
+              for each statement execute procedure data.notify_products_changed();
+do $$ begin
+    create user scheduler with password 'scheduler';
+exception when duplicate_object then null;
+end $$;
 grant connect on database billing to scheduler;
 grant usage on schema data to scheduler;
 grant select on all tables in schema data to scheduler;
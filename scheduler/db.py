@@ -89,8 +89,13 @@ class PostgresDB(AbstractStorage):
         )
 
     def get_processing_orders(self, *args, **kwargs) -> List:
+        """
+        Select orders sent to a payment system and not finished yet.
+        Orders without external id are recovered by Billing API.
+        :return: List of Named Tuple Orders
+        """
         return self.get(
-            "SELECT id FROM orders WHERE state='processing' or state='draft';"
+            "SELECT id FROM orders WHERE (state='processing' or state='draft') AND external_id IS NOT NULL;"
         )
 
     def get_overdue_orders(self, *args, **kwargs) -> List:
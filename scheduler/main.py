@@ -1,4 +1,5 @@
 import time
+from typing import List
 
 import psycopg2
 import requests
@@ -18,8 +19,11 @@ class Scheduler:
     def check_processing_orders(self):
         """ Get orders in state Draft, In progress and send them for update to Billing API """
         processing_orders = self.db.get_processing_orders()
-        for order in processing_orders:
-            self.send_order_for_update(order.id)
+        batch_size = settings.ORDER_UPDATE_BATCH_SIZE
+        for i in range(0, len(processing_orders), batch_size):
+            end = i + batch_size
+            batch = processing_orders[i:end]
+            self.send_orders_for_update([str(order.id) for order in batch])
             time.sleep(settings.REQUEST_DELAY)
 
     def check_overdue_orders(self):
@@ -32,6 +36,16 @@ class Scheduler:
             self.send_order_for_cancel(overdue_order.id)
             time.sleep(settings.REQUEST_DELAY)
 
+    def recover_unsent_orders(self):
+        """ Ask Billing API to finish orders that were reserved, but not sent to a payment system """
+        try:
+            logger.info("Sending request to Billing API to recover unsent orders")
+            requests.post(f"{SERVICE_URL}/orders/recover")
+        except Exception as e:
+            logger.error(
+                f"Error while sending a request to recover orders to Billing API: {e}"
+            )
+
     def check_subscriptions(self):
         """
         Runner for gathering subscriptions once a day and
@@ -46,9 +60,7 @@ class Scheduler:
         Send them to Billing API for update.
         """
         subscriptions = self.db.get_active_subscriptions()
-        for subscription in subscriptions:
-            self.send_subscription_for_update(subscription.id)
-            time.sleep(settings.REQUEST_DELAY)
+        self.send_subscriptions(subscriptions, "recurring_payment")
 
     def check_overdue_subscriptions(self):
         """
@@ -56,9 +68,7 @@ class Scheduler:
         Send them to Billing API for deactivation.
         """
         overdue_subscriptions = self.db.get_overdue_subscriptions()
-        for overdue_subscription in overdue_subscriptions:
-            self.send_subscription_for_cancel(overdue_subscription.id)
-            time.sleep(settings.REQUEST_DELAY)
+        self.send_subscriptions(overdue_subscriptions, "deactivate")
 
     def check_pre_active_subscriptions(self):
         """
@@ -66,9 +76,7 @@ class Scheduler:
         Send them to Billing API for activation.
         """
         pre_active_subscriptions = self.db.get_pre_active_subscriptions()
-        for pre_active_subscription in pre_active_subscriptions:
-            self.send_order_for_activate(pre_active_subscription.id)
-            time.sleep(settings.REQUEST_DELAY)
+        self.send_subscriptions(pre_active_subscriptions, "activate")
 
     def check_pre_deactivate_subscriptions(self):
         """
@@ -76,82 +84,74 @@ class Scheduler:
         Send them to Billing API for deactivation.
         """
         pre_deactivate_subscriptions = self.db.get_pre_deactivate_subscriptions()
-        for subscription in pre_deactivate_subscriptions:
-            self.send_subscription_for_cancel(subscription.id)
-            time.sleep(settings.REQUEST_DELAY)
+        self.send_subscriptions(pre_deactivate_subscriptions, "deactivate")
 
-    @staticmethod
-    def send_subscription_for_update(subscription_id: str) -> None:
+    def send_subscriptions(self, subscriptions: List, action: str) -> None:
         """
-        Send request for payment to Blling API
-        :param subscription_id: UUID of subscription
+        Send subscriptions to Billing API in batches
+        :param subscriptions: Named Tuple Subscriptions
+        :param action: Billing API subscriptions action: activate, deactivate or recurring_payment
         :return: None
         """
-        try:
-            logger.info(
-                f"Sending request to Billing API to update a subscription with id {subscription_id}"
-            )
-            requests.post(
-                f"{SERVICE_URL}/subscription/{subscription_id}/recurring_payment"
-            )
-        except Exception as e:
-            logger.error(
-                "Error while sending a request to update a subscription to Billing API: %s"
-                % e
+        batch_size = settings.SUBSCRIPTION_BATCH_SIZE
+        for i in range(0, len(subscriptions), batch_size):
+            end = i + batch_size
+            batch = subscriptions[i:end]
+            self.send_subscriptions_batch(
+                [str(subscription.id) for subscription in batch], action
             )
+            time.sleep(settings.REQUEST_DELAY)
 
     @staticmethod
-    def send_order_for_activate(subscription_id: str) -> None:
+    def send_subscriptions_batch(subscription_ids: List[str], action: str) -> None:
         """
-        Send request for activation of the subscription to the Blling API
-        :param subscription_id: UUID of subscription
+        Send request for Blling API to make an action with many subscriptions at once
+        :param subscription_ids: UUIDs of subscriptions
+        :param action: Billing API subscriptions action: activate, deactivate or recurring_payment
         :return: None
         """
         try:
             logger.info(
-                f"Sending request to Billing API to activate a subscription with id {subscription_id}"
-            )
-            requests.post(f"{SERVICE_URL}/subscription/{subscription_id}/activate")
-
-        except Exception as e:
-            logger.error(
-                "Error while sending a request to activate a subscription to Billing API: %s"
-                % e
+                f"Sending request to Billing API to {action} {len(subscription_ids)} subscriptions"
             )
-
-    @staticmethod
-    def send_subscription_for_cancel(subscription_id: str) -> None:
-        """
-        Send request for cancelling a user subscription to Blling API
-        :param subscription_id: UUID of subscription
-        :return: None
-        """
-        try:
-            logger.info(
-                f"Sending request to Billing API to cancel a subscription with id {subscription_id}"
+            response = requests.post(
+                f"{SERVICE_URL}/subscriptions/{action}",
+                json={"subscription_ids": subscription_ids},
             )
-            requests.post(f"{SERVICE_URL}/subscription/{subscription_id}/deactivate")
+            response.raise_for_status()
+            for result in response.json():
+                if result["error"]:
+                    logger.warning(
+                        f"Subscription with id {result['id']} is not processed: {result['error']}"
+                    )
         except Exception as e:
             logger.error(
-                "Error while sending a request to cancel a subscription to Billing API: %s"
-                % e
+                f"Error while sending a request to {action} subscriptions to Billing API: {e}"
             )
 
     @staticmethod
-    def send_order_for_update(order_id: str) -> None:
+    def send_orders_for_update(order_ids: List[str]) -> None:
         """
-        Send request for Blling API to update an order
-        :param order_id: UUID of order
+        Send request for Blling API to update many orders at once
+        :param order_ids: UUIDs of orders
         :return: None
         """
         try:
             logger.info(
-                f"Sending request to Billing API to update an order with id {order_id}"
+                f"Sending request to Billing API to update {len(order_ids)} orders"
+            )
+            response = requests.post(
+                f"{SERVICE_URL}/orders/update_info", json={"order_ids": order_ids}
             )
-            requests.post(f"{SERVICE_URL}/order/{order_id}/update_info")
+            response.raise_for_status()
+            for result in response.json():
+                if result["error"]:
+                    logger.warning(
+                        f"Order with id {result['id']} is not updated: {result['error']}"
+                    )
         except Exception as e:
             logger.error(
-                f"Error while sending a request to update an order to Billing API: {e}"
+                f"Error while sending a request to update orders to Billing API: {e}"
             )
 
     @staticmethod
@@ -188,7 +188,12 @@ if __name__ == "__main__":
 
     schedule.every().day.at("10:30").do(scheduler.check_subscriptions)
     schedule.every().day.at("10:30").do(scheduler.check_overdue_orders)
-    schedule.every(5).seconds.do(scheduler.check_processing_orders)
+    schedule.every(settings.ORDER_CHECK_INTERVAL).seconds.do(
+        scheduler.check_processing_orders
+    )
+    schedule.every(settings.ORDER_RECOVERY_INTERVAL).seconds.do(
+        scheduler.recover_unsent_orders
+    )
     schedule.every(6).seconds.do(scheduler.check_pre_active_subscriptions)
     schedule.every(7).seconds.do(scheduler.check_pre_deactivate_subscriptions)
 
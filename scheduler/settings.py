@@ -16,6 +16,11 @@ class Settings(BaseSettings):
     DB_PORT: str = Field("5432", env="DB_PORT")
     DB_SCHEMA: str = Field("data", env="DB_SCHEMA")
     REQUEST_DELAY: int = 1
+    # Orders are updated by payment system webhooks, polling is a safety net
+    ORDER_CHECK_INTERVAL: int = Field(60, env="ORDER_CHECK_INTERVAL")
+    ORDER_UPDATE_BATCH_SIZE: int = Field(100, env="ORDER_UPDATE_BATCH_SIZE")
+    SUBSCRIPTION_BATCH_SIZE: int = Field(100, env="SUBSCRIPTION_BATCH_SIZE")
+    ORDER_RECOVERY_INTERVAL: int = Field(60, env="ORDER_RECOVERY_INTERVAL")
     BILLING_API_HOST: str = Field("localhost", env="BILLING_API_HOST")
     BILLING_API_PORT: str = Field("8787", env="BILLING_API_PORT")
     SERVICE_URL: str = f"http://{BILLING_API_HOST}:{BILLING_API_PORT}/api/service"